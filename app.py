@@ -1,28 +1,146 @@
 import os
-import io
-from flask import Flask, request, jsonify, render_template
+import json
+import logging
+import random
+import time
+from flask import Flask, Response, g, request, jsonify, render_template, stream_with_context
+from dotenv import load_dotenv
+import metrics
+import offload
+from config import BATCH_MAX_ITEMS, BULK_MAX_FILES, PROFILE_DIR, PROFILE_SAMPLE_RATE, SERVER_TIMING
+from db import init_db, SessionLocal, unit_of_work
+from models import BulkBatch, Job
+from nlp.cache import cache_stats
+from nlp.documents import PDF_MISSING, SpooledFile, extract_texts, is_supported
+from services.bulk_service import bulk_match as run_bulk_match
+from services.bulk_service import bulk_screen, get_bulk_batch, start_bulk_batch, submit_bulk_batch
+from services.resume_service import create_candidate, create_candidates
+from services.job_service import create_job, create_jobs, list_jobs
+from services.match_service import (
+    TEXT_MODES, find_candidates_by_skills, match_candidate_job, match_pairs, rank_candidates, recommend_jobs,
+)
+from services.semantic_service import require_embedder
+from services.warmup_service import is_ready, warm_up, warmup_timings
+
 try:
-    from pypdf import PdfReader
+    from pyinstrument import Profiler
 except ImportError:
-    PdfReader = None
-from dotenv import load_dotenv
-from db import init_db, SessionLocal
-from services.resume_service import create_candidate
-from services.job_service import create_job, list_jobs
-from services.match_service import match_candidate_job, recommend_jobs
+    Profiler = None
 
 load_dotenv()
 
 app = Flask(__name__)
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev-secret-key")
+logger = logging.getLogger(__name__)
+
+# How often a Server-Sent Events stream checks the database for new bulk results, and how
+# long one stream holds a server thread before ending (EventSource reconnects with Last-Event-ID)
+SSE_POLL_SECONDS = 0.5
+SSE_MAX_SECONDS = 25.0
+
+REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "Request latency by endpoint", ("method", "endpoint", "status"))
+
+
+def _start_profiler():
+    # pyinstrument samples the stack; cProfile (stdlib) traces every call and is slower
+    if Profiler is not None:
+        profiler = Profiler()
+        profiler.start()
+        return profiler
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another request on this process is already being profiled
+        return None
+    return profiler
+
+
+def _save_profile(profiler, endpoint: str) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{endpoint.replace('/', '_').strip('_') or 'root'}"
+    if Profiler is not None and isinstance(profiler, Profiler):
+        profiler.stop()
+        with open(os.path.join(PROFILE_DIR, name + ".html"), "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+    else:
+        profiler.disable()
+        profiler.dump_stats(os.path.join(PROFILE_DIR, name + ".prof"))
+
+
+@app.before_request
+def _start_request():
+    g.started = time.perf_counter()
+    g.timing_token = metrics.start_request_timing()
+    g.profiler = _start_profiler() if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE else None
+
+
+@app.after_request
+def _finish_request(response):
+    elapsed = time.perf_counter() - g.started
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_SECONDS.observe(elapsed, method=request.method, endpoint=endpoint, status=response.status_code)
+    stages = metrics.stop_request_timing(g.pop("timing_token"))
+    if SERVER_TIMING or request.headers.get("X-Server-Timing") == "1":
+        response.headers["Server-Timing"] = metrics.server_timing_header(stages, elapsed)
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        _save_profile(profiler, endpoint)
+    return response
+
+
+@app.teardown_request
+def _discard_request_state(exc):
+    # after_request is skipped when a handler raises; release what it would have
+    token = g.pop("timing_token", None)
+    if token is not None:
+        metrics.stop_request_timing(token)
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        (profiler.stop if Profiler is not None and isinstance(profiler, Profiler) else profiler.disable)()
+
+@app.errorhandler(offload.Overloaded)
+def _overloaded(e):
+    """429 when too many requests are already waiting for CPU-bound work in this worker"""
+    response = jsonify({"error": str(e)})
+    response.headers["Retry-After"] = "1"
+    return response, 429
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/ready")
+def ready():
+    """Readiness check: 503 until models and indexes are loaded in this worker"""
+    if not is_ready():
+        return jsonify({"status": "warming"}), 503
+    return jsonify({"status": "ready", "warmup_seconds": warmup_timings()})
+
+@app.post("/api/warmup")
+def api_warmup():
+    """Load models and indexes now instead of on the first request that needs them"""
+    try:
+        timings = warm_up()
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"status": "ready", "warmup_seconds": timings})
+
+@app.get("/api/cache/stats")
+def api_cache_stats():
+    """Hit/miss counters of the parse caches in this worker process"""
+    return jsonify(cache_stats())
+
+@app.get("/metrics")
+def api_metrics():
+    """Stage and endpoint latency histograms and cache counters (Prometheus text format)"""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 @app.get("/")
 def index():
-    return render_template("index.html")
+    return render_template("index.html", bulk_max_files=BULK_MAX_FILES)
 
 @app.get("/favicon.ico")
 def favicon():
@@ -38,133 +156,193 @@ def extract_resume():
         return jsonify({"error": "No file selected"}), 400
     
     try:
-        filename = file.filename.lower()
-        if filename.endswith('.pdf'):
-            if PdfReader is None:
-                return jsonify({"error": "PDF support not installed. Run: pip install pypdf"}), 500
-            pdf_bytes = file.read()
-            reader = PdfReader(io.BytesIO(pdf_bytes))
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() or ""
-            if not text.strip():
-                return jsonify({"error": "Could not extract text from PDF"}), 400
-            return jsonify({"text": text.strip()})
-        elif filename.endswith('.txt'):
-            text = file.read().decode('utf-8', errors='ignore')
-            return jsonify({"text": text.strip()})
-        else:
-            return jsonify({"error": "Unsupported file type. Please upload .txt or .pdf"}), 400
+        with SpooledFile(file.stream) as upload, offload.admit():
+            result = extract_texts([(file.filename, upload)])[0]
+    except offload.Overloaded:
+        raise
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Failed to process file: {str(e)}"}), 500
+    if result.error:
+        if not is_supported(file.filename) or result.timed_out:
+            return jsonify({"error": result.error}), 400
+        if result.error == PDF_MISSING:
+            return jsonify({"error": result.error}), 500
+        return jsonify({"error": f"Failed to process file: {result.error}"}), 500
+    if not result.text and file.filename.lower().endswith('.pdf'):
+        return jsonify({"error": "Could not extract text from PDF"}), 400
+    return jsonify({
+        "text": result.text,
+        "pages": result.pages,
+        "truncated": result.truncated,
+        "cached": result.cached,
+        "extract_seconds": round(result.seconds, 3),
+    })
 
 @app.post("/api/bulk-match")
 def bulk_match():
-    """Bulk match multiple resumes against a job posting"""
-    from nlp.extract_info import extract_name_and_contact, extract_name_from_filename
-    from services.resume_service import create_candidate
-    from services.job_service import create_job
-    from services.match_service import match_candidate_job
-    
+    """
+    Bulk match multiple resumes against a job posting, or (job_ids=1,2,3) against
+    several stored jobs at once
+    """
     # Get job details
     title = request.form.get('title')
     description = request.form.get('description')
     required_skills_str = request.form.get('required_skills', '')
     required_skills = [s.strip() for s in required_skills_str.split(',') if s.strip()]
+    top_k = request.values.get('k', type=int)
+    try:
+        job_ids = [int(j) for j in request.values.get('job_ids', '').split(',') if j.strip()]
+    except ValueError:
+        return jsonify({"error": "job_ids must be comma-separated integers"}), 400
     
-    if not title or not description:
+    if job_ids:
+        if request.values.get('async') == '1':
+            return jsonify({"error": "async is not supported with job_ids"}), 400
+    elif not title or not description:
         return jsonify({"error": "title and description are required"}), 400
+    if top_k is not None and top_k < 1:
+        return jsonify({"error": "k must be positive"}), 400
     
     # Get uploaded files
-    files = request.files.getlist('resume_files')
-    if not files or len(files) == 0:
+    files = [f for f in request.files.getlist('resume_files') if f and f.filename]
+    if not files:
         return jsonify({"error": "No resume files uploaded"}), 400
     
-    if len(files) > 100:
-        return jsonify({"error": "Maximum 100 files allowed"}), 400
+    if len(files) > BULK_MAX_FILES:
+        return jsonify({"error": f"Maximum {BULK_MAX_FILES} files allowed"}), 400
     
+    uploads = []
     try:
-        # Create job posting once
-        with SessionLocal() as session:
-            job = create_job(session, title=title, description=description, required_skills=required_skills)
-            session.commit()
-            job_id = job.id
-        
-        # Process each resume
-        results = []
-        for file in files:
-            if not file or file.filename == '':
-                continue
-            
+        # Spool each upload to a temporary file in chunks instead of reading it into memory
+        for f in files:
             try:
-                # Extract text from file
-                filename = file.filename
-                filename_lower = filename.lower()
-                
-                if filename_lower.endswith('.pdf'):
-                    if PdfReader is None:
-                        continue
-                    pdf_bytes = file.read()
-                    reader = PdfReader(io.BytesIO(pdf_bytes))
-                    text = ""
-                    for page in reader.pages:
-                        text += page.extract_text() or ""
-                    resume_text = text.strip()
-                elif filename_lower.endswith('.txt'):
-                    resume_text = file.read().decode('utf-8', errors='ignore').strip()
-                else:
-                    continue
-                
-                if not resume_text:
-                    continue
-                
-                # Extract name and contact
-                name, contact = extract_name_and_contact(resume_text)
-                if not name:
-                    name = extract_name_from_filename(filename)
-                if not contact:
-                    contact = "Not found"
-                
-                # Create candidate and match
-                with SessionLocal() as session:
-                    candidate = create_candidate(session, name=name, email=contact, resume_text=resume_text)
-                    session.commit()
-                    candidate_id = candidate.id
-                    candidate_skills = candidate.skills
-                
-                # Match candidate to job
-                with SessionLocal() as session:
-                    match_result = match_candidate_job(session, candidate_id, job_id)
-                
-                if match_result:
-                    results.append({
-                        "candidate_id": candidate_id,
-                        "name": name,
-                        "contact": contact,
-                        "score": match_result["score"],
-                        "overlap_skills": match_result["overlap_skills"],
-                        "missing_skills": match_result["missing_skills"],
-                        "all_skills": candidate_skills,
-                        "filename": filename
-                    })
-            
-            except Exception as e:
-                # Skip problematic files
-                print(f"Error processing {filename}: {e}")
-                continue
-        
-        # Sort by score descending
-        results.sort(key=lambda x: x["score"], reverse=True)
-        
-        return jsonify({
-            "job_id": job_id,
-            "job_title": title,
-            "total_candidates": len(results),
-            "candidates": results
-        }), 200
+                uploads.append((f.filename, SpooledFile(f.stream)))
+            except ValueError as e:
+                return jsonify({"error": f"{f.filename}: {e}"}), 400
+        if request.values.get('async') == '1':
+            # Queue the batch and return immediately; results are polled or streamed
+            with unit_of_work() as session:
+                batch = submit_bulk_batch(session, title, description, required_skills, uploads)
+                batch_id, job_id = batch.id, batch.job_id
+            start_bulk_batch(batch_id)
+            return jsonify({
+                "batch_id": batch_id,
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/api/bulk-match/{batch_id}",
+                "events_url": f"/api/bulk-match/{batch_id}/events",
+            }), 202
+
+        if job_ids:
+            with offload.admit(), unit_of_work(immediate=False) as session:
+                result = bulk_screen(session, job_ids, uploads, top_k=top_k)
+            if result is None:
+                return jsonify({"error": "job not found"}), 404
+            if _wants_ndjson():
+                return Response(_screen_ndjson(result), mimetype="application/x-ndjson")
+            return jsonify(result), 200
+
+        # Not a write transaction from the start: the lock is only needed once parsing is done
+        with offload.admit(), unit_of_work(immediate=False) as session:
+            result = run_bulk_match(session, title, description, required_skills, uploads, top_k=top_k)
+        if _wants_ndjson():
+            return Response(_bulk_ndjson(result), mimetype="application/x-ndjson")
+        return jsonify(result), 200
     
+    except offload.Overloaded:
+        raise
     except Exception as e:
+        logger.exception("Bulk matching failed")
         return jsonify({"error": f"Bulk matching failed: {str(e)}"}), 500
+    finally:
+        for _, upload in uploads:
+            upload.close()
+
+def _wants_ndjson() -> bool:
+    return request.values.get("stream") == "1" or request.accept_mimetypes.best == "application/x-ndjson"
+
+def _similarity_or_error():
+    """?similarity=tfidf (default) or semantic: how the 30% text similarity share is computed"""
+    mode = request.args.get("similarity", "tfidf")
+    if mode not in TEXT_MODES:
+        return None, (jsonify({"error": f"similarity must be one of: {', '.join(TEXT_MODES)}"}), 400)
+    if mode == "semantic":
+        try:
+            require_embedder()
+        except RuntimeError as e:
+            return None, (jsonify({"error": str(e)}), 503)
+    return mode, None
+
+def _bulk_ndjson(result: dict):
+    # One line per record instead of one JSON document holding every result
+    yield json.dumps({"type": "job", "job_id": result["job_id"], "job_title": result["job_title"],
+                      "total_candidates": result["total_candidates"]}) + "\n"
+    for rank, row in enumerate(result["candidates"], 1):
+        yield json.dumps({"type": "candidate", "rank": rank, **row}) + "\n"
+    for err in result["errors"]:
+        yield json.dumps({"type": "error", **err}) + "\n"
+
+def _screen_ndjson(result: dict):
+    # Each job's leaderboard in turn, then the files that could not be parsed
+    for board in result["leaderboards"]:
+        yield json.dumps({"type": "job", "job_id": board["job_id"], "job_title": board["job_title"],
+                          "total_candidates": result["total_candidates"]}) + "\n"
+        for row in board["candidates"]:
+            yield json.dumps({"type": "candidate", "job_id": board["job_id"], **row}) + "\n"
+    for err in result["errors"]:
+        yield json.dumps({"type": "error", **err}) + "\n"
+
+@app.get("/api/bulk-match/<int:batch_id>")
+def bulk_match_status(batch_id: int):
+    """Progress and ranked results of an asynchronous bulk match (?after=<result_id> for new rows only)"""
+    after = request.args.get("after", default=0, type=int)
+    with SessionLocal() as session:
+        state = get_bulk_batch(session, batch_id, after=after)
+    if state is None:
+        return jsonify({"error": "batch not found"}), 404
+    return jsonify(state)
+
+@app.get("/api/bulk-match/<int:batch_id>/events")
+def bulk_match_events(batch_id: int):
+    """
+    Server-Sent Events: 'candidates' with newly scored rows, 'progress', then 'done'.
+    A stream ends after SSE_MAX_SECONDS so it does not hold a server thread for a
+    whole batch; each event carries the last result id, which EventSource sends back
+    as Last-Event-ID when it reconnects.
+    """
+    with SessionLocal() as session:
+        if session.get(BulkBatch, batch_id) is None:
+            return jsonify({"error": "batch not found"}), 404
+    start_after = request.args.get("after", default=0, type=int)
+    start_after = max(start_after, request.headers.get("Last-Event-ID", default=0, type=int))
+
+    def generate():
+        after = start_after
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        yield "retry: 1000\n\n"
+        while True:
+            with SessionLocal() as session:
+                state = get_bulk_batch(session, batch_id, after=after)
+            if state is None:
+                # Deleted while streaming
+                yield f"event: done\ndata: {json.dumps({'status': 'failed', 'error': 'batch not found'})}\n\n"
+                return
+            if state["candidates"]:
+                after = state["last_result_id"]
+                yield f"id: {after}\nevent: candidates\ndata: {json.dumps(state['candidates'])}\n\n"
+            progress = {k: state[k] for k in ("status", "total_files", "processed_files", "errors", "error")}
+            yield f"id: {after}\nevent: progress\ndata: {json.dumps(progress)}\n\n"
+            if state["status"] in ("done", "failed"):
+                yield f"id: {after}\nevent: done\ndata: {json.dumps(progress)}\n\n"
+                return
+            if time.monotonic() >= deadline:
+                return
+            time.sleep(SSE_POLL_SECONDS)
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.post("/api/resumes")
 def api_create_resume():
@@ -174,10 +352,9 @@ def api_create_resume():
     resume_text = payload.get("resume_text")
     if not resume_text:
         return jsonify({"error": "resume_text is required"}), 400
-    with SessionLocal() as session:
+    with offload.admit(), unit_of_work() as session:
         candidate = create_candidate(session, name=name, email=email, resume_text=resume_text)
-        session.commit()
-        return jsonify({"candidate_id": candidate.id, "skills": candidate.skills}), 201
+    return jsonify({"candidate_id": candidate.id, "skills": candidate.skills}), 201
 
 @app.post("/api/jobs")
 def api_create_job():
@@ -187,10 +364,9 @@ def api_create_job():
     req_skills = payload.get("required_skills", [])
     if not title or not description:
         return jsonify({"error": "title and description are required"}), 400
-    with SessionLocal() as session:
+    with unit_of_work() as session:
         job = create_job(session, title=title, description=description, required_skills=req_skills)
-        session.commit()
-        return jsonify({"job_id": job.id}), 201
+    return jsonify({"job_id": job.id}), 201
 
 @app.get("/api/match")
 def api_match():
@@ -198,25 +374,196 @@ def api_match():
     job_id = request.args.get("job_id", type=int)
     if not candidate_id or not job_id:
         return jsonify({"error": "candidate_id and job_id are required"}), 400
+    text_mode, error = _similarity_or_error()
+    if error:
+        return error
     with SessionLocal() as session:
-        result = match_candidate_job(session, candidate_id, job_id)
+        result = match_candidate_job(session, candidate_id, job_id, text_mode=text_mode)
         if result is None:
             return jsonify({"error": "candidate or job not found"}), 404
         return jsonify(result)
 
+def _read_batch():
+    """Items of a batch request: a JSON array, {"items": [...]} or NDJSON (one object per line)"""
+    if request.mimetype == "application/x-ndjson":
+        items = []
+        for line in request.stream:
+            if line.strip():
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    items.append(None)
+                # One past the limit is enough to refuse the batch; stop reading the body
+                if len(items) > BATCH_MAX_ITEMS:
+                    break
+        return items
+    payload = request.get_json(force=True, silent=True)
+    items = payload.get("items") if isinstance(payload, dict) else payload
+    return items if isinstance(items, list) else None
+
+def _batch_response(results: list[dict]):
+    """Per-item results in input order, as NDJSON when the request was NDJSON or asks for it"""
+    if request.mimetype == "application/x-ndjson" or request.accept_mimetypes.best == "application/x-ndjson":
+        body = "".join(json.dumps(r) + "\n" for r in results)
+        return Response(body, mimetype="application/x-ndjson")
+    failed = sum(1 for r in results if "error" in r)
+    return jsonify({"results": results, "succeeded": len(results) - failed, "failed": failed})
+
+def _batch_items_or_error():
+    items = _read_batch()
+    if items is None:
+        return None, (jsonify({"error": "expected a JSON array, {\"items\": [...]} or NDJSON"}), 400)
+    if len(items) > BATCH_MAX_ITEMS:
+        return None, (jsonify({"error": f"Maximum {BATCH_MAX_ITEMS} items per batch"}), 413)
+    return items, None
+
+def _item_error(item, required: tuple, optional: tuple = (), lists: tuple = ()):
+    """Why a batch item is invalid, or None: required/optional fields are strings, lists are lists of strings"""
+    if not isinstance(item, dict):
+        return "item must be a JSON object"
+    if not all(item.get(field) for field in required):
+        return f"{' and '.join(required)} {'is' if len(required) == 1 else 'are'} required"
+    for field in required + optional:
+        if item.get(field) is not None and not isinstance(item[field], str):
+            return f"{field} must be a string"
+    for field in lists:
+        value = item.get(field)
+        if value is not None and not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+            return f"{field} must be a list of strings"
+    return None
+
+@app.post("/api/resumes:batch")
+def api_create_resumes_batch():
+    """Create many candidates in one transaction; items look like POST /api/resumes bodies"""
+    items, error = _batch_items_or_error()
+    if error:
+        return error
+    results = [None] * len(items)
+    valid = []
+    for i, item in enumerate(items):
+        problem = _item_error(item, ("resume_text",), optional=("name", "email"))
+        if problem:
+            results[i] = {"index": i, "error": problem}
+        else:
+            valid.append(i)
+    with offload.admit(), unit_of_work() as session:
+        rows = [(items[i].get("name"), items[i].get("email"), items[i]["resume_text"]) for i in valid]
+        candidates = create_candidates(session, rows)
+    for i, candidate in zip(valid, candidates):
+        results[i] = {"index": i, "candidate_id": candidate.id, "skills": candidate.skills}
+    return _batch_response(results)
+
+@app.post("/api/jobs:batch")
+def api_create_jobs_batch():
+    """Create many jobs in one transaction; items look like POST /api/jobs bodies"""
+    items, error = _batch_items_or_error()
+    if error:
+        return error
+    results = [None] * len(items)
+    valid = []
+    for i, item in enumerate(items):
+        problem = _item_error(item, ("title", "description"), lists=("required_skills",))
+        if problem:
+            results[i] = {"index": i, "error": problem}
+        else:
+            valid.append(i)
+    with unit_of_work() as session:
+        rows = [(items[i]["title"], items[i]["description"], items[i].get("required_skills", [])) for i in valid]
+        jobs = create_jobs(session, rows)
+    for i, job in zip(valid, jobs):
+        results[i] = {"index": i, "job_id": job.id}
+    return _batch_response(results)
+
+@app.post("/api/match:batch")
+def api_match_batch():
+    """Score many {"candidate_id", "job_id"} pairs at once"""
+    text_mode, error = _similarity_or_error()
+    if error:
+        return error
+    items, error = _batch_items_or_error()
+    if error:
+        return error
+    results = [None] * len(items)
+    valid = []
+    for i, item in enumerate(items):
+        ids = (item.get("candidate_id"), item.get("job_id")) if isinstance(item, dict) else (None, None)
+        if all(isinstance(x, int) and not isinstance(x, bool) and x > 0 for x in ids):
+            valid.append((i, ids))
+        else:
+            results[i] = {"index": i, "error": "candidate_id and job_id are required"}
+    with SessionLocal() as session:
+        for (i, _), match in zip(valid, match_pairs(session, [ids for _, ids in valid], text_mode=text_mode)):
+            if match is None:
+                results[i] = {"index": i, "error": "candidate or job not found"}
+            else:
+                results[i] = {"index": i, **match}
+    return _batch_response(results)
+
 @app.get("/api/recommendations")
 def api_recommendations():
     candidate_id = request.args.get("candidate_id", type=int)
     k = request.args.get("k", default=5, type=int)
     if not candidate_id:
         return jsonify({"error": "candidate_id is required"}), 400
+    text_mode, error = _similarity_or_error()
+    if error:
+        return error
+    with SessionLocal() as session:
+        results = recommend_jobs(session, candidate_id, top_k=k, text_mode=text_mode)
+    if _wants_ndjson():
+        return Response((json.dumps(row) + "\n" for row in results), mimetype="application/x-ndjson")
+    return jsonify({"recommendations": results})
+
+@app.get("/api/candidates")
+def api_find_candidates():
+    """Candidates with the given skills (?skills=kubernetes,go[&min_match=1][&limit=50])"""
+    skills = [s.strip() for s in request.args.get("skills", "").split(",") if s.strip()]
+    min_match = request.args.get("min_match", type=int)
+    limit = request.args.get("limit", default=50, type=int)
+    if not skills:
+        return jsonify({"error": "skills is required"}), 400
     with SessionLocal() as session:
-        results = recommend_jobs(session, candidate_id, top_k=k)
-        return jsonify({"recommendations": results})
+        results = find_candidates_by_skills(session, skills, min_match=min_match, limit=limit)
+        return jsonify({"candidates": results})
+
+@app.get("/api/jobs/<int:job_id>/top-candidates")
+def api_top_candidates(job_id: int):
+    """
+    Rank stored candidates for a job (?k=10&offset=0[&min_match=2] keeps candidates with at
+    least 2 of its required skills); ?stream=1 (or Accept: application/x-ndjson) streams NDJSON
+    """
+    k = request.args.get("k", default=10, type=int)
+    offset = request.args.get("offset", default=0, type=int)
+    min_match = request.args.get("min_match", default=0, type=int)
+    if k < 1 or offset < 0 or min_match < 0:
+        return jsonify({"error": "k must be positive, offset and min_match non-negative"}), 400
+    text_mode, error = _similarity_or_error()
+    if error:
+        return error
+    if not _wants_ndjson():
+        with SessionLocal() as session:
+            rows = rank_candidates(session, job_id, top_k=k, offset=offset, text_mode=text_mode,
+                                   min_match=min_match)
+            if rows is None:
+                return jsonify({"error": "job not found"}), 404
+            return jsonify({"job_id": job_id, "offset": offset, "k": k, "candidates": list(rows)})
+
+    with SessionLocal() as session:
+        if session.get(Job, job_id) is None:
+            return jsonify({"error": "job not found"}), 404
+
+    def generate():
+        with SessionLocal() as session:
+            for row in rank_candidates(session, job_id, top_k=k, offset=offset, text_mode=text_mode,
+                                       min_match=min_match):
+                yield json.dumps(row) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
 
 if __name__ == "__main__":
     # Ensure DB tables exist
     init_db()
+    warm_up()
     host = os.getenv("APP_HOST", "127.0.0.1")
     port = int(os.getenv("APP_PORT", 5000))
     app.run(host=host, port=port, debug=os.getenv("FLASK_ENV") == "development")
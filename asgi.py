@@ -0,0 +1,242 @@
+"""
+ASGI entry point: the Flask app behind an asyncio front end.
+
+    GUNICORN_WORKER_CLASS=asgi gunicorn asgi:app -c gunicorn.conf.py
+
+(gunicorn's native ASGI worker, gunicorn >= 25; `uvicorn asgi:app` works too.)
+
+Request bodies are received on the event loop and spooled to memory or a
+temporary file, so a slow upload holds a connection but no thread. Only once the
+whole body has arrived does the request run through the Flask views, on one of
+ASGI_THREADS threads; their CPU-bound work goes to the offload process pool
+(OFFLOAD_WORKERS defaults to the CPU count split over WEB_CONCURRENCY here).
+When ASGI_THREADS requests are running and ASGI_MAX_QUEUED more are waiting for
+a thread, further requests get 429 with Retry-After instead of queueing.
+Responses, including NDJSON and Server-Sent Events streams, are sent chunk by
+chunk as the view produces them.
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault(
+    "OFFLOAD_WORKERS", str(max(1, (os.cpu_count() or 1) // max(1, int(os.getenv("WEB_CONCURRENCY", 1))))))
+
+import offload  # noqa: E402
+from app import app as flask_app  # noqa: E402
+from config import ASGI_MAX_QUEUED, ASGI_THREADS  # noqa: E402
+from metrics import counter  # noqa: E402
+
+# Request bodies up to this size stay in memory; larger ones spill to a temporary file
+SPOOL_MAX_MEMORY = 1 << 20
+# Response chunks buffered between a view thread and the event loop
+_SEND_QUEUE = 16
+
+REJECTED = counter("asgi_rejected_total", "Requests refused with 429 because every view thread was busy")
+_BUSY = json.dumps({"error": "Server is busy, please retry shortly"}).encode()
+
+
+def _environ(scope: dict, body) -> dict:
+    # PEP 3333 environ for an ASGI HTTP scope; `body` is the spooled request body
+    root_path = scope.get("root_path", "")
+    path = scope["path"]
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": root_path.encode("utf-8").decode("latin-1"),
+        "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(body.tell()),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    body.seek(0)
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+            continue
+        if name == "CONTENT_LENGTH":
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class AsgiApp:
+    """Runs a WSGI app under ASGI: async request I/O, views on a bounded thread pool."""
+
+    def __init__(self, wsgi_app, threads: int = ASGI_THREADS, max_queued: int = ASGI_MAX_QUEUED):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self.capacity = threads + max_queued
+        self.executor: ThreadPoolExecutor | None = None
+        # Requests holding or waiting for a view thread
+        self.active = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Start the worker processes before the first request needs them
+                await asyncio.get_running_loop().run_in_executor(None, offload.start)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.executor is not None:
+                    self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _busy(self, send):
+        REJECTED.inc()
+        await send({"type": "http.response.start", "status": 429, "headers": [
+            (b"content-type", b"application/json"), (b"retry-after", b"1"),
+            (b"content-length", str(len(_BUSY)).encode())]})
+        await send({"type": "http.response.body", "body": _BUSY})
+
+    async def _http(self, scope, receive, send):
+        # Refuse before reading a body that could not be served soon anyway
+        if self.active >= self.capacity:
+            await self._busy(send)
+            return
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        try:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body.write(message.get("body", b""))
+                if not message.get("more_body", False):
+                    break
+            if self.active >= self.capacity:
+                await self._busy(send)
+                return
+            self.active += 1
+            try:
+                await self._respond(scope, _environ(scope, body), receive, send)
+            finally:
+                self.active -= 1
+        finally:
+            body.close()
+
+    async def _respond(self, scope, environ, receive, send):
+        loop = asyncio.get_running_loop()
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.threads, thread_name_prefix="asgi")
+        queue: asyncio.Queue = asyncio.Queue(_SEND_QUEUE)
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        def put(item) -> None:
+            # Called from the view thread; blocks while the client is slower than the view
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        def run_view() -> None:
+            response = {"start": None, "sent": False}
+
+            def send_start() -> None:
+                if response["start"] is not None:
+                    put(("start", *response["start"]))
+                    response["start"], response["sent"] = None, True
+
+            def write(data: bytes) -> None:
+                send_start()
+                put(("body", data))
+
+            def start_response(status, headers, exc_info=None):
+                if exc_info and response["sent"]:
+                    raise exc_info[1].with_traceback(exc_info[2])
+                response["start"] = (int(status.split(" ", 1)[0]), headers)
+                return write
+
+            try:
+                iterable = self.wsgi_app(environ, start_response)
+                try:
+                    for chunk in iterable:
+                        if disconnected.is_set():
+                            break
+                        if chunk:
+                            write(chunk)
+                finally:
+                    if hasattr(iterable, "close"):
+                        iterable.close()
+                send_start()
+            except BaseException as e:
+                put(("error", e))
+            else:
+                put(("end",))
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        view = loop.run_in_executor(self.executor, run_view)
+        started = False
+        # gunicorn's ASGI worker loses a keep-alive request that arrives before the app
+        # returns, so the client must not see the whole response before the final message:
+        # with a Content-Length, the last chunk is held back and sent as that message
+        sized = False
+        last = b""
+        try:
+            while True:
+                item = await queue.get()
+                if item[0] == "start":
+                    status, headers = item[1], item[2]
+                    sized = any(name.lower() == "content-length" for name, _ in headers)
+                    await send({"type": "http.response.start", "status": status, "headers": [
+                        (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]})
+                    started = True
+                elif item[0] == "body":
+                    chunk, last = (last, item[1]) if sized else (item[1], b"")
+                    if chunk and not disconnected.is_set():
+                        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                else:
+                    break
+            await view
+            watcher.cancel()
+            if item[0] == "error":
+                flask_app.logger.error("Unhandled error in view", exc_info=item[1])
+                if not started:
+                    await send({"type": "http.response.start", "status": 500,
+                                "headers": [(b"content-type", b"text/plain")]})
+                    await send({"type": "http.response.body", "body": b"Internal Server Error"})
+            elif not disconnected.is_set():
+                await send({"type": "http.response.body", "body": last, "more_body": False})
+        finally:
+            watcher.cancel()
+            # The view thread may still be blocked handing over a chunk: let it finish
+            while not view.done():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.01)
+            await view
+
+
+app = AsgiApp(flask_app)
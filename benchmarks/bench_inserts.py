@@ -0,0 +1,104 @@
+"""
+Sustained candidate inserts/sec against a fresh SQLite database.
+
+Compares the old storage setup (rollback journal, synchronous=FULL, one commit per
+row) with the tuned one (WAL, synchronous=NORMAL, rows committed in batches through
+db.unit_of_work). Each configuration runs in fresh subprocesses so the settings in
+config.py are read from the environment, with several writer processes and
+threads per process to reproduce gunicorn's lock contention.
+
+    python benchmarks/bench_inserts.py --rows 2000 --processes 4 --threads 4
+"""
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIGS = {
+    "baseline": {"SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL", "batch": 1},
+    "tuned": {"SQLITE_JOURNAL_MODE": "WAL", "SQLITE_SYNCHRONOUS": "NORMAL", "batch": 100},
+}
+
+
+def _worker(rows: int, threads: int, batch: int) -> dict:
+    # Runs inside a subprocess whose environment selects the SQLite settings
+    sys.path.insert(0, ROOT)
+    from sqlalchemy.exc import OperationalError
+    from db import SessionLocal, unit_of_work
+    from models import Candidate
+
+    errors = []
+    per_thread = rows // threads
+
+    def run(thread_no: int):
+        try:
+            for start in range(0, per_thread, batch):
+                with unit_of_work() as session:
+                    for i in range(start, min(start + batch, per_thread)):
+                        cand = Candidate(name=f"bench {os.getpid()}-{thread_no}-{i}", email=None,
+                                         resume_text="python sql docker kubernetes " * 20)
+                        cand.skills = ["docker", "kubernetes", "python", "sql"]
+                        session.add(cand)
+        except OperationalError as e:
+            errors.append(str(e.orig))
+        finally:
+            SessionLocal.remove()
+
+    workers = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    started = time.time()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return {"errors": errors, "started": started, "finished": time.time()}
+
+
+def run_config(name: str, rows: int, processes: int, threads: int) -> dict:
+    settings = dict(CONFIGS[name])
+    batch = settings.pop("batch")
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}", **settings)
+        subprocess.check_call([sys.executable, "-c", f"import sys; sys.path.insert(0, {ROOT!r}); "
+                               "from db import init_db; init_db()"], env=env)
+        args = [sys.executable, __file__, "--worker", "--rows", str(rows // processes),
+                "--threads", str(threads), "--batch", str(batch)]
+        procs = [subprocess.Popen(args, env=env, stdout=subprocess.PIPE, text=True) for _ in range(processes)]
+        outputs = [json.loads(p.communicate()[0] or "{}") for p in procs]
+        # Wall time from the first writer starting to the last one finishing, excluding imports
+        elapsed = max(out["finished"] for out in outputs) - min(out["started"] for out in outputs)
+
+        with sqlite3.connect(os.path.join(tmp, "bench.db")) as conn:
+            inserted = conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+    errors = [e for out in outputs for e in out.get("errors", [])]
+    return {
+        "config": name,
+        "batch_size": batch,
+        **settings,
+        "rows_inserted": inserted,
+        "seconds": round(elapsed, 3),
+        "inserts_per_sec": round(inserted / elapsed, 1),
+        "failed_threads": len(errors),
+        "errors": sorted(set(errors)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000, help="rows per configuration, across all writers")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(_worker(args.rows, args.threads, args.batch)))
+    else:
+        print(json.dumps([run_config(name, args.rows, args.processes, args.threads) for name in CONFIGS], indent=2))
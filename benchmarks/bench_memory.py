@@ -0,0 +1,91 @@
+"""
+Peak Python memory of the ranking and recommendation paths on a large table.
+
+    python -m benchmarks.bench_memory --candidates 100000 --jobs 1000 --workdir /tmp/bench-mem
+
+Builds (or reuses, with --workdir) a synthetic corpus and reports the tracemalloc
+peak of each path, next to `materialize_candidates`, which loads every Candidate
+row the way the ranking code used to. The streaming paths should stay roughly
+flat as --candidates grows; the materializing ones grow with the table.
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def _peak(fn) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    out = fn()
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"peak_mb": round(peak / (1024 * 1024), 2), "seconds": round(seconds, 3), "rows": out}
+
+
+def run(args) -> dict:
+    from benchmarks.run import _configure, populate
+    _configure(args.workdir or tempfile.mkdtemp(prefix="resume-bench-mem-"))
+    report = {"populate": populate(args.candidates, args.jobs, args.seed)}
+
+    import app as app_module
+    from db import SessionLocal
+    from models import Candidate, Job
+    from services.index_service import get_candidate_index, get_job_index, rebuild_candidate_index
+    from services.match_service import find_candidates_by_skills, rank_candidates, recommend_jobs
+
+    rng = random.Random(args.seed)
+    session = SessionLocal()
+    max_job = session.query(Job.id).order_by(Job.id.desc()).limit(1).scalar()
+    max_cand = session.query(Candidate.id).order_by(Candidate.id.desc()).limit(1).scalar()
+    # Indexes are loaded outside the measured calls (they are shared, long-lived state)
+    get_job_index(session)
+    get_candidate_index(session)
+    client = app_module.app.test_client()
+    k = args.k
+    job_id = rng.randint(1, max_job)
+
+    def stream_response(url: str) -> int:
+        return sum(chunk.count(b"\n") for chunk in client.get(url).response)
+
+    def json_response(url: str) -> int:
+        return len(client.get(url).get_json()["candidates"])
+
+    paths = {
+        "materialize_candidates": lambda: len(session.query(Candidate).all()),
+        "rebuild_candidate_index": lambda: len(rebuild_candidate_index(session)),
+        "rank_candidates_stream": lambda: sum(1 for _ in rank_candidates(session, job_id, top_k=k)),
+        "rank_candidates_list": lambda: len(list(rank_candidates(session, job_id, top_k=k))),
+        "top_candidates_ndjson": lambda: stream_response(f"/api/jobs/{job_id}/top-candidates?k={k}&stream=1"),
+        "top_candidates_json": lambda: json_response(f"/api/jobs/{job_id}/top-candidates?k={k}"),
+        "recommend_jobs": lambda: len(recommend_jobs(session, rng.randint(1, max_cand), top_k=50)),
+        "find_candidates_by_skills": lambda: len(find_candidates_by_skills(session, ["python"], limit=k)),
+    }
+    only = {name.strip() for name in args.only.split(",") if name.strip()}
+    report["results"] = {}
+    for name, fn in paths.items():
+        if only and name not in only:
+            continue
+        session.expunge_all()
+        report["results"][name] = result = _peak(fn)
+        print(f"{name:26} peak {result['peak_mb']:>9.2f} MB  {result['seconds']:>8.3f} s  rows {result['rows']}",
+              file=sys.stderr)
+    session.close()
+    SessionLocal.remove()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=100000)
+    parser.add_argument("--jobs", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10000, help="ranked rows to return")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", default="", help="comma-separated path names")
+    parser.add_argument("--workdir", default="", help="database/index directory (default: a new temp dir)")
+    args = parser.parse_args()
+    print(json.dumps(run(args), indent=2))
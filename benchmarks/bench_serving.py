@@ -0,0 +1,174 @@
+"""
+Concurrent-request load test of the two deployments: gunicorn's threaded workers
+(`gunicorn app:app`, the default) and the ASGI worker (`gunicorn asgi:app` with
+GUNICORN_WORKER_CLASS=asgi and offloaded CPU work).
+
+Each run starts the server against a temporary database, then for --seconds keeps
+  - --clients clients sending back-to-back requests: POST /api/resumes with a fresh
+    resume (skill extraction) and POST /api/extract-resume with a small upload, and
+  - --slow-clients clients uploading a resume over --slow-seconds in small pieces,
+    the way a phone on a poor connection does,
+and reports throughput and latency percentiles of the fast requests, the status
+codes seen (429 = turned away by backpressure) and the slow uploads completed.
+
+    python -m benchmarks.bench_serving --workers 2 --clients 32 --slow-clients 24 --seconds 20
+"""
+import argparse
+import http.client
+import json
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+import numpy as np
+
+from benchmarks.bench_startup import ROOT, _env, _free_port, _get, _seed
+
+DEPLOYMENTS = {
+    "gthread": (["app:app"], {}),
+    "asgi": (["asgi:app"], {"GUNICORN_WORKER_CLASS": "asgi"}),
+}
+
+_SKILLS = ["python", "sql", "docker", "aws", "kubernetes", "react", "java", "go", "spark", "tableau", "flask", "git"]
+
+
+def _resume(rng: random.Random) -> str:
+    skills = ", ".join(rng.sample(_SKILLS, 5))
+    return (f"Engineer {uuid.uuid4().hex}\nBuilt services with {skills}. " * 20).strip()
+
+
+def _multipart(text: str) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"resume.txt\"\r\n"
+            f"Content-Type: text/plain\r\n\r\n{text}\r\n--{boundary}--\r\n").encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def _fast_client(port: int, deadline: float, seed: int, latencies: list, statuses: Counter, lock) -> None:
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    while time.perf_counter() < deadline:
+        if rng.random() < 0.5:
+            body, ctype = json.dumps({"name": "Load Test", "resume_text": _resume(rng)}).encode(), "application/json"
+            path = "/api/resumes"
+        else:
+            body, ctype = _multipart(_resume(rng))
+            path = "/api/extract-resume"
+        started = time.perf_counter()
+        try:
+            conn.request("POST", path, body=body, headers={"Content-Type": ctype})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+            retry_after = float(response.getheader("Retry-After") or 0)
+            if response.getheader("Connection", "").lower() == "close":
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            status, retry_after = "error", 0.0
+        elapsed = time.perf_counter() - started
+        with lock:
+            statuses[status] += 1
+            if status in (200, 201):
+                latencies.append(elapsed)
+        if status == 429:
+            time.sleep(retry_after)
+    conn.close()
+
+
+def _slow_client(port: int, deadline: float, slow_seconds: float, seed: int, done: Counter, lock) -> None:
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        body, ctype = _multipart(_resume(rng))
+        pieces = [body[i:i + 256] for i in range(0, len(body), 256)]
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=60) as sock:
+                sock.sendall((f"POST /api/extract-resume HTTP/1.1\r\nHost: localhost\r\nContent-Type: {ctype}\r\n"
+                              f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode())
+                for piece in pieces:
+                    sock.sendall(piece)
+                    time.sleep(slow_seconds / len(pieces))
+                status = sock.makefile("rb").readline().split()[1].decode()
+        except (OSError, IndexError):
+            status = "error"
+        with lock:
+            done[status] += 1
+
+
+def run_load(deployment: str, workers: int, clients: int, slow_clients: int, seconds: float,
+             slow_seconds: float, timeout: float = 120) -> dict:
+    app_args, extra_env = DEPLOYMENTS[deployment]
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(tmp, **extra_env)
+        _seed(env)
+        port = _free_port()
+        proc = subprocess.Popen([sys.executable, "-m", "gunicorn", *app_args, "-c", "gunicorn.conf.py",
+                                 "--workers", str(workers), "--bind", f"127.0.0.1:{port}", "--timeout", "120"],
+                                env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            started = time.perf_counter()
+            while time.perf_counter() - started < timeout:
+                try:
+                    if _get(f"http://127.0.0.1:{port}/ready", timeout=1) == 200:
+                        break
+                except OSError:
+                    pass
+                time.sleep(0.1)
+            else:
+                raise RuntimeError(f"{deployment} server did not become ready")
+
+            latencies: list[float] = []
+            statuses: Counter = Counter()
+            slow_done: Counter = Counter()
+            lock = threading.Lock()
+            deadline = time.perf_counter() + seconds
+            threads = [threading.Thread(target=_slow_client, args=(port, deadline, slow_seconds, i, slow_done, lock))
+                       for i in range(slow_clients)]
+            threads += [threading.Thread(target=_fast_client, args=(port, deadline, 1000 + i, latencies, statuses, lock))
+                        for i in range(clients)]
+            began = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - began
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "deployment": deployment,
+        "workers": workers,
+        "clients": clients,
+        "slow_clients": slow_clients,
+        "seconds": round(elapsed, 1),
+        "succeeded_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 1),
+        "p90_ms": round(float(np.percentile(ms, 90)), 1),
+        "p99_ms": round(float(np.percentile(ms, 99)), 1),
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=str)},
+        "slow_uploads": {str(k): v for k, v in sorted(slow_done.items(), key=str)},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--clients", type=int, default=32, help="clients sending back-to-back requests")
+    parser.add_argument("--slow-clients", type=int, default=24, help="clients trickling uploads")
+    parser.add_argument("--slow-seconds", type=float, default=3.0, help="seconds each slow upload takes")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--only", choices=sorted(DEPLOYMENTS))
+    args = parser.parse_args()
+
+    report = [run_load(name, args.workers, args.clients, args.slow_clients, args.seconds, args.slow_seconds)
+              for name in sorted(DEPLOYMENTS) if args.only in (None, name)]
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,175 @@
+"""
+Cold start and per-worker memory of the web app.
+
+Measures, each in fresh subprocesses against a temporary database:
+  - import: seconds to `import app` (heavy libraries are loaded lazily)
+  - first request: latency of the first POST /api/resumes and GET /api/match in a
+    new process, lazily and after warm_up()
+  - gunicorn: RSS, PSS and private (USS) memory of the master and each worker with
+    GUNICORN_PRELOAD on and off, after every worker has served requests. PSS splits
+    shared pages between the processes mapping them, so its sum is the real total.
+
+    python benchmarks/bench_startup.py --workers 4 --runs 5
+
+The gunicorn measurement reads /proc/<pid>/smaps_rollup and needs Linux.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+
+_FIRST_REQUEST = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+from db import init_db
+init_db()
+import app
+if {warm}:
+    from services.warmup_service import warm_up
+    warm_up()
+client = app.app.test_client()
+t = time.perf_counter()
+r = client.post("/api/resumes", json={{"name": "Ada", "email": "ada@example.com",
+                "resume_text": "Python developer with Flask, SQL, Docker and AWS " + str(time.time_ns())}})
+resume = time.perf_counter() - t
+t = time.perf_counter()
+client.get("/api/match?candidate_id=1&job_id=1")
+match = time.perf_counter() - t
+print(json.dumps({{"resume": resume, "match": match}}))
+"""
+
+
+def _env(tmp: str, **extra) -> dict:
+    return dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                INDEX_DIR=os.path.join(tmp, "index"), CACHE_PATH="", PYTHONPATH=ROOT, **extra)
+
+
+def _seed(env: dict) -> None:
+    code = ("from db import init_db, unit_of_work; init_db()\n"
+            "from services.job_service import create_job\n"
+            "with unit_of_work() as s: create_job(s, 'Engineer', 'Python and SQL services', ['python', 'sql'])")
+    subprocess.check_call([sys.executable, "-c", code], env=env, cwd=ROOT)
+
+
+def measure_import(runs: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(tmp)
+        times = [float(subprocess.check_output([sys.executable, "-c", _IMPORT], env=env, cwd=ROOT, text=True))
+                 for _ in range(runs)]
+    return {"median_seconds": round(statistics.median(times), 3), "min_seconds": round(min(times), 3)}
+
+
+def measure_first_request(runs: int) -> dict:
+    results = {}
+    for warm in (False, True):
+        samples = []
+        for _ in range(runs):
+            with tempfile.TemporaryDirectory() as tmp:
+                env = _env(tmp)
+                _seed(env)
+                code = _FIRST_REQUEST.format(root=ROOT, warm=warm)
+                samples.append(json.loads(subprocess.check_output([sys.executable, "-c", code], env=env,
+                                                                  cwd=ROOT, text=True).splitlines()[-1]))
+        results["warm" if warm else "lazy"] = {
+            key: round(statistics.median(s[key] for s in samples) * 1000, 1) for key in ("resume", "match")
+        }
+    return {"first_request_ms": results}
+
+
+def _memory_kb(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss_mb": round(fields.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(fields.get("Pss", 0) / 1024, 1),
+        "uss_mb": round((fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024, 1),
+    }
+
+
+def _children(pid: int) -> list[int]:
+    with open(f"/proc/{pid}/task/{pid}/children", encoding="ascii") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url: str, timeout: float = 5) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as r:
+            r.read()
+            return r.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def measure_gunicorn(workers: int, preload: bool, requests: int = 50, timeout: float = 120) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(tmp, GUNICORN_PRELOAD="1" if preload else "0")
+        _seed(env)
+        port = _free_port()
+        base = f"http://127.0.0.1:{port}"
+        started = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "app:app", "-c", "gunicorn.conf.py",
+                                 "--workers", str(workers), "--bind", f"127.0.0.1:{port}"],
+                                env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            ready = None
+            while time.perf_counter() - started < timeout:
+                try:
+                    if _get(f"{base}/ready", timeout=1) == 200:
+                        ready = time.perf_counter() - started
+                        break
+                except OSError:
+                    pass
+                time.sleep(0.05)
+            if ready is None:
+                raise RuntimeError("gunicorn did not become ready")
+            # Spread traffic over the workers so each has run the hot paths
+            for i in range(requests * workers):
+                _get(f"{base}/api/match?candidate_id=1&job_id=1")
+                _get(f"{base}/api/recommendations?candidate_id=1&k=5")
+            master = _memory_kb(proc.pid)
+            per_worker = [_memory_kb(pid) for pid in _children(proc.pid)]
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+    return {
+        "preload": preload,
+        "workers": len(per_worker),
+        "seconds_to_ready": round(ready, 2),
+        "master": master,
+        "per_worker_mean": {key: round(statistics.mean(w[key] for w in per_worker), 1) for key in master},
+        "total_pss_mb": round(master["pss_mb"] + sum(w["pss_mb"] for w in per_worker), 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="subprocess runs per import/first-request sample")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-gunicorn", action="store_true")
+    args = parser.parse_args()
+
+    report = {"import": measure_import(args.runs), **measure_first_request(args.runs)}
+    if not args.skip_gunicorn:
+        report["gunicorn"] = [measure_gunicorn(args.workers, preload) for preload in (False, True)]
+    print(json.dumps(report, indent=2))
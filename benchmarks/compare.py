@@ -0,0 +1,57 @@
+"""
+Compare two benchmark reports written by benchmarks.run.
+
+    python -m benchmarks.compare base.json new.json --threshold 15
+
+Prints the p50/p99 change per benchmark and exits with status 1 if any p50
+latency got worse by more than --threshold percent.
+"""
+import argparse
+import json
+import sys
+
+
+def _pct(old: float, new: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+
+def compare(base: dict, new: dict, threshold: float) -> tuple[list[dict], list[str]]:
+    base_results = {r["name"]: r for r in base["results"]}
+    rows, regressions = [], []
+    for result in new["results"]:
+        old = base_results.get(result["name"])
+        if old is None:
+            continue
+        row = {
+            "name": result["name"],
+            "p50_ms": (old["p50_ms"], result["p50_ms"], round(_pct(old["p50_ms"], result["p50_ms"]), 1)),
+            "p99_ms": (old["p99_ms"], result["p99_ms"], round(_pct(old["p99_ms"], result["p99_ms"]), 1)),
+            "peak_alloc_mb": (old["peak_alloc_mb"], result["peak_alloc_mb"]),
+        }
+        rows.append(row)
+        if row["p50_ms"][2] > threshold:
+            regressions.append(result["name"])
+    return rows, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed p50 slowdown in percent")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    rows, regressions = compare(base, new, args.threshold)
+    print(f"base {base['meta'].get('commit') or '?'}  ->  new {new['meta'].get('commit') or '?'}")
+    for row in rows:
+        old50, new50, d50 = row["p50_ms"]
+        old99, new99, d99 = row["p99_ms"]
+        flag = "  REGRESSION" if row["name"] in regressions else ""
+        print(f"{row['name']:24} p50 {old50:>9.3f} -> {new50:>9.3f} ms ({d50:+.1f}%)  "
+              f"p99 {old99:>9.3f} -> {new99:>9.3f} ms ({d99:+.1f}%){flag}")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,57 @@
+"""
+Timing and memory measurement shared by the benchmark runner
+"""
+import gc
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+import numpy as np
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def measure(name: str, fn: Callable[[int], object], iterations: int, warmup: int = 3,
+            items_per_call: int = 1) -> dict:
+    """
+    Call fn(i) `iterations` times and report latency percentiles, throughput and
+    memory. Peak memory is the largest Python allocation during one extra traced
+    call (tracemalloc slows code down, so it is kept out of the timed calls).
+    """
+    for i in range(warmup):
+        fn(i)
+    gc.collect()
+
+    latencies = np.empty(iterations)
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(warmup + i)
+        latencies[i] = time.perf_counter() - t0
+    total = time.perf_counter() - started
+
+    tracemalloc.start()
+    fn(warmup + iterations)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ms = latencies * 1000
+    return {
+        "name": name,
+        "iterations": iterations,
+        "items_per_call": items_per_call,
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "throughput_per_sec": round(iterations * items_per_call / total, 1) if total > 0 else None,
+        "peak_alloc_mb": round(peak / (1024 * 1024), 3),
+        "max_rss_mb": round(_max_rss_mb(), 1),
+    }
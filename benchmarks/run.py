@@ -0,0 +1,219 @@
+"""
+Benchmark the hot paths and endpoints against a synthetic corpus.
+
+    python -m benchmarks.run --candidates 1000 --jobs 100 --out bench.json
+    python -m benchmarks.run --candidates 100000 --jobs 10000 --workdir /tmp/bench --only recommend_jobs
+
+The corpus is written to a fresh SQLite database under --workdir (reused on later
+runs with the same --workdir, so large corpora are only generated once). Results
+are printed and optionally written as JSON; compare two runs with
+`python -m benchmarks.compare base.json new.json`.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _configure(workdir: str) -> None:
+    # Must run before anything imports config
+    os.makedirs(workdir, exist_ok=True)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["INDEX_DIR"] = os.path.join(workdir, "index")
+    # No persistent parse cache, so repeated runs measure parsing rather than cache reads
+    os.environ["CACHE_PATH"] = ""
+    sys.path.insert(0, ROOT)
+
+
+def populate(n_candidates: int, n_jobs: int, seed: int, chunk: int = 1000) -> dict:
+    """Insert the synthetic corpus up to the requested size; returns ingest throughput."""
+    from sqlalchemy import func
+    from benchmarks import synthetic
+    from db import SessionLocal, init_db, unit_of_work
+    from models import Candidate, Job
+    from services.feature_service import revectorize
+    from services.job_service import create_jobs
+    from services.resume_service import create_candidates
+
+    init_db()
+    with SessionLocal() as session:
+        have_cands = session.query(func.count(Candidate.id)).scalar()
+        have_jobs = session.query(func.count(Job.id)).scalar()
+
+    skills = synthetic.load_skills()
+    stats = {"candidates": n_candidates, "jobs": n_jobs}
+    started = time.perf_counter()
+    batch = []
+    for i, job in enumerate(synthetic.jobs(n_jobs, seed=seed + 1, skills=skills)):
+        if i < have_jobs:
+            continue
+        batch.append((job["title"], job["description"], job["required_skills"]))
+        if len(batch) >= chunk:
+            with unit_of_work() as session:
+                create_jobs(session, batch)
+            batch = []
+    if batch:
+        with unit_of_work() as session:
+            create_jobs(session, batch)
+    stats["jobs_per_sec"] = round((n_jobs - have_jobs) / max(time.perf_counter() - started, 1e-9), 1)
+
+    started = time.perf_counter()
+    batch = []
+    for i, res in enumerate(synthetic.resumes(n_candidates, seed=seed, skills=skills)):
+        if i < have_cands:
+            continue
+        # Make every resume unique so deduplication does not skip any
+        batch.append((res["name"], res["email"], f"{res['resume_text']}\nRef {i}"))
+        if len(batch) >= chunk:
+            with unit_of_work() as session:
+                create_candidates(session, batch)
+            batch = []
+    if batch:
+        with unit_of_work() as session:
+            create_candidates(session, batch)
+    stats["candidates_per_sec"] = round((n_candidates - have_cands) / max(time.perf_counter() - started, 1e-9), 1)
+
+    started = time.perf_counter()
+    with SessionLocal() as session:
+        revectorize(session)
+    stats["revectorize_seconds"] = round(time.perf_counter() - started, 3)
+    SessionLocal.remove()
+    return stats
+
+
+def build_benchmarks(args) -> dict:
+    """name -> (fn(i), items_per_call); inputs are drawn from a seeded RNG"""
+    from benchmarks import synthetic
+    from db import SessionLocal
+    from models import Candidate, Job
+    from nlp.matching import cosine_match_score
+    from nlp.skills import extract_skills, extract_skills_batch
+    from services.feature_service import get_feature_space
+    from services.match_service import match_candidate_job, rank_candidates, recommend_jobs
+    from services.index_service import get_candidate_index, get_job_index
+    import app as app_module
+
+    rng = random.Random(args.seed)
+    skills = synthetic.load_skills()
+    text_rng = random.Random(args.seed + 2)
+
+    def fresh_resume(i: int) -> str:
+        # A new text every call, so the skills cache never hits
+        return synthetic.generate_resume(text_rng, skills)["resume_text"] + f"\nRun {time.time_ns()} {i}"
+
+    with SessionLocal() as session:
+        max_cand = session.query(Candidate.id).order_by(Candidate.id.desc()).limit(1).scalar() or 0
+        max_job = session.query(Job.id).order_by(Job.id.desc()).limit(1).scalar() or 0
+        # Load the search indexes outside the timed region
+        get_job_index(session)
+        get_candidate_index(session)
+    SessionLocal.remove()
+    client = app_module.app.test_client()
+    job_texts = [j["description"] for j in synthetic.jobs(50, seed=args.seed + 3, skills=skills)]
+    space = get_feature_space()
+    vectorizer = space.vectorizer if space is not None else None
+
+    def with_session(fn):
+        def run(i):
+            with SessionLocal() as session:
+                return fn(session, i)
+        return run
+
+    def bulk_upload(i):
+        files = [(io.BytesIO(fresh_resume(i * 1000 + k).encode()), f"resume_{k}.txt") for k in range(args.bulk_files)]
+        data = {"title": "Benchmark", "description": job_texts[i % len(job_texts)],
+                "required_skills": ",".join(rng.sample(skills, 5)), "resume_files": files}
+        return client.post("/api/bulk-match", data=data, content_type="multipart/form-data")
+
+    pairs = lambda n: [{"candidate_id": rng.randint(1, max_cand), "job_id": rng.randint(1, max_job)} for _ in range(n)]
+
+    return {
+        "extract_skills": (lambda i: extract_skills(fresh_resume(i)), 1),
+        "extract_skills_batch": (lambda i: extract_skills_batch([fresh_resume(i * 100 + k) for k in range(100)]), 100),
+        "cosine_match_score": (lambda i: cosine_match_score(fresh_resume(i), job_texts[i % len(job_texts)]), 1),
+        "cosine_match_score_frozen": (lambda i: cosine_match_score(
+            fresh_resume(i), job_texts[i % len(job_texts)], vectorizer=vectorizer), 1),
+        "match_candidate_job": (with_session(
+            lambda s, i: match_candidate_job(s, rng.randint(1, max_cand), rng.randint(1, max_job))), 1),
+        "recommend_jobs": (with_session(lambda s, i: recommend_jobs(s, rng.randint(1, max_cand), top_k=5)), 1),
+        "rank_candidates": (with_session(lambda s, i: list(rank_candidates(s, rng.randint(1, max_job), top_k=10))), 1),
+        "rank_candidates_min_match": (with_session(lambda s, i: list(rank_candidates(
+            s, rng.randint(1, max_job), top_k=10, min_match=2))), 1),
+        "api_match": (lambda i: client.get(
+            f"/api/match?candidate_id={rng.randint(1, max_cand)}&job_id={rng.randint(1, max_job)}"), 1),
+        "api_match_batch": (lambda i: client.post("/api/match:batch", json=pairs(100)), 100),
+        "api_recommendations": (lambda i: client.get(
+            f"/api/recommendations?candidate_id={rng.randint(1, max_cand)}&k=5"), 1),
+        "api_top_candidates": (lambda i: client.get(f"/api/jobs/{rng.randint(1, max_job)}/top-candidates?k=10"), 1),
+        "api_bulk_match": (bulk_upload, args.bulk_files),
+    }
+
+
+# Slow benchmarks get fewer iterations
+_ITERATION_SCALE = {"api_bulk_match": 0.05, "extract_skills_batch": 0.1, "api_match_batch": 0.25}
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=1000)
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--bulk-files", type=int, default=50, help="resumes per /api/bulk-match call")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", default="", help="comma-separated benchmark names")
+    parser.add_argument("--workdir", default="", help="database/index directory (default: a new temp dir)")
+    parser.add_argument("--out", default="", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    _configure(args.workdir or tempfile.mkdtemp(prefix="resume-bench-"))
+    from benchmarks.harness import measure
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+        },
+        "populate": populate(args.candidates, args.jobs, args.seed),
+        "results": [],
+    }
+    only = {name.strip() for name in args.only.split(",") if name.strip()}
+    for name, (fn, items) in build_benchmarks(args).items():
+        if only and name not in only:
+            continue
+        iterations = max(3, int(args.iterations * _ITERATION_SCALE.get(name, 1)))
+        result = measure(name, fn, iterations, items_per_call=items)
+        report["results"].append(result)
+        print(f"{name:24} p50 {result['p50_ms']:>9.3f} ms  p99 {result['p99_ms']:>9.3f} ms  "
+              f"{result['throughput_per_sec']:>10} items/s  peak {result['peak_alloc_mb']:.1f} MB", file=sys.stderr)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Synthetic resumes and job postings built from the skill vocabulary in data/skills.csv.
+
+Generation is deterministic for a given seed and streams one document at a time,
+so large corpora never have to be held in memory.
+"""
+import csv
+import os
+import random
+from typing import Iterator
+
+SKILLS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "skills.csv")
+
+FIRST_NAMES = ["Ada", "Alan", "Grace", "Linus", "Margaret", "Dennis", "Barbara", "Ken", "Frances", "Guido",
+               "Radia", "Bjarne", "Karen", "James", "Hedy", "Tim", "Edsger", "Donald", "Sophie", "John"]
+LAST_NAMES = ["Lovelace", "Turing", "Hopper", "Torvalds", "Hamilton", "Ritchie", "Liskov", "Thompson",
+              "Allen", "Rossum", "Perlman", "Stroustrup", "Jones", "Gosling", "Lamarr", "Berners-Lee",
+              "Dijkstra", "Knuth", "Wilson", "McCarthy"]
+ROLES = ["Software Engineer", "Data Scientist", "Backend Developer", "Frontend Developer", "DevOps Engineer",
+         "Machine Learning Engineer", "Data Engineer", "Full Stack Developer", "Site Reliability Engineer"]
+FILLER = [
+    "Delivered features end to end in a cross-functional team.",
+    "Improved reliability and reduced latency of production services.",
+    "Mentored junior engineers and led code reviews.",
+    "Designed data pipelines and reporting dashboards.",
+    "Worked closely with product managers to refine requirements.",
+    "Automated testing and deployment workflows.",
+    "Migrated legacy systems to a modern architecture.",
+]
+
+
+def load_skills(path: str = SKILLS_PATH) -> list[str]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return sorted({row[0].strip().lower() for row in csv.reader(f) if row and row[0].strip()})
+
+
+def generate_resume(rng: random.Random, skills: list[str], min_skills: int = 4, max_skills: int = 15) -> dict:
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    picked = rng.sample(skills, rng.randint(min_skills, min(max_skills, len(skills))))
+    lines = [
+        f"{first} {last}",
+        f"{first.lower()}.{last.lower()}{rng.randint(1, 9999)}@example.com",
+        f"{rng.choice(ROLES)} with {rng.randint(1, 15)} years of experience.",
+        "Skills: " + ", ".join(picked),
+    ]
+    for _ in range(rng.randint(3, 8)):
+        used = rng.sample(picked, min(3, len(picked)))
+        lines.append(f"{rng.choice(FILLER)} Used {', '.join(used)}.")
+    return {"name": f"{first} {last}", "email": lines[1], "resume_text": "\n".join(lines)}
+
+
+def generate_job(rng: random.Random, skills: list[str], min_skills: int = 3, max_skills: int = 8) -> dict:
+    role = rng.choice(ROLES)
+    required = rng.sample(skills, rng.randint(min_skills, min(max_skills, len(skills))))
+    extra = rng.sample(skills, 3)
+    description = (
+        f"We are hiring a {role}. You will build and operate services using {', '.join(required)}. "
+        f"Experience with {', '.join(extra)} is a plus. {rng.choice(FILLER)}"
+    )
+    return {"title": role, "description": description, "required_skills": required}
+
+
+def resumes(n: int, seed: int = 0, skills: list[str] | None = None) -> Iterator[dict]:
+    rng = random.Random(seed)
+    skills = skills or load_skills()
+    for _ in range(n):
+        yield generate_resume(rng, skills)
+
+
+def jobs(n: int, seed: int = 1, skills: list[str] | None = None) -> Iterator[dict]:
+    rng = random.Random(seed)
+    skills = skills or load_skills()
+    for _ in range(n):
+        yield generate_job(rng, skills)
@@ -4,4 +4,104 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///app.db")
+# Connection pool for server databases (e.g. Postgres); per worker process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+# SQLite: WAL lets readers run alongside the single writer; synchronous=NORMAL is safe in WAL mode
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 30000))
+SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", 64))
 SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+SPACY_BATCH_SIZE = int(os.getenv("SPACY_BATCH_SIZE", 32))
+SPACY_N_PROCESS = int(os.getenv("SPACY_N_PROCESS", 1))
+# "fast": tokenizer + phrase matcher; "parser": full spaCy pipeline with lemmas and noun chunks
+SKILL_EXTRACTION = os.getenv("SKILL_EXTRACTION", "fast")
+
+# Bulk matching
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", 1000))
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", os.cpu_count() or 1))
+# Asynchronous bulk batches: background threads per process, files per committed chunk,
+# and seconds without progress after which another process may take over a running batch
+BULK_QUEUE_WORKERS = int(os.getenv("BULK_QUEUE_WORKERS", 2))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 16))
+BULK_STALE_SECONDS = int(os.getenv("BULK_STALE_SECONDS", 300))
+
+# Items accepted by one /api/resumes:batch, /api/jobs:batch or /api/match:batch request
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 10000))
+
+# CPU-bound request work (skill extraction, TF-IDF fits): worker processes per server
+# process (0 runs it inline in the request thread; asgi.py defaults it to the CPU count
+# split over WEB_CONCURRENCY), and requests per server process allowed to wait on that
+# work before further ones are turned away with 429
+OFFLOAD_WORKERS = int(os.getenv("OFFLOAD_WORKERS", 0))
+OFFLOAD_MAX_WAITING = int(os.getenv("OFFLOAD_MAX_WAITING", max(4, 4 * OFFLOAD_WORKERS)))
+
+# ASGI mode (asgi.py): threads running the Flask views per server process, and requests
+# whose body has been received that may queue for one before the rest get 429
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", 8))
+ASGI_MAX_QUEUED = int(os.getenv("ASGI_MAX_QUEUED", 32))
+
+# Upload parsing budgets: bytes per uploaded file, PDF pages read per file, seconds per
+# PDF, and pages per worker task when a PDF is split across processes
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_MB", 10)) * 1024 * 1024
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", 50))
+PDF_TIMEOUT_SECONDS = float(os.getenv("PDF_TIMEOUT_SECONDS", 20))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 8))
+
+
+def _default_index_dir() -> str:
+    # Keep search indexes next to the SQLite database file when there is one
+    if DATABASE_URL.startswith("sqlite:///"):
+        db_path = DATABASE_URL[len("sqlite:///"):]
+        if db_path and db_path != ":memory:":
+            return os.path.join(os.path.dirname(db_path) or ".", "index")
+    return "index"
+
+
+INDEX_DIR = os.getenv("INDEX_DIR", _default_index_dir())
+
+# Compiled skill vocabularies (data/skills.csv plus aliases), one JSON file per version;
+# workers check for a newer one (or an edited skills.csv) at most this often
+SKILLS_DIR = os.getenv("SKILLS_DIR", os.path.join(INDEX_DIR, "skills"))
+SKILLS_RELOAD_SECONDS = float(os.getenv("SKILLS_RELOAD_SECONDS", 5))
+
+# Precomputed match features: stored documents needed before the first vocabulary is fitted
+FEATURES_BOOTSTRAP_DOCS = int(os.getenv("FEATURES_BOOTSTRAP_DOCS", 50))
+# Text vectorizer of the vocabulary and search indexes: "tfidf" (a fitted term vocabulary)
+# or "hashing" (terms hashed into HASHING_FEATURES columns, no vocabulary; scores with
+# unit IDF before the first fit). Takes effect at the next revectorize --refit
+TEXT_VECTORIZER = os.getenv("TEXT_VECTORIZER", "tfidf")
+HASHING_FEATURES = int(os.getenv("HASHING_FEATURES", 1 << 16))
+
+# Semantic text similarity (?similarity=semantic): "lsa" (a truncated SVD of the TF-IDF
+# vocabulary, fitted with it), the name of an installed spaCy model with word vectors
+# (e.g. en_core_web_md), or "" to disable; embedding size for lsa; IVF lists probed per query;
+# seconds between checks for re-embedded rows the IVF index is missing
+SEMANTIC_MODEL = os.getenv("SEMANTIC_MODEL", "lsa")
+SEMANTIC_DIM = int(os.getenv("SEMANTIC_DIM", 128))
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", 32))
+ANN_RECOUNT_SECONDS = float(os.getenv("ANN_RECOUNT_SECONDS", 30))
+
+# Match score store (services.match_cache): "0" to disable; in-memory entries per process,
+# and seconds computed scores are buffered before being written to the match_scores table
+MATCH_CACHE = os.getenv("MATCH_CACHE", "1") == "1"
+MATCH_CACHE_ITEMS = int(os.getenv("MATCH_CACHE_ITEMS", 10000))
+MATCH_CACHE_WRITE_DELAY = float(os.getenv("MATCH_CACHE_WRITE_DELAY", 1.0))
+
+# Parse cache: in-memory LRU entries per namespace, backed by a SQLite file ("" for memory only).
+# The file drops entries unused for CACHE_MAX_AGE_DAYS and keeps at most CACHE_MAX_ENTRIES
+# (least recently used go first; 0 disables either bound), pruned every CACHE_PRUNE_SECONDS
+CACHE_MEMORY_ITEMS = int(os.getenv("CACHE_MEMORY_ITEMS", 2048))
+CACHE_PATH = os.getenv("CACHE_PATH", os.path.join(INDEX_DIR, "parse_cache.sqlite3"))
+CACHE_MAX_AGE_DAYS = float(os.getenv("CACHE_MAX_AGE_DAYS", 30))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 200000))
+CACHE_PRUNE_SECONDS = float(os.getenv("CACHE_PRUNE_SECONDS", 300))
+
+# Observability: add a Server-Timing header to every response (clients can also ask per
+# request with "X-Server-Timing: 1"), and profile this fraction of requests into PROFILE_DIR
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
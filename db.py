@@ -1,12 +1,124 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
-from config import DATABASE_URL
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import Session, sessionmaker, scoped_session, declarative_base
+from config import (
+    DATABASE_URL, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_SIZE, DB_POOL_TIMEOUT,
+    SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_MB, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS,
+)
+from metrics import record_stage
 
-engine = create_engine(DATABASE_URL, echo=False, future=True)
+
+def _engine_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        # One file, one writer: the pool only needs to hand each thread its own connection
+        return {"connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+engine = create_engine(DATABASE_URL, echo=False, future=True, **_engine_options(DATABASE_URL))
 SessionLocal = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False))
 Base = declarative_base()
 
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _configure_sqlite(dbapi_connection, connection_record):
+        # Let SQLAlchemy emit BEGIN itself (pysqlite's implicit transactions break
+        # SAVEPOINT and BEGIN IMMEDIATE), then apply the performance pragmas
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _begin_sqlite(conn):
+        # Write transactions take the write lock up front: a deferred transaction that
+        # reads first cannot wait for the lock later and fails with "database is locked"
+        immediate = conn.get_execution_options().get("sqlite_immediate", False)
+        conn.exec_driver_sql("BEGIN IMMEDIATE" if immediate else "BEGIN")
+
+
+# Stage timings for every session: db_flush per flush, db_commit from commit() to done
+# (including the final flush)
+@event.listens_for(Session, "before_flush")
+def _flush_started(session, flush_context, instances):
+    session.info["_flush_started"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _flush_finished(session, flush_context):
+    started = session.info.pop("_flush_started", None)
+    if started is not None:
+        record_stage("db_flush", time.perf_counter() - started)
+
+
+@event.listens_for(Session, "before_commit")
+def _commit_started(session):
+    session.info["_commit_started"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _commit_finished(session):
+    started = session.info.pop("_commit_started", None)
+    if started is not None:
+        record_stage("db_commit", time.perf_counter() - started)
+
+
+def begin_write(session: Session) -> None:
+    """Start the session's next transaction as a write transaction (BEGIN IMMEDIATE on SQLite)."""
+    if not session.in_transaction():
+        session.connection(execution_options={"sqlite_immediate": True})
+
+
+@contextmanager
+def unit_of_work(immediate: bool = True):
+    """
+    A session whose writes are committed once, when the block exits, or rolled back
+    if it raises. Services only flush, so everything done inside the block is one
+    transaction. immediate=False leaves the write lock to the first write, for
+    blocks that do slow work before touching the database.
+    """
+    with SessionLocal() as session:
+        if immediate:
+            begin_write(session)
+        try:
+            yield session
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+
+
 def init_db():
     # Import models to register them with SQLAlchemy's metadata
     import models  # noqa: F401
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+
+
+def _add_missing_columns():
+    """Add nullable columns (and their indexes) introduced after a table was first created."""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        added = [col for col in table.columns if col.name not in existing]
+        if not added:
+            continue
+        with engine.begin() as conn:
+            for col in added:
+                col_type = col.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col_type}"))
+        for index in table.indexes:
+            if any(col.name in {c.name for c in added} for col in index.columns):
+                index.create(bind=engine, checkfirst=True)
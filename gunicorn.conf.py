@@ -0,0 +1,56 @@
+"""
+gunicorn settings, picked up by `gunicorn app:app` from the project directory.
+
+With GUNICORN_PRELOAD=1 (the default) the app, spaCy/scikit-learn and the search
+indexes are loaded once in the master before it forks, so workers start warm and
+share those pages copy-on-write instead of each holding its own copy. With
+GUNICORN_PRELOAD=0 every worker loads them itself before taking requests (needed
+for --reload). Worker count comes from WEB_CONCURRENCY or --workers.
+
+GUNICORN_WORKER_CLASS=asgi with `gunicorn asgi:app` serves through gunicorn's
+asyncio worker instead of threads (see asgi.py).
+"""
+import gc
+import os
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+# The asgi worker runs views on asgi.py's own threads (ASGI_THREADS)
+threads = int(os.getenv("GUNICORN_THREADS", 8)) if worker_class == "gthread" else 1
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+
+def _warm_up(log) -> None:
+    from db import init_db
+    from services.warmup_service import warm_up
+    init_db()
+    try:
+        timings = warm_up()
+    except RuntimeError as e:
+        # Missing model data: start anyway and let requests report the error
+        log.warning("Warm-up failed: %s", e)
+        return
+    log.info("Warm-up took %.2fs: %s", sum(timings.values()), timings)
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from db import engine
+    _warm_up(server.log)
+    # Connections must not be shared with the forked workers
+    engine.dispose()
+    # Keep the collector from touching (and so copying) the objects loaded so far
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from db import engine
+    engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        _warm_up(worker.log)
+    # Offload processes belong to this worker (a no-op unless OFFLOAD_WORKERS is set)
+    import offload
+    offload.start()
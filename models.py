@@ -1,9 +1,34 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Float, ForeignKey, Index, Integer, LargeBinary, String, Table, Text, delete, event, inspect
 from sqlalchemy.sql import func
 from sqlalchemy.types import DateTime
 from db import Base
 import json
 
+class Skill(Base):
+    __tablename__ = "skills"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(128), nullable=False, unique=True)
+
+
+# Normalised copies of Candidate.skills / Job.required_skills for SQL-side filtering.
+# The composite primary keys serve lookups by owner; the extra indexes serve lookups by skill.
+candidate_skills = Table(
+    "candidate_skills",
+    Base.metadata,
+    Column("candidate_id", Integer, ForeignKey("candidates.id"), primary_key=True),
+    Column("skill_id", Integer, ForeignKey("skills.id"), primary_key=True),
+    Index("ix_candidate_skills_skill_candidate", "skill_id", "candidate_id"),
+)
+
+job_skills = Table(
+    "job_skills",
+    Base.metadata,
+    Column("job_id", Integer, ForeignKey("jobs.id"), primary_key=True),
+    Column("skill_id", Integer, ForeignKey("skills.id"), primary_key=True),
+    Index("ix_job_skills_skill_job", "skill_id", "job_id"),
+)
+
+
 class Candidate(Base):
     __tablename__ = "candidates"
     id = Column(Integer, primary_key=True)
@@ -11,6 +36,18 @@ class Candidate(Base):
     email = Column(String(256), nullable=True)
     resume_text = Column(Text, nullable=False)
     skills_json = Column(Text, nullable=False, default="[]")
+    # Skill vocabulary version the skills were extracted with (nlp.vocabulary)
+    skills_version = Column(String(12), nullable=True, index=True)
+    # sha256 of the whitespace-normalised resume text, used to deduplicate uploads
+    content_hash = Column(String(64), nullable=True, index=True)
+    # Packed TF-IDF vector + skill bitset (nlp.features) and the vocabulary version it was encoded with
+    features = Column(LargeBinary, nullable=True)
+    features_version = Column(String(16), nullable=True, index=True)
+    # float32 semantic embedding (nlp.embeddings) and the embedder version it came from
+    embedding = Column(LargeBinary, nullable=True)
+    embedding_version = Column(String(16), nullable=True, index=True)
+    # Bumped whenever the resume text or skills change; cached match scores carry the one they were computed at
+    revision = Column(Integer, nullable=True, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     @property
@@ -30,6 +67,12 @@ class Job(Base):
     title = Column(String(256), nullable=False)
     description = Column(Text, nullable=False)
     required_skills_json = Column(Text, nullable=False, default="[]")
+    features = Column(LargeBinary, nullable=True)
+    features_version = Column(String(16), nullable=True, index=True)
+    embedding = Column(LargeBinary, nullable=True)
+    embedding_version = Column(String(16), nullable=True, index=True)
+    # Bumped whenever the description or required skills change (see Candidate.revision)
+    revision = Column(Integer, nullable=True, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     @property
@@ -42,3 +85,77 @@ class Job(Base):
     @required_skills.setter
     def required_skills(self, value):
         self.required_skills_json = json.dumps(value or [])
+
+
+class MatchScore(Base):
+    """
+    A /api/match result computed under one scoring version (services.match_cache).
+    Only valid while both rows are still at the revisions it was computed at.
+    """
+    __tablename__ = "match_scores"
+    candidate_id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, primary_key=True, index=True)
+    version = Column(String(64), primary_key=True)
+    candidate_revision = Column(Integer, nullable=False, default=0)
+    job_revision = Column(Integer, nullable=False, default=0)
+    result_json = Column(Text, nullable=False)
+
+
+def _invalidate_matches_on_change(model, owner_column, watched: tuple[str, ...]) -> None:
+    # Changing what a row is scored on bumps its revision (so every process's cached
+    # scores for it stop matching) and drops its stored scores in the same transaction
+    @event.listens_for(model, "before_update")
+    def _bump_revision(mapper, connection, target):
+        state = inspect(target)
+        if any(state.attrs[name].history.has_changes() for name in watched):
+            target.revision = (target.revision or 0) + 1
+            connection.execute(delete(MatchScore.__table__).where(owner_column == target.id))
+
+
+_invalidate_matches_on_change(Candidate, MatchScore.candidate_id, ("resume_text", "skills_json"))
+_invalidate_matches_on_change(Job, MatchScore.job_id, ("description", "required_skills_json"))
+
+
+class BulkBatch(Base):
+    """An asynchronous bulk-match run; its uploads are queued as BulkItem rows."""
+    __tablename__ = "bulk_batches"
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, nullable=False)
+    status = Column(String(16), nullable=False, default="queued", index=True)  # queued, running, done, failed
+    total_files = Column(Integer, nullable=False, default=0)
+    processed_files = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped after every processed chunk; a stale running batch can be claimed again
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class BulkItem(Base):
+    __tablename__ = "bulk_items"
+    id = Column(Integer, primary_key=True)
+    batch_id = Column(Integer, ForeignKey("bulk_batches.id"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    filename = Column(String(512), nullable=False)
+    data = Column(LargeBinary, nullable=True)  # cleared once processed
+    status = Column(String(16), nullable=False, default="pending")  # pending, done, failed
+    error = Column(Text, nullable=True)
+
+
+class BulkResult(Base):
+    __tablename__ = "bulk_results"
+    id = Column(Integer, primary_key=True)
+    batch_id = Column(Integer, ForeignKey("bulk_batches.id"), nullable=False, index=True)
+    candidate_id = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+    result_json = Column(Text, nullable=False)
+
+    @property
+    def result(self):
+        try:
+            return json.loads(self.result_json or "{}")
+        except Exception:
+            return {}
+
+    @result.setter
+    def result(self, value):
+        self.result_json = json.dumps(value or {})
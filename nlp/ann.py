@@ -0,0 +1,175 @@
+"""
+Inverted-file (IVF) index for approximate top-k search over L2-normalised
+float32 vectors, in numpy.
+
+Vectors are clustered with spherical k-means into about sqrt(n) lists and stored
+grouped by list, so a query scores only the vectors of its `nprobe` closest
+lists, each a contiguous slice of a memory-mapped .npy file. Vectors added after
+the build are kept in memory and scanned exhaustively until the next rebuild.
+"""
+from __future__ import annotations
+import os
+from typing import Iterable, Tuple
+import numpy as np
+from scipy import sparse
+from .embeddings import normalize_rows
+
+# Below this many vectors a single list (exact search) is as fast as probing
+MIN_CLUSTERED = 2048
+# Vectors per list used to train the centroids
+TRAIN_PER_LIST = 64
+
+
+def _kmeans(sample: np.ndarray, n_lists: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        members = sparse.csr_matrix((np.ones(len(labels), dtype=np.float32), (labels, np.arange(len(labels)))),
+                                    shape=(n_lists, len(sample)))
+        sums = np.asarray(members @ sample)
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IvfIndex:
+    REBUILD_RATIO = 0.2
+
+    def __init__(self, vectors: np.ndarray, ids: np.ndarray, centroids: np.ndarray, offsets: np.ndarray,
+                 version: str = "", synced_id: int = 0):
+        self.vectors = vectors
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.version = version
+        # Every embedded row with an id <= synced_id is in the index
+        self.synced_id = synced_id
+        self._sorted = np.argsort(self.ids, kind="stable")
+        self._pending_ids: list[int] = []
+        self._pending_vectors: list[np.ndarray] = []
+
+    @classmethod
+    def build(cls, ids: np.ndarray, vectors: np.ndarray, version: str = "", out_path: str | None = None,
+              iterations: int = 10, seed: int = 0, chunk_size: int = 65536) -> "IvfIndex":
+        """
+        Cluster `vectors` (which may be a memmap) and lay them out by list, in
+        chunks; with out_path the layout is written to that .npy file and mapped.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        n, dim = len(ids), (vectors.shape[1] if vectors.ndim == 2 else 0)
+        rng = np.random.default_rng(seed)
+        n_lists = 1 if n < MIN_CLUSTERED else int(np.sqrt(n))
+        if n_lists == 1:
+            centroids = np.zeros((1, dim), dtype=np.float32)
+            labels = np.zeros(n, dtype=np.int64)
+        else:
+            sample_rows = np.sort(rng.choice(n, min(n, n_lists * TRAIN_PER_LIST), replace=False))
+            centroids = _kmeans(np.asarray(vectors[sample_rows], dtype=np.float32), n_lists, iterations, rng)
+            labels = np.concatenate([
+                np.argmax(np.asarray(vectors[start:start + chunk_size]) @ centroids.T, axis=1)
+                for start in range(0, n, chunk_size)
+            ])
+        order = np.argsort(labels, kind="stable")
+        offsets = np.searchsorted(labels[order], np.arange(n_lists + 1))
+
+        if out_path is not None:
+            laid_out = np.lib.format.open_memmap(out_path, mode="w+", dtype=np.float32, shape=(n, dim))
+        else:
+            laid_out = np.empty((n, dim), dtype=np.float32)
+        for start in range(0, n, chunk_size):
+            rows = order[start:start + chunk_size]
+            # Gather in increasing row order so a memmapped source is read sequentially
+            by_row = np.argsort(rows)
+            laid_out[start + by_row] = vectors[rows[by_row]]
+        if out_path is not None:
+            laid_out.flush()
+            del laid_out
+            laid_out = np.load(out_path, mmap_mode="r")
+        synced_id = int(ids.max()) if n else 0
+        return cls(laid_out, ids[order], centroids, offsets, version=version, synced_id=synced_id)
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self._pending_ids)
+
+    @property
+    def needs_rebuild(self) -> bool:
+        return len(self._pending_ids) > self.REBUILD_RATIO * max(len(self.ids), MIN_CLUSTERED)
+
+    def add(self, doc_id: int, vector: np.ndarray) -> None:
+        self._pending_ids.append(doc_id)
+        self._pending_vectors.append(np.asarray(vector, dtype=np.float32))
+
+    def _lists(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        n_lists = len(self.centroids)
+        if nprobe >= n_lists:
+            return np.arange(n_lists)
+        return np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+
+    def search(self, query: np.ndarray, k: int, nprobe: int = 8) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k (ids, cosine similarities), best first."""
+        query = np.asarray(query, dtype=np.float32)
+        ids, sims = [], []
+        for lst in self._lists(query, nprobe):
+            start, stop = self.offsets[lst], self.offsets[lst + 1]
+            if stop > start:
+                ids.append(self.ids[start:stop])
+                sims.append(np.asarray(self.vectors[start:stop]) @ query)
+        if self._pending_ids:
+            ids.append(np.asarray(self._pending_ids, dtype=np.int64))
+            sims.append(np.stack(self._pending_vectors) @ query)
+        if not ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        ids, sims = np.concatenate(ids), np.concatenate(sims)
+        if len(sims) > k:
+            keep = np.argpartition(-sims, k - 1)[:k]
+            ids, sims = ids[keep], sims[keep]
+        order = np.argsort(-sims, kind="stable")
+        return ids[order], sims[order]
+
+    def similarity(self, doc_ids: Iterable[int], query: np.ndarray) -> np.ndarray:
+        """Exact cosine similarity of `query` to each of doc_ids (0 for ids not in the index)."""
+        doc_ids = np.asarray(list(doc_ids), dtype=np.int64)
+        query = np.asarray(query, dtype=np.float32)
+        sims = np.zeros(len(doc_ids), dtype=np.float32)
+        if len(self.ids) and len(doc_ids):
+            pos = np.searchsorted(self.ids, doc_ids, sorter=self._sorted)
+            pos = np.minimum(pos, len(self.ids) - 1)
+            rows = self._sorted[pos]
+            found = self.ids[rows] == doc_ids
+            if found.any():
+                sims[found] = np.asarray(self.vectors[rows[found]]) @ query
+        if self._pending_ids:
+            pending = {doc_id: i for i, doc_id in enumerate(self._pending_ids)}
+            for i, doc_id in enumerate(doc_ids.tolist()):
+                if doc_id in pending:
+                    sims[i] = float(self._pending_vectors[pending[doc_id]] @ query)
+        return sims
+
+    def save(self, directory: str, name: str) -> None:
+        """
+        Write the ids and list layout next to the vectors, which must be a .npy file
+        in `directory` written by build(out_path=...). Every build writes a new
+        vectors file, so processes still mapping the previous one are unaffected.
+        """
+        vectors_file = os.path.basename(getattr(self.vectors, "filename", None) or "")
+        if not vectors_file:
+            raise ValueError("IvfIndex.save needs vectors built with out_path")
+        path = os.path.join(directory, f"{name}.ivf.npz")
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, ids=self.ids, centroids=self.centroids, offsets=self.offsets, vectors=np.array(vectors_file),
+                     version=np.array(self.version), synced_id=np.array(self.synced_id))
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, directory: str, name: str) -> "IvfIndex | None":
+        path = os.path.join(directory, f"{name}.ivf.npz")
+        try:
+            with np.load(path) as meta:
+                vectors = np.load(os.path.join(directory, str(meta["vectors"])), mmap_mode="r")
+                if len(vectors) != len(meta["ids"]):
+                    return None
+                return cls(vectors, meta["ids"], meta["centroids"], meta["offsets"],
+                           version=str(meta["version"]), synced_id=int(meta["synced_id"]))
+        except (OSError, ValueError, KeyError):
+            return None
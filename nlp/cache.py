@@ -0,0 +1,226 @@
+"""
+Content-addressed cache for parsing results (file text, skills, contacts)
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable
+from config import CACHE_MAX_AGE_DAYS, CACHE_MAX_ENTRIES, CACHE_MEMORY_ITEMS, CACHE_PATH, CACHE_PRUNE_SECONDS
+from metrics import register_collector
+
+_local = threading.local()
+_caches: dict[str, "ContentCache"] = {}
+_disk_path = CACHE_PATH
+
+# Disk hits refresh an entry's access time only when it is older than this, so reads rarely write
+_TOUCH_SECONDS = 3600
+# Per cache file: when this process last pruned it
+_pruned_at: dict[str, float] = {}
+_prune_lock = threading.Lock()
+
+
+def content_hash(data: bytes | str) -> str:
+    """sha256 of raw bytes, or of text with whitespace normalised."""
+    if isinstance(data, str):
+        data = " ".join(data.split()).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    # One connection per thread; sqlite3 connections must not be shared across threads
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+        )
+        # Unix time of the last write or (coarsely) read; files from before it count as fresh
+        if "accessed" not in {row[1] for row in conn.execute("PRAGMA table_info(entries)")}:
+            try:
+                with conn:
+                    conn.execute("ALTER TABLE entries ADD COLUMN accessed INTEGER NOT NULL DEFAULT 0")
+                    conn.execute("UPDATE entries SET accessed = ?", (int(time.time()),))
+            except sqlite3.OperationalError:
+                # Another process added it first
+                pass
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        conns[path] = conn
+    return conn
+
+
+class ContentCache:
+    """
+    Two-tier cache for JSON-serialisable values: a bounded in-memory LRU in front
+    of a persistent SQLite table shared by all processes. Disk errors degrade to
+    memory-only caching.
+
+    The table is bounded too: writers prune it (every namespace) at most every
+    CACHE_PRUNE_SECONDS, dropping entries unused for max_age_days, then the least
+    recently used beyond max_entries.
+    """
+
+    def __init__(self, namespace: str, max_items: int = CACHE_MEMORY_ITEMS, path: str = CACHE_PATH,
+                 max_entries: int = CACHE_MAX_ENTRIES, max_age_days: float = CACHE_MAX_AGE_DAYS):
+        self.namespace = namespace
+        self.max_items = max_items
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._memory: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        found: dict[str, Any] = {}
+        missing = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.hits += 1
+                else:
+                    missing.append(key)
+
+        if missing and self.path:
+            try:
+                conn = _connect(self.path)
+                now = int(time.time())
+                stale = []
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = conn.execute(
+                        "SELECT key, value, accessed FROM entries "
+                        f"WHERE namespace = ? AND key IN ({','.join('?' * len(chunk))})",
+                        [self.namespace, *chunk],
+                    ).fetchall()
+                    for key, value, accessed in rows:
+                        found[key] = json.loads(value)
+                        self._remember(key, found[key])
+                        if accessed < now - _TOUCH_SECONDS:
+                            stale.append(key)
+                if stale:
+                    with conn:
+                        conn.executemany("UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?",
+                                         [(now, self.namespace, key) for key in stale])
+            except sqlite3.Error:
+                pass
+
+        with self._lock:
+            disk = sum(1 for key in missing if key in found)
+            self.disk_hits += disk
+            self.misses += len(missing) - disk
+        return found
+
+    def get(self, key: str) -> Any | None:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: dict[str, Any]) -> None:
+        for key, value in items.items():
+            self._remember(key, value)
+        if items and self.path:
+            try:
+                conn = _connect(self.path)
+                now = int(time.time())
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO entries (namespace, key, value, accessed) VALUES (?, ?, ?, ?)",
+                        [(self.namespace, key, json.dumps(value), now) for key, value in items.items()],
+                    )
+                with _prune_lock:
+                    due = time.time() - _pruned_at.get(self.path, 0.0) >= CACHE_PRUNE_SECONDS
+                    if due:
+                        _pruned_at[self.path] = time.time()
+                if due:
+                    self.prune()
+            except sqlite3.Error:
+                pass
+
+    def prune(self) -> int:
+        """Apply the age and size bounds to the cache file now; returns the entries deleted."""
+        if not self.path:
+            return 0
+        conn = _connect(self.path)
+        deleted = 0
+        with conn:
+            if self.max_age_days > 0:
+                cutoff = int(time.time() - self.max_age_days * 86400)
+                deleted += conn.execute("DELETE FROM entries WHERE accessed < ?", (cutoff,)).rowcount
+            if self.max_entries > 0:
+                excess = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    deleted += conn.execute(
+                        "DELETE FROM entries WHERE (namespace, key) IN "
+                        "(SELECT namespace, key FROM entries ORDER BY accessed LIMIT ?)", (excess,)).rowcount
+        return deleted
+
+    def put(self, key: str, value: Any) -> None:
+        self.put_many({key: value})
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "memory_hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_items": len(self._memory),
+            }
+
+
+def get_cache(namespace: str) -> ContentCache:
+    cache = _caches.get(namespace)
+    if cache is None:
+        cache = _caches.setdefault(namespace, ContentCache(namespace, path=_disk_path))
+    return cache
+
+
+def set_disk_path(path: str) -> None:
+    """Back this process's caches with another SQLite file ("" for memory only)."""
+    global _disk_path
+    _disk_path = path
+    for cache in _caches.values():
+        cache.path = path
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    return {name: cache.stats() for name, cache in sorted(_caches.items())}
+
+
+def _cache_samples():
+    for name, stats in cache_stats().items():
+        for result, key in (("memory_hit", "memory_hits"), ("disk_hit", "disk_hits"), ("miss", "misses")):
+            yield ("resume_cache_lookups_total", "counter", "Parse cache lookups by outcome",
+                   {"cache": name, "result": result}, stats[key])
+        yield ("resume_cache_memory_items", "gauge", "Entries in the in-memory parse cache",
+               {"cache": name}, stats["memory_items"])
+
+
+register_collector(_cache_samples)
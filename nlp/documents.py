@@ -0,0 +1,347 @@
+"""
+Extract plain text from uploaded resume files (.pdf or .txt)
+"""
+from __future__ import annotations
+import hashlib
+import io
+import mmap
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, BinaryIO, Callable, NamedTuple, Optional, Sequence, Tuple, Union
+from config import PDF_MAX_PAGES, PDF_PAGES_PER_TASK, PDF_TIMEOUT_SECONDS, UPLOAD_MAX_BYTES
+from metrics import histogram, timed
+from .cache import content_hash, get_cache
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+PDF_MISSING = "PDF support not installed. Run: pip install pypdf"
+
+_lock = threading.Lock()
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+# Futures not yet done per live pool, so a pool with a hung worker can be retired once the rest finish
+_pending: dict[ProcessPoolExecutor, set[Future]] = {}
+# Per pool: the queue its workers post their pid to as they start
+_worker_pids: dict[ProcessPoolExecutor, Any] = {}
+
+FILE_SECONDS = histogram("resume_file_extract_seconds", "Text extraction time per uploaded PDF", ("outcome",))
+
+
+class SpooledFile:
+    """
+    An upload copied to a temporary file in fixed-size chunks and hashed on the
+    way, so neither the request handler nor the PDF workers hold it in memory.
+    Raises ValueError if the upload is larger than max_bytes.
+    """
+
+    def __init__(self, stream: BinaryIO, max_bytes: int | None = UPLOAD_MAX_BYTES, chunk_size: int = 1 << 20):
+        digest = hashlib.sha256()
+        self.size = 0
+        fd, self.path = tempfile.mkstemp(prefix="upload-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    self.size += len(chunk)
+                    if max_bytes and self.size > max_bytes:
+                        raise ValueError(f"File is larger than {max_bytes // (1 << 20)} MB")
+                    digest.update(chunk)
+                    out.write(chunk)
+        except BaseException:
+            os.unlink(self.path)
+            raise
+        self.sha256 = digest.hexdigest()
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def close(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+Upload = Union[bytes, SpooledFile]
+
+
+class Extraction(NamedTuple):
+    """Outcome of extracting one file: text or error, plus wall time and pages read (0 when cached)."""
+    text: Optional[str]
+    error: Optional[str]
+    seconds: float = 0.0
+    pages: int = 0
+    truncated: bool = False
+    timed_out: bool = False
+    cached: bool = False
+
+
+def is_supported(filename: str) -> bool:
+    return (filename or "").lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def _cache_key(filename: str, data: Upload) -> str:
+    digest = data.sha256 if isinstance(data, SpooledFile) else content_hash(data)
+    return f"{os.path.splitext((filename or '').lower())[1]}:{digest}"
+
+
+def extract_text(filename: str, data: Upload) -> str:
+    """
+    Return the stripped text of a .pdf or .txt upload, cached by content hash.
+
+    Raises ValueError for unsupported file types, RuntimeError when PDF support
+    (pypdf) is not installed or the file cannot be parsed, and TimeoutError when
+    parsing exceeds PDF_TIMEOUT_SECONDS.
+    """
+    result = extract_texts([(filename, data)])[0]
+    if result.error is None:
+        return result.text
+    if not is_supported(filename):
+        raise ValueError(result.error)
+    if result.timed_out:
+        raise TimeoutError(result.error)
+    raise RuntimeError(result.error)
+
+
+@lru_cache(maxsize=1)
+def _pdf_reader():
+    # pypdf is optional and only imported once a PDF arrives
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return None
+    return PdfReader
+
+
+@contextmanager
+def _open_pdf(path: str):
+    # Memory-map the file: pages are read lazily from the page cache, not copied into the heap
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("Empty PDF file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield _pdf_reader()(mm)
+
+
+def _page_count(path: str) -> int:
+    with _open_pdf(path) as reader:
+        return len(reader.pages)
+
+
+def _extract_pages(task: Tuple[str, int, int, float]) -> Tuple[Optional[str], Optional[str], float]:
+    # Runs in a worker process: (text, error, seconds). Stops between pages once
+    # the task alone has used up the file's time budget.
+    path, start, stop, budget = task
+    started = time.time()
+    texts = []
+    try:
+        with _open_pdf(path) as reader:
+            for i in range(start, stop):
+                if time.time() - started > budget:
+                    return None, "timeout", time.time() - started
+                texts.append(reader.pages[i].extract_text() or "")
+    except Exception as e:
+        return None, str(e), time.time() - started
+    return "".join(texts), None, time.time() - started
+
+
+def _register_worker(pids) -> None:
+    pids.put(os.getpid())
+
+
+def _submit(fn: Callable, tasks: Sequence, max_workers: int) -> Tuple[ProcessPoolExecutor, list[Future]]:
+    # Submitting under the lock means a pool being retired never receives new work
+    global _pool, _pool_workers
+    with _lock:
+        if _pool is None or _pool_workers != max_workers:
+            if _pool is not None:
+                # Queued work still runs; the old workers exit once it is done
+                _pending.pop(_pool, None)
+                _worker_pids.pop(_pool, None)
+                _pool.shutdown(wait=False)
+            # forkserver: workers start from a clean process, not a copy of one
+            # whose other threads may hold locks (DB, sqlite cache, logging)
+            context = multiprocessing.get_context("forkserver")
+            pids = context.SimpleQueue()
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                                        initializer=_register_worker, initargs=(pids,))
+            _pool_workers = max_workers
+            _pending[_pool] = set()
+            _worker_pids[_pool] = pids
+        pending = _pending[_pool]
+        futures = [_pool.submit(fn, task) for task in tasks]
+        pending.update(futures)
+        for future in futures:
+            future.add_done_callback(pending.discard)
+        return _pool, futures
+
+
+def _retire_pool(pool: ProcessPoolExecutor, hung: set[Future], max_workers: int) -> None:
+    # A worker is stuck past its budget. New work goes to a fresh pool; the other
+    # requests' work already on this one runs to completion, then its processes
+    # (by then only the stuck ones are busy) are killed.
+    global _pool
+    for future in hung:
+        future.cancel()
+    with _lock:
+        if pool not in _pending:
+            return
+        if _pool is pool:
+            _pool = None
+        others = [f for f in _pending.pop(pool) if f not in hung]
+        pids = _worker_pids.pop(pool)
+    limit = PDF_TIMEOUT_SECONDS * (-(-len(others) // max_workers) + 1)
+    threading.Thread(target=_reap, args=(pool, pids, others, limit), name="pdf-pool-reaper", daemon=True).start()
+
+
+def _reap(pool: ProcessPoolExecutor, pids, others: list[Future], limit: float) -> None:
+    wait(others, timeout=limit)
+    # The executor has no public way to stop a running task, so kill its workers by pid;
+    # they are killed before shutdown, so none has exited and had its pid reused yet
+    while not pids.empty():
+        try:
+            os.kill(pids.get(), signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    pool.shutdown(wait=False, cancel_futures=True)
+    pids.close()
+
+
+def _run_tasks(fn: Callable, tasks: Sequence, max_workers: int, limit: float) -> list[Optional[Tuple[bool, Any]]]:
+    """
+    Run fn over tasks in the shared process pool: per task (True, result),
+    (False, error message) if it raised or its worker died, or None if it was
+    still running after limit seconds (its worker is then killed).
+    """
+    pool, futures = _submit(fn, tasks, max_workers)
+    _, hung = wait(futures, timeout=limit)
+    if hung:
+        _retire_pool(pool, hung, max_workers)
+    outcomes: list[Optional[Tuple[bool, Any]]] = []
+    for future in futures:
+        if future in hung:
+            outcomes.append(None)
+            continue
+        try:
+            outcomes.append((True, future.result()))
+        except (Exception, CancelledError) as e:
+            outcomes.append((False, str(e) or type(e).__name__))
+    return outcomes
+
+
+@timed("extract")
+def extract_texts(files: Sequence[Tuple[str, Upload]], max_workers: int | None = None) -> list[Extraction]:
+    """
+    Extract many uploads at once, one Extraction per file in input order.
+
+    Cached files are looked up by content hash. PDFs are split into page ranges of
+    PDF_PAGES_PER_TASK that are parsed in a shared process pool from memory-mapped
+    temporary files; at most PDF_MAX_PAGES pages are read per file and a file that
+    takes longer than PDF_TIMEOUT_SECONDS fails with a timeout.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    cache = get_cache("text")
+    keys = [_cache_key(name, data) for name, data in files]
+    cached = cache.get_many(keys)
+
+    results: list[Extraction] = [Extraction(None, None)] * len(files)
+    pdfs = []
+    for i, ((name, data), key) in enumerate(zip(files, keys)):
+        lower = (name or "").lower()
+        if key in cached:
+            results[i] = Extraction(cached[key], None, cached=True)
+        elif lower.endswith(".txt"):
+            raw = data.read_bytes() if isinstance(data, SpooledFile) else data
+            results[i] = Extraction(raw.decode("utf-8", errors="ignore").strip(), None)
+        elif not lower.endswith(".pdf"):
+            results[i] = Extraction(None, "Unsupported file type. Please upload .txt or .pdf")
+        elif _pdf_reader() is None:
+            results[i] = Extraction(None, PDF_MISSING)
+        else:
+            pdfs.append(i)
+
+    if pdfs:
+        _extract_pdfs(files, pdfs, results, max_workers)
+
+    fresh = [i for i, key in enumerate(keys) if key not in cached]
+    for i in pdfs:
+        outcome = "timeout" if results[i].timed_out else "error" if results[i].error else "ok"
+        FILE_SECONDS.observe(results[i].seconds, outcome=outcome)
+    cache.put_many({keys[i]: results[i].text for i in fresh if results[i].error is None and not results[i].truncated})
+    return results
+
+
+def _extract_pdfs(files: Sequence[Tuple[str, Upload]], positions: list[int], results: list[Extraction],
+                  max_workers: int) -> None:
+    # The time budget counts parsing time only (summed over a file's page ranges),
+    # not time spent queued behind other files
+    spooled: list[SpooledFile] = []
+    try:
+        plans = {}
+        for i in positions:
+            started = time.time()
+            data = files[i][1]
+            if not isinstance(data, SpooledFile):
+                # Workers read from a file path rather than receiving the bytes pickled per task
+                data = SpooledFile(io.BytesIO(data), max_bytes=None)
+                spooled.append(data)
+            try:
+                n_pages = _page_count(data.path)
+            except Exception as e:
+                results[i] = Extraction(None, str(e), time.time() - started)
+                continue
+            stop = min(n_pages, PDF_MAX_PAGES)
+            tasks = [(data.path, s, min(s + PDF_PAGES_PER_TASK, stop), PDF_TIMEOUT_SECONDS)
+                     for s in range(0, stop, PDF_PAGES_PER_TASK)]
+            plans[i] = (time.time() - started, n_pages, stop, tasks)
+
+        n_tasks = sum(len(plan[3]) for plan in plans.values())
+        # Always in the pool, even a single page range: inline, a page that never
+        # finishes parsing would hang the request, since the budget is checked between pages
+        if n_tasks:
+            # Upper bound if every task ran to its budget; anything still running by then is hung
+            limit = PDF_TIMEOUT_SECONDS * (-(-n_tasks // max_workers) + 1)
+            outcomes = iter(_run_tasks(_extract_pages, [t for plan in plans.values() for t in plan[3]],
+                                       max_workers, limit))
+            parts = {}
+            for i, plan in plans.items():
+                parts[i] = []
+                for _ in plan[3]:
+                    outcome = next(outcomes)
+                    if outcome is None:
+                        parts[i].append((None, "timeout", PDF_TIMEOUT_SECONDS))
+                    elif outcome[0]:
+                        parts[i].append(outcome[1])
+                    else:
+                        parts[i].append((None, outcome[1], 0.0))
+        else:
+            parts = {i: [] for i in plans}
+
+        for i, (setup_seconds, n_pages, stop, _) in plans.items():
+            seconds = setup_seconds + sum(part[2] for part in parts[i])
+            error = next((err for _, err, _ in parts[i] if err), None)
+            if error == "timeout" or seconds > PDF_TIMEOUT_SECONDS:
+                results[i] = Extraction(None, f"Timed out after {PDF_TIMEOUT_SECONDS:g}s", seconds, stop, timed_out=True)
+            elif error:
+                results[i] = Extraction(None, error, seconds, stop)
+            else:
+                text = "".join(text for text, _, _ in parts[i]).strip()
+                results[i] = Extraction(text, None, seconds, stop, truncated=n_pages > stop)
+    finally:
+        for data in spooled:
+            data.close()
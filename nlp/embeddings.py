@@ -0,0 +1,105 @@
+"""
+Dense document embeddings for semantic text similarity.
+
+Both embedders expose version, dim and encode(texts) -> L2-normalised float32
+rows, so cosine similarity is a dot product:
+
+- LsaEmbedder projects TF-IDF vectors onto a truncated SVD of the stored corpus
+  (latent semantic analysis). It needs no downloads, and terms that are used in
+  similar documents ("k8s" / "kubernetes") land close together.
+- SpacyVectorEmbedder averages the static word vectors of an installed spaCy
+  model that ships them (en_core_web_md, en_core_web_lg).
+"""
+from __future__ import annotations
+import os
+from typing import Iterable, Sequence
+import joblib
+import numpy as np
+from .cache import content_hash
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalise rows in place (all-zero rows stay zero) and return them as float32."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def to_bytes(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def from_bytes(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<f4")
+
+
+class LsaEmbedder:
+    def __init__(self, vectorizer, components: np.ndarray):
+        self.vectorizer = vectorizer
+        # (dim, n_terms): the top right-singular vectors of the corpus TF-IDF matrix
+        self.components = np.asarray(components, dtype=np.float32)
+        self.version = content_hash(b"lsa:" + self.components.tobytes())[:16]
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, vectorizer, texts: Iterable[str], dim: int, seed: int = 0) -> "LsaEmbedder | None":
+        """Fit over a corpus already vectorised by `vectorizer`; None if it is too small."""
+        from sklearn.decomposition import TruncatedSVD
+        X = vectorizer.transform(t or "" for t in texts)
+        n_components = min(dim, X.shape[0] - 1, X.shape[1] - 1)
+        if n_components < 1:
+            return None
+        svd = TruncatedSVD(n_components=n_components, random_state=seed).fit(X)
+        return cls(vectorizer, svd.components_)
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        X = self.vectorizer.transform([t or "" for t in texts])
+        return normalize_rows(X @ self.components.T)
+
+    def save(self, directory: str, name: str = "semantic") -> None:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.joblib")
+        joblib.dump({"vectorizer": self.vectorizer, "components": self.components}, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, directory: str, name: str = "semantic") -> "LsaEmbedder | None":
+        path = os.path.join(directory, f"{name}.joblib")
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(**joblib.load(path))
+        except Exception:
+            return None
+
+
+class SpacyVectorEmbedder:
+    # Only the tokenizer and the vocabulary's vectors are needed
+    _EXCLUDE = ["tok2vec", "tagger", "morphologizer", "parser", "senter", "ner", "attribute_ruler", "lemmatizer"]
+
+    def __init__(self, model: str):
+        import spacy
+        try:
+            self.nlp = spacy.load(model, exclude=self._EXCLUDE)
+        except OSError:
+            raise RuntimeError(f"spaCy model '{model}' not found. Run: python -m spacy download {model}")
+        vectors = self.nlp.vocab.vectors
+        if vectors.shape[0] == 0:
+            raise RuntimeError(f"spaCy model '{model}' has no word vectors; use en_core_web_md or _lg")
+        meta = self.nlp.meta
+        self.version = content_hash(f"spacy:{meta.get('name')}:{meta.get('version')}:{vectors.shape}")[:16]
+        self._dim = vectors.shape[1]
+
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        docs = self.nlp.pipe([t or "" for t in texts], batch_size=64)
+        return normalize_rows(np.stack([doc.vector for doc in docs]))
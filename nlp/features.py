@@ -0,0 +1,136 @@
+"""
+Precomputed match features: a sparse TF-IDF vector and a skill bitset per document
+"""
+from __future__ import annotations
+import os
+import struct
+from typing import Iterable, Optional, Sequence
+import joblib
+import numpy as np
+from scipy import sparse
+from .cache import content_hash
+from .matching import HashingTfidf, _build_vectorizer
+from .skillbits import SkillBitset, popcount
+from .skills import skill_vocab
+
+# nnz, number of skills on the document, then nnz int32 term ids, nnz float32 weights, uint64 skill words
+_HEADER = struct.Struct("<II")
+# Part of the version, so rows encoded with an older blob layout are re-encoded
+_FORMAT = 2
+
+
+class FeatureSpace:
+    """
+    A versioned global vocabulary: a TF-IDF vectorizer fitted over the stored
+    corpus (a term vocabulary, or hashed terms with TEXT_VECTORIZER=hashing) plus
+    a fixed bit position for every skill in the skill vocabulary.
+
+    Documents are encoded once, when they are written; comparing two encodings
+    is a sparse dot product (vectors are L2-normalised) and a popcount.
+    """
+
+    def __init__(self, vectorizer=None, skills: Optional[Sequence[str]] = None, version: str = ""):
+        self.vectorizer = vectorizer
+        self.skills = list(skills if skills is not None else sorted(skill_vocab()))
+        self.bitset = SkillBitset(self.skills)
+        self.version = version or self._compute_version()
+
+    @classmethod
+    def fit(cls, texts: Iterable[str]):
+        vec = _build_vectorizer()
+        try:
+            vec.fit([t or "" for t in texts])
+        except ValueError:
+            # Empty corpus or stop words only: text similarity is 0 until the next refit
+            vec = None
+        return cls(vectorizer=vec)
+
+    def _compute_version(self) -> str:
+        if isinstance(self.vectorizer, HashingTfidf):
+            terms = f"hashing:{self.vectorizer.n_features}"
+        else:
+            terms = sorted(self.vectorizer.vocabulary_.items()) if self.vectorizer is not None else []
+        idf = self.vectorizer.idf_.tobytes() if self.vectorizer is not None else b""
+        # The skill list is this space's own (its bit layout), not the live vocabulary's
+        skills = "\n".join(self.skills).encode("utf-8")
+        return content_hash(f"{_FORMAT}:{terms!r}".encode("utf-8") + idf + skills)[:16]
+
+    def encode(self, text: str, skills: Iterable[str]) -> bytes:
+        if self.vectorizer is not None:
+            row = self.vectorizer.transform([text or ""]).tocsr()
+            row.sort_indices()
+            indices, values = row.indices.astype("<i4"), row.data.astype("<f4")
+        else:
+            indices, values = np.zeros(0, dtype="<i4"), np.zeros(0, dtype="<f4")
+        skills = set(skills)
+        return (
+            _HEADER.pack(len(indices), len(skills))
+            + indices.tobytes()
+            + values.tobytes()
+            + self.bitset.pack(skills).tobytes()
+        )
+
+    def encode_many(self, docs: Sequence[tuple[str, Iterable[str]]]) -> list[bytes]:
+        return [self.encode(text, skills) for text, skills in docs]
+
+    @property
+    def n_features(self) -> int:
+        if isinstance(self.vectorizer, HashingTfidf):
+            return self.vectorizer.n_features
+        return len(self.vectorizer.vocabulary_) if self.vectorizer is not None else 0
+
+    def stack(self, blobs: Sequence[bytes]):
+        """
+        Decode many blobs at once: (L2-normalised CSR matrix, uint64 skill words
+        with one row per blob, number of skills per blob).
+        """
+        decoded = [Features(blob) for blob in blobs]
+        indptr = np.zeros(len(decoded) + 1, dtype=np.int64)
+        np.cumsum([len(f.indices) for f in decoded], out=indptr[1:])
+        indices = np.concatenate([f.indices for f in decoded]) if decoded else np.zeros(0, dtype=np.int32)
+        values = np.concatenate([f.values for f in decoded]).astype(np.float64) if decoded else np.zeros(0)
+        matrix = sparse.csr_matrix((values, indices, indptr), shape=(len(decoded), self.n_features))
+        bits = np.zeros((len(decoded), self.bitset.n_words), dtype=np.uint64)
+        for row, f in enumerate(decoded):
+            bits[row] = f.bits
+        return matrix, bits, np.array([f.n_skills for f in decoded], dtype=np.int64)
+
+    def skill_names(self, bits: np.ndarray) -> list[str]:
+        return self.bitset.names(bits)
+
+    def save(self, directory: str, name: str = "features") -> None:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.joblib")
+        # The version is recomputed on load, so it always reflects the current blob format
+        joblib.dump({"vectorizer": self.vectorizer, "skills": self.skills}, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, directory: str, name: str = "features"):
+        path = os.path.join(directory, f"{name}.joblib")
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(**joblib.load(path))
+        except Exception:
+            return None
+
+
+class Features:
+    """A decoded feature blob."""
+
+    __slots__ = ("indices", "values", "n_skills", "bits")
+
+    def __init__(self, blob: bytes):
+        nnz, self.n_skills = _HEADER.unpack_from(blob)
+        start = _HEADER.size
+        self.indices = np.frombuffer(blob, dtype="<i4", count=nnz, offset=start)
+        self.values = np.frombuffer(blob, dtype="<f4", count=nnz, offset=start + 4 * nnz)
+        self.bits = np.frombuffer(blob, dtype="<u8", offset=start + 8 * nnz)
+
+    def dot(self, other: "Features") -> float:
+        _, mine, theirs = np.intersect1d(self.indices, other.indices, assume_unique=True, return_indices=True)
+        return float(np.dot(self.values[mine].astype(np.float64), other.values[theirs].astype(np.float64)))
+
+    def overlap(self, other: "Features") -> int:
+        return int(popcount(self.bits & other.bits))
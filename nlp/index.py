@@ -0,0 +1,139 @@
+from __future__ import annotations
+import os
+from typing import Iterable, Tuple
+import joblib
+import numpy as np
+from scipy import sparse
+from .matching import _build_vectorizer
+
+
+class TfidfIndex:
+    """
+    TF-IDF vectors for a document collection, persisted on disk.
+
+    The vectorizer is fitted once over the collection; documents added later are
+    only transformed, and queries transform just the query text. Rows are
+    L2-normalised so cosine similarity is a sparse matrix-vector product.
+    """
+
+    # Refit vocabulary/IDF once this share of documents was added after the last fit
+    REFIT_RATIO = 0.2
+
+    def __init__(self, vectorizer=None, matrix=None, ids=None, fitted_docs: int = 0, synced_id: int = 0):
+        self.vectorizer = vectorizer
+        self._matrix = matrix if matrix is not None else sparse.csr_matrix((0, 0), dtype=np.float64)
+        self.ids = np.asarray(ids if ids is not None else [], dtype=np.int64)
+        self.fitted_docs = fitted_docs
+        # Every source row with an id <= synced_id is known to be indexed
+        self.synced_id = synced_id
+        self._id_set = set(int(i) for i in self.ids)
+        self._pending_ids: list[int] = []
+        self._pending_rows: list = []
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[int, str]]):
+        # The vectorizer reads the texts in a single pass, so they are streamed from
+        # `docs` rather than collected; only the ids are kept
+        ids: list[int] = []
+
+        def texts():
+            for doc_id, text in docs:
+                ids.append(doc_id)
+                yield text or ""
+
+        vec = _build_vectorizer()
+        try:
+            X = vec.fit_transform(texts())
+        except ValueError:
+            # Every document was empty or stop words only: keep the rows, score them 0
+            vec, X = None, sparse.csr_matrix((len(ids), 0), dtype=np.float64)
+        if not ids:
+            return cls()
+        return cls(vectorizer=vec, matrix=X.tocsr(), ids=ids, fitted_docs=len(ids), synced_id=max(ids))
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self._pending_ids)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return int(doc_id) in self._id_set
+
+    @property
+    def needs_refit(self) -> bool:
+        if self.vectorizer is None:
+            return len(self) > self.fitted_docs
+        added = len(self) - self.fitted_docs
+        return added > max(1, int(self.fitted_docs * self.REFIT_RATIO))
+
+    @property
+    def matrix(self):
+        if self._pending_rows:
+            self._matrix = sparse.vstack([self._matrix] + self._pending_rows, format="csr")
+            self.ids = np.concatenate([self.ids, np.asarray(self._pending_ids, dtype=np.int64)])
+            self._pending_ids, self._pending_rows = [], []
+        return self._matrix
+
+    def add(self, doc_id: int, text: str) -> None:
+        doc_id = int(doc_id)
+        if doc_id in self._id_set:
+            return
+        self._id_set.add(doc_id)
+        self._pending_ids.append(doc_id)
+        if self.vectorizer is None:
+            # Nothing fitted yet: an empty row that needs_refit will replace
+            self._pending_rows.append(sparse.csr_matrix((1, self._matrix.shape[1]), dtype=np.float64))
+        else:
+            self._pending_rows.append(self.vectorizer.transform([text or ""]))
+
+    def query(self, text: str) -> np.ndarray:
+        """Cosine similarity of `text` against every indexed document, aligned with `self.ids`."""
+        X = self.matrix
+        if self.vectorizer is None or X.shape[0] == 0:
+            return np.zeros(len(self.ids), dtype=np.float64)
+        q = self.vectorizer.transform([text or ""])
+        return np.asarray((X @ q.T).todense()).ravel()
+
+    def top_k(self, text: str, k: int = 5) -> list[Tuple[int, float]]:
+        sims = self.query(text)
+        if k <= 0 or sims.size == 0:
+            return []
+        k = min(k, sims.size)
+        part = np.argpartition(-sims, k - 1)[:k]
+        order = part[np.argsort(-sims[part], kind="stable")]
+        return [(int(self.ids[i]), float(sims[i])) for i in order]
+
+    def _meta(self) -> dict:
+        # Constructor keyword arguments persisted next to the matrix
+        return {
+            "vectorizer": self.vectorizer,
+            "ids": self.ids,
+            "fitted_docs": self.fitted_docs,
+            "synced_id": self.synced_id,
+        }
+
+    def save(self, directory: str, name: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        X = self.matrix
+        meta_path = os.path.join(directory, f"{name}.joblib")
+        matrix_path = os.path.join(directory, f"{name}.npz")
+        # Write to temporary files first so readers never see a half-written index
+        joblib.dump(self._meta(), meta_path + ".tmp")
+        with open(matrix_path + ".tmp", "wb") as f:
+            sparse.save_npz(f, X)
+        os.replace(matrix_path + ".tmp", matrix_path)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    @classmethod
+    def load(cls, directory: str, name: str):
+        meta_path = os.path.join(directory, f"{name}.joblib")
+        matrix_path = os.path.join(directory, f"{name}.npz")
+        if not (os.path.exists(meta_path) and os.path.exists(matrix_path)):
+            return None
+        try:
+            meta = joblib.load(meta_path)
+            X = sparse.load_npz(matrix_path).tocsr()
+            if X.shape[0] != len(meta["ids"]):
+                return None
+            return cls(matrix=X, **meta)
+        except Exception:
+            # Missing, stale-format or corrupt files are rebuilt by the caller
+            return None
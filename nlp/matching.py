@@ -1,10 +1,68 @@
 from __future__ import annotations
-from typing import List, Tuple
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterable, Sequence
+import numpy as np
+from config import HASHING_FEATURES, TEXT_VECTORIZER
+from metrics import timed
 
+if TYPE_CHECKING:
+    from sklearn.feature_extraction.text import TfidfVectorizer
 
-def _build_vectorizer() -> TfidfVectorizer:
+# scikit-learn takes about a second to import, so it is loaded on first use (or by nlp.warmup)
+
+
+class HashingTfidf:
+    """
+    TF-IDF over hashed terms: a term's column is its hash modulo n_features, so
+    transforming a text needs no vocabulary lookup and no term is ever unknown.
+    fit() learns one IDF weight per column; unfitted, every column weighs 1.
+    Rows are L2-normalised, like TfidfVectorizer's.
+    """
+
+    def __init__(self, n_features: int = HASHING_FEATURES):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        self.n_features = n_features
+        self.hasher = HashingVectorizer(
+            lowercase=True,
+            stop_words="english",
+            ngram_range=(1, 2),
+            n_features=n_features,
+            alternate_sign=False,
+            norm=None,
+        )
+        self.idf_: np.ndarray | None = None
+
+    def _fit_counts(self, counts) -> None:
+        if counts.nnz == 0:
+            raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+        # Smoothed IDF, as TfidfVectorizer computes it
+        df = np.bincount(counts.indices, minlength=self.n_features)
+        self.idf_ = np.log((1 + counts.shape[0]) / (1 + df)) + 1.0
+
+    def _weigh(self, counts):
+        from sklearn.preprocessing import normalize
+        X = counts.tocsr().astype(np.float64)
+        if self.idf_ is not None:
+            X.data *= self.idf_[X.indices]
+        return normalize(X, copy=False)
+
+    def fit(self, texts: Iterable[str]) -> "HashingTfidf":
+        self._fit_counts(self.hasher.transform(texts).tocsr())
+        return self
+
+    def transform(self, texts: Iterable[str]):
+        return self._weigh(self.hasher.transform(texts))
+
+    def fit_transform(self, texts: Iterable[str]):
+        counts = self.hasher.transform(texts).tocsr()
+        self._fit_counts(counts)
+        return self._weigh(counts)
+
+
+def _build_vectorizer() -> TfidfVectorizer | HashingTfidf:
+    if TEXT_VECTORIZER == "hashing":
+        return HashingTfidf()
+    from sklearn.feature_extraction.text import TfidfVectorizer
     return TfidfVectorizer(
         lowercase=True,
         stop_words="english",
@@ -13,19 +71,72 @@ def _build_vectorizer() -> TfidfVectorizer:
     )
 
 
-def cosine_match_score(query_text: str, doc_text: str) -> float:
-    vec = _build_vectorizer()
-    X = vec.fit_transform([query_text or "", doc_text or ""])
-    sim = cosine_similarity(X[0], X[1])[0][0]
-    return float(sim)
+@lru_cache(maxsize=1)
+def _unfitted_hashing() -> HashingTfidf:
+    return HashingTfidf()
+
+
+def frozen_vectorizer(fitted=None):
+    """
+    The vectorizer that scores texts without being fitted on them: `fitted` (the
+    feature space's), else with TEXT_VECTORIZER=hashing an unfitted HashingTfidf;
+    None when texts can only be compared through a vectorizer fitted on them.
+    """
+    if fitted is not None:
+        return fitted
+    return _unfitted_hashing() if TEXT_VECTORIZER == "hashing" else None
+
+
+def _vectorize(texts: Sequence[str], vectorizer=None):
+    # L2-normalised rows of `texts`: transformed by `vectorizer`, or from a TF-IDF fit
+    # over just these texts (ValueError if they hold stop words only)
+    texts = [t or "" for t in texts]
+    if vectorizer is not None:
+        return vectorizer.transform(texts)
+    return _build_vectorizer().fit_transform(texts)
+
+
+@timed("tfidf")
+def cosine_match_score(query_text: str, doc_text: str, vectorizer=None) -> float:
+    """
+    Cosine similarity of the two texts' TF-IDF vectors. With a fitted `vectorizer`
+    the texts are only transformed, so every pair is weighted by the same IDF;
+    without one, a vectorizer is fitted on the two texts (0.0 if both are stop words only).
+    """
+    try:
+        X = _vectorize([query_text, doc_text], vectorizer)
+    except ValueError:
+        # Empty vocabulary (stop words only)
+        return 0.0
+    return float(X[0].multiply(X[1]).sum())
+
+
+@timed("tfidf")
+def cosine_match_scores(query_text: str, doc_texts: Sequence[str], vectorizer=None) -> np.ndarray:
+    """cosine_match_score of one query against many documents, with a single vectorizer fit (if any)."""
+    if not doc_texts:
+        return np.zeros(0)
+    try:
+        X = _vectorize([query_text] + list(doc_texts), vectorizer)
+    except ValueError:
+        # Empty vocabulary (stop words only)
+        return np.zeros(len(doc_texts))
+    return np.asarray((X[1:] @ X[0].T).toarray()).ravel()
+
 
+@timed("tfidf")
+def cosine_match_matrix(query_texts: Sequence[str], doc_texts: Sequence[str], vectorizer=None) -> np.ndarray:
+    """
+    (len(doc_texts), len(query_texts)) cosine similarities, with one vectorizer fit
+    (if any) over all texts and one sparse product.
+    """
+    if not query_texts or not doc_texts:
+        return np.zeros((len(doc_texts), len(query_texts)))
+    try:
+        X = _vectorize(list(query_texts) + list(doc_texts), vectorizer)
+    except ValueError:
+        # Empty vocabulary (stop words only)
+        return np.zeros((len(doc_texts), len(query_texts)))
+    # Rows are L2-normalised, so the product is the cosine similarity
+    return (X[len(query_texts):] @ X[:len(query_texts)].T).toarray()
 
-def batch_recommend(candidate_text: str, jobs: List[Tuple[int, str]], top_k: int = 5) -> List[Tuple[int, float]]:
-    # jobs: list of (job_id, job_description)
-    texts = [candidate_text or ""] + [desc or "" for _, desc in jobs]
-    vec = _build_vectorizer()
-    X = vec.fit_transform(texts)
-    sims = cosine_similarity(X[0], X[1:]).ravel()
-    pairs = [(jobs[i][0], float(sims[i])) for i in range(len(jobs))]
-    pairs.sort(key=lambda x: x[1], reverse=True)
-    return pairs[:top_k]
@@ -1,22 +1,29 @@
-import os
-import spacy
-import nltk
 from functools import lru_cache
 from config import SPACY_MODEL
 
 
 @lru_cache(maxsize=1)
 def get_nlp():
+    import spacy
     try:
-        return spacy.load(SPACY_MODEL)
+        # Skill extraction only reads lemmas and noun chunks, so NER is never loaded
+        return spacy.load(SPACY_MODEL, exclude=["ner"])
     except OSError:
         raise RuntimeError(
             f"spaCy model '{SPACY_MODEL}' not found. Run: python scripts/setup_nlp.py"
         )
 
 
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    """Tokenizer-only pipeline for the model's language; loads no model files."""
+    import spacy
+    return spacy.blank(SPACY_MODEL.split("_")[0])
+
+
 @lru_cache(maxsize=1)
 def get_stopwords():
+    import nltk
     try:
         return set(nltk.corpus.stopwords.words("english"))
     except LookupError:
@@ -0,0 +1,188 @@
+"""
+Compressed posting lists: sorted sets of row numbers, laid out like roaring bitmaps.
+
+Values are grouped by their high 16 bits into chunks. A chunk with at most
+ARRAY_MAX values is a sorted uint16 array (2 bytes per value); a fuller one is a
+65536-bit bitmap (8 KB), so a skill most documents have costs one bit per row.
+
+intersect(), union() and at_least() combine lists chunk by chunk and return the
+matching values as a sorted int64 array.
+"""
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Iterable, Sequence
+import numpy as np
+
+# Largest array chunk; above it a bitmap is smaller
+ARRAY_MAX = 4096
+_CHUNK = 1 << 16
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+def _is_bitmap(chunk: np.ndarray) -> bool:
+    return chunk.dtype == np.uint64
+
+
+def _mask(chunk: np.ndarray) -> np.ndarray:
+    # Chunk as 65536 booleans
+    if _is_bitmap(chunk):
+        return np.unpackbits(chunk.view(np.uint8), bitorder="little").view(bool)
+    mask = np.zeros(_CHUNK, dtype=bool)
+    mask[chunk] = True
+    return mask
+
+
+def _from_mask(mask: np.ndarray) -> np.ndarray:
+    if np.count_nonzero(mask) <= ARRAY_MAX:
+        return np.flatnonzero(mask).astype(np.uint16)
+    return np.packbits(mask, bitorder="little").view("<u8")
+
+
+def _values(chunk: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(_mask(chunk)) if _is_bitmap(chunk) else chunk.astype(np.int64)
+
+
+def _contains(chunk: np.ndarray, low: np.ndarray) -> np.ndarray:
+    # Which of the sorted uint16 values `low` are in `chunk`
+    if _is_bitmap(chunk):
+        low = low.astype(np.uint64)
+        return ((chunk[low >> np.uint64(6)] >> (low & np.uint64(63))) & np.uint64(1)).astype(bool)
+    return np.isin(low, chunk, assume_unique=True)
+
+
+def _join(parts: list[np.ndarray]) -> np.ndarray:
+    return np.concatenate(parts) if parts else _EMPTY
+
+
+class PostingList:
+    """A sorted set of non-negative ints (< 2**48) in array and bitmap chunks."""
+
+    __slots__ = ("keys", "chunks")
+
+    def __init__(self, keys: list[int] | None = None, chunks: list[np.ndarray] | None = None):
+        # Sorted high 16 bits of the values, and the chunk holding each key's low bits
+        self.keys: list[int] = keys or []
+        self.chunks: list[np.ndarray] = chunks or []
+
+    @classmethod
+    def from_values(cls, values: Iterable[int]) -> "PostingList":
+        values = np.unique(np.fromiter(values, dtype=np.int64))
+        high = values >> 16
+        bounds = np.flatnonzero(np.diff(high)) + 1
+        keys, chunks = [], []
+        for part in np.split(values, bounds) if len(values) else []:
+            low = (part & 0xFFFF).astype(np.uint16)
+            if len(low) > ARRAY_MAX:
+                mask = np.zeros(_CHUNK, dtype=bool)
+                mask[low] = True
+                low = np.packbits(mask, bitorder="little").view("<u8")
+            keys.append(int(part[0] >> 16))
+            chunks.append(low)
+        return cls(keys, chunks)
+
+    def add(self, value: int) -> None:
+        key, low = value >> 16, value & 0xFFFF
+        pos = bisect_left(self.keys, key)
+        if pos == len(self.keys) or self.keys[pos] != key:
+            self.keys.insert(pos, key)
+            self.chunks.insert(pos, np.array([low], dtype=np.uint16))
+            return
+        chunk = self.chunks[pos]
+        if _is_bitmap(chunk):
+            chunk[low >> 6] |= np.uint64(1) << np.uint64(low & 63)
+            return
+        at = int(np.searchsorted(chunk, low))
+        if at < len(chunk) and chunk[at] == low:
+            return
+        chunk = np.insert(chunk, at, np.uint16(low))
+        self.chunks[pos] = _from_mask(_mask(chunk)) if len(chunk) > ARRAY_MAX else chunk
+
+    def __len__(self) -> int:
+        return sum(int(np.count_nonzero(_mask(c))) if _is_bitmap(c) else len(c) for c in self.chunks)
+
+    def __bool__(self) -> bool:
+        return bool(self.keys)
+
+    def to_array(self) -> np.ndarray:
+        """The values as a sorted int64 array."""
+        return _join([(key << 16) + _values(chunk) for key, chunk in zip(self.keys, self.chunks)])
+
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self.chunks)
+
+
+def _by_key(lists: Sequence[PostingList]) -> dict[int, list[np.ndarray]]:
+    groups: dict[int, list[np.ndarray]] = {}
+    for posting in lists:
+        for key, chunk in zip(posting.keys, posting.chunks):
+            groups.setdefault(key, []).append(chunk)
+    return groups
+
+
+def intersect(lists: Sequence[PostingList]) -> np.ndarray:
+    """Values found in every one of `lists` (none for no lists)."""
+    if not lists:
+        return _EMPTY
+    out = []
+    for key, chunks in sorted(_by_key(lists).items()):
+        if len(chunks) < len(lists):
+            continue
+        arrays = sorted((c for c in chunks if not _is_bitmap(c)), key=len)
+        bitmaps = [c for c in chunks if _is_bitmap(c)]
+        if arrays:
+            # Start from the shortest array and probe the rest
+            low = arrays[0]
+            for chunk in arrays[1:] + bitmaps:
+                low = low[_contains(chunk, low)]
+                if not len(low):
+                    break
+            low = low.astype(np.int64)
+        else:
+            words = bitmaps[0].copy()
+            for chunk in bitmaps[1:]:
+                words &= chunk
+            low = _values(words)
+        if len(low):
+            out.append((key << 16) + low)
+    return _join(out)
+
+
+def union(lists: Sequence[PostingList]) -> np.ndarray:
+    """Values found in any of `lists`."""
+    out = []
+    for key, chunks in sorted(_by_key(lists).items()):
+        if len(chunks) == 1:
+            low = _values(chunks[0])
+        elif not any(_is_bitmap(c) for c in chunks) and sum(len(c) for c in chunks) <= ARRAY_MAX:
+            low = np.unique(np.concatenate(chunks)).astype(np.int64)
+        else:
+            mask = _mask(chunks[0]).copy()
+            for chunk in chunks[1:]:
+                mask |= _mask(chunk)
+            low = np.flatnonzero(mask)
+        out.append((key << 16) + low)
+    return _join(out)
+
+
+def at_least(lists: Sequence[PostingList], k: int) -> np.ndarray:
+    """Values found in at least k of `lists` (k <= 1: in any of them)."""
+    if k <= 1:
+        return union(lists)
+    if k > len(lists):
+        return _EMPTY
+    if k == len(lists):
+        return intersect(lists)
+    out = []
+    for key, chunks in sorted(_by_key(lists).items()):
+        if len(chunks) < k:
+            continue
+        counts = np.zeros(_CHUNK, dtype=np.uint16)
+        for chunk in chunks:
+            if _is_bitmap(chunk):
+                counts += _mask(chunk)
+            else:
+                counts[chunk] += 1
+        low = np.flatnonzero(counts >= k)
+        if len(low):
+            out.append((key << 16) + low)
+    return _join(out)
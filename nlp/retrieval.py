@@ -0,0 +1,163 @@
+from __future__ import annotations
+import heapq
+from typing import Iterable, Tuple
+import numpy as np
+from .index import TfidfIndex
+from .postings import PostingList, at_least
+
+
+class RetrievalIndex(TfidfIndex):
+    """
+    TfidfIndex plus an inverted index from skill to document rows, each skill's
+    rows held as a compressed PostingList.
+
+    Answers "top-k documents for (text, skills)" under the blended score
+    skill_weight * skills_match + text_weight * cosine without scoring every
+    document: rows are visited in order of their skills score, and since cosine
+    similarity is at most 1 the scan stops once no remaining row can enter the top k.
+    With min_skills, only rows having that many of the query skills are scanned.
+    """
+
+    # Rows whose text similarity is computed per step of the scan
+    BLOCK_SIZE = 1024
+
+    def __init__(self, *args, postings: dict[str, PostingList] | None = None,
+                 skill_counts: list[int] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Indexes saved before postings were compressed hold plain lists of rows
+        self.postings: dict[str, PostingList] = {
+            skill: rows if isinstance(rows, PostingList) else PostingList.from_values(rows)
+            for skill, rows in (postings or {}).items()
+        }
+        # Number of distinct skills per row, aligned with the matrix rows
+        self.skill_counts: list[int] = skill_counts if skill_counts is not None else []
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[int, str, Iterable[str]]]):
+        row_skills = []
+
+        def texts():
+            for doc_id, text, skills in docs:
+                row_skills.append(skills)
+                yield doc_id, text
+
+        index = super().build(texts())
+        rows_by_skill: dict[str, list[int]] = {}
+        for row, skills in enumerate(row_skills):
+            skills = {s for s in skills if s}
+            for skill in skills:
+                rows_by_skill.setdefault(skill, []).append(row)
+            index.skill_counts.append(len(skills))
+        index.postings = {skill: PostingList.from_values(rows) for skill, rows in rows_by_skill.items()}
+        return index
+
+    @classmethod
+    def load(cls, directory: str, name: str):
+        index = super().load(directory, name)
+        if index is None or len(index.skill_counts) != len(index):
+            return None
+        return index
+
+    def _meta(self) -> dict:
+        meta = super()._meta()
+        meta["postings"] = self.postings
+        meta["skill_counts"] = self.skill_counts
+        return meta
+
+    def _add_skills(self, row: int, skills: Iterable[str]) -> None:
+        skills = {s for s in skills if s}
+        for skill in skills:
+            self.postings.setdefault(skill, PostingList()).add(row)
+        self.skill_counts.append(len(skills))
+
+    def add(self, doc_id: int, text: str, skills: Iterable[str] = ()) -> None:
+        if doc_id in self:
+            return
+        row = len(self)
+        super().add(doc_id, text)
+        self._add_skills(row, skills)
+
+    def skill_scores(self, skills: Iterable[str], query_skills_denominator: bool = False) -> np.ndarray:
+        """
+        Skills match of every row against `skills`.
+
+        By default this is the share of each row's skills found in `skills` (rows are
+        jobs, `skills` a resume's). With query_skills_denominator it is the share of
+        `skills` found in each row (rows are resumes, `skills` a job's requirements).
+        An empty requirement list scores 1.0 when the other side has any skills.
+        """
+        skills = set(skills)
+        n = len(self)
+        overlap = np.zeros(n, dtype=np.float64)
+        for skill in skills:
+            rows = self.postings.get(skill)
+            if rows:
+                overlap[rows.to_array()] += 1.0
+        counts = np.asarray(self.skill_counts, dtype=np.float64)
+        if query_skills_denominator:
+            if not skills:
+                return (counts > 0).astype(np.float64)
+            return overlap / len(skills)
+        default = np.full(n, 1.0 if skills else 0.0)
+        return np.divide(overlap, counts, out=default, where=counts > 0)
+
+    def rows_with(self, skills: Iterable[str], min_skills: int) -> np.ndarray:
+        """Sorted rows having at least min_skills (at least 1) of `skills`."""
+        postings = [self.postings[s] for s in set(skills) if s in self.postings]
+        return at_least(postings, max(min_skills, 1))
+
+    def top_k_blended(self, text: str, skills: Iterable[str], k: int = 5,
+                      skill_weight: float = 0.7, text_weight: float = 0.3,
+                      query_skills_denominator: bool = False,
+                      min_skills: int = 0) -> list[Tuple[int, float, float, float]]:
+        """
+        Return up to k (doc_id, score, skills_score, text_score) tuples, best first,
+        among rows having at least min_skills of `skills` (all rows for 0).
+        """
+        X = self.matrix
+        if k <= 0 or X.shape[0] == 0:
+            return []
+        skills = set(skills)
+        skill_s = self.skill_scores(skills, query_skills_denominator)
+        if min_skills > 0:
+            # Rows failing the threshold are never vectorized
+            allowed = self.rows_with(skills, min_skills)
+            order = allowed[np.argsort(-skill_s[allowed], kind="stable")]
+        else:
+            order = np.argsort(-skill_s, kind="stable")
+        if len(order) == 0:
+            return []
+        q = self.vectorizer.transform([text or ""]) if self.vectorizer is not None else None
+        block_size = max(self.BLOCK_SIZE, 4 * k)
+
+        heap: list[Tuple[float, int, float]] = []  # min-heap of (score, -row, text score)
+        for start in range(0, len(order), block_size):
+            rows = order[start:start + block_size]
+            best_possible = skill_weight * skill_s[rows[0]] + text_weight
+            if len(heap) == k and best_possible <= heap[0][0]:
+                break
+            if q is not None:
+                # X[rows] copies those rows, so large blocks are scored a slice at a time
+                text_s = np.concatenate([
+                    np.asarray((X[rows[i:i + self.BLOCK_SIZE]] @ q.T).todense()).ravel()
+                    for i in range(0, len(rows), self.BLOCK_SIZE)
+                ])
+            else:
+                text_s = np.zeros(len(rows))
+            final = skill_weight * skill_s[rows] + text_weight * text_s
+            if len(rows) > k:
+                keep = np.argpartition(-final, k - 1)[:k]
+            else:
+                keep = np.arange(len(rows))
+            for i in keep:
+                item = (float(final[i]), -int(rows[i]), float(text_s[i]))
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+
+        results = []
+        for score, neg_row, text_score in sorted(heap, reverse=True):
+            row = -neg_row
+            results.append((int(self.ids[row]), score, float(skill_s[row]), text_score))
+        return results
@@ -0,0 +1,84 @@
+"""
+Skills as packed bitsets: one bit per vocabulary skill, stored in uint64 words
+"""
+from __future__ import annotations
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence
+import numpy as np
+from .skills import skill_vocab
+
+# Set bits per byte value, for NumPy builds without np.bitwise_count (< 2.0)
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """Set bits per row of a (..., n_words) uint64 array."""
+    if hasattr(np, "bitwise_count"):
+        counts = np.bitwise_count(words)
+    else:
+        counts = _BYTE_POPCOUNT[np.ascontiguousarray(words).view(np.uint8)]
+    return counts.sum(axis=-1, dtype=np.int64)
+
+
+class SkillBitset:
+    """
+    Maps vocabulary skills to bit positions (their rank in sorted order) and packs
+    skill lists into uint64 words. Skills outside the vocabulary are ignored; they
+    can never overlap with extracted resume skills anyway.
+    """
+
+    def __init__(self, skills: Optional[Sequence[str]] = None):
+        self.skills = list(skills if skills is not None else sorted(skill_vocab()))
+        self.ids = {skill: i for i, skill in enumerate(self.skills)}
+        self.n_words = max(1, (len(self.skills) + 63) // 64)
+
+    def pack(self, skills: Iterable[str]) -> np.ndarray:
+        return self.pack_many([skills])[0]
+
+    def pack_many(self, skill_lists: Iterable[Iterable[str]]) -> np.ndarray:
+        """(n, n_words) uint64 matrix, one row per skill list."""
+        skill_lists = list(skill_lists)
+        bits = np.zeros((len(skill_lists), self.n_words * 64), dtype=bool)
+        for row, skills in enumerate(skill_lists):
+            cols = [self.ids[s] for s in skills if s in self.ids]
+            bits[row, cols] = True
+        # packbits is big-endian per byte; "little" keeps bit i of word 0 == skill id i
+        return np.packbits(bits, axis=1, bitorder="little").view("<u8")
+
+    def names(self, words: np.ndarray) -> List[str]:
+        bits = np.unpackbits(np.ascontiguousarray(words, dtype="<u8").view(np.uint8), bitorder="little")
+        return [self.skills[i] for i in np.flatnonzero(bits[:len(self.skills)])]
+
+
+@lru_cache(maxsize=2)
+def _bitset_for(skills: frozenset[str]) -> SkillBitset:
+    return SkillBitset(sorted(skills))
+
+
+def get_skill_bitset() -> SkillBitset:
+    """Bitset layout of the current skill vocabulary (a new one after a vocabulary reload)."""
+    return _bitset_for(skill_vocab())
+
+
+def overlap_counts(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """
+    Shared skills between one packed skill set and every row of a packed matrix:
+    a job against many candidates, or a candidate against many jobs.
+    """
+    if matrix.shape[0] == 0:
+        return np.zeros(0, dtype=np.int64)
+    return popcount(matrix & query)
+
+
+def overlap_matrix(rows: np.ndarray, cols: np.ndarray, chunk_words: int = 1 << 20) -> np.ndarray:
+    """
+    Shared skills between every row of two packed matrices, as a (len(rows),
+    len(cols)) count matrix; rows are ANDed against all of cols a chunk at a time.
+    """
+    out = np.zeros((rows.shape[0], cols.shape[0]), dtype=np.int64)
+    if out.size == 0:
+        return out
+    step = max(1, chunk_words // (cols.shape[0] * cols.shape[1]))
+    for start in range(0, rows.shape[0], step):
+        out[start:start + step] = popcount(rows[start:start + step, None, :] & cols[None, :, :])
+    return out
@@ -1,35 +1,25 @@
 from __future__ import annotations
-import csv
-import os
-from typing import Iterable, Set
-from .pipeline import get_nlp, get_stopwords
+from typing import Iterable, List, Optional, Set
+from config import SKILL_EXTRACTION
+from metrics import timed
+from .cache import content_hash, get_cache
+from .pipeline import get_nlp, get_stopwords, get_tokenizer
+from .vocabulary import SkillVocabulary, get_vocabulary
 
-_SKILLS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "skills.csv")
 
+def skill_vocab() -> frozenset[str]:
+    """The canonical skills of the current vocabulary (data/skills.csv, hot-reloaded)."""
+    return get_vocabulary().skills
 
-def _load_skill_vocab() -> Set[str]:
-    vocab: set[str] = set()
-    if os.path.exists(_SKILLS_PATH):
-        with open(_SKILLS_PATH, newline="", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if not row:
-                    continue
-                skill = row[0].strip().lower()
-                if skill:
-                    vocab.add(skill)
-    return vocab
 
-_SKILL_VOCAB = _load_skill_vocab()
+def skill_vocab_version() -> str:
+    # Part of every cached extraction key, so a new vocabulary invalidates old results
+    return get_vocabulary().version
 
 
-def extract_skills(text: str) -> Set[str]:
-    if not text:
-        return set()
-    doc = get_nlp()(text)
-    stops = get_stopwords()
-
-    # Simple candidates: tokens and noun chunks intersected with known vocab
+def _skills_from_doc(doc, stops: Set[str], vocab: SkillVocabulary) -> Set[str]:
+    # Simple candidates: tokens and noun chunks looked up among the vocabulary's
+    # skills and aliases, mapped to their canonical skill
     tokens = {t.lemma_.lower() for t in doc if not t.is_space}
     tokens |= {t.text.lower() for t in doc if not t.is_space}
 
@@ -40,10 +30,72 @@ def extract_skills(text: str) -> Set[str]:
         tok_norm = tok.strip().lower()
         if not tok_norm or tok_norm in stops:
             continue
-        if tok_norm in _SKILL_VOCAB:
-            candidates.add(tok_norm)
         # handle simple punctuation variants
-        tok_norm2 = tok_norm.replace(" ", "-")
-        if tok_norm2 in _SKILL_VOCAB:
-            candidates.add(tok_norm2)
+        for spelling in (tok_norm, tok_norm.replace(" ", "-")):
+            skill = vocab.canonical(spelling)
+            if skill is not None:
+                candidates.add(skill)
     return candidates
+
+
+def _skills_from_matches(doc, stops: Set[str], vocab: SkillVocabulary) -> Set[str]:
+    # Stop words are checked on the matched text, as in parser mode: "go" alone is
+    # ignored, its alias "golang" is not
+    matcher = vocab.matcher
+    return {
+        matcher.vocab.strings[match_id]
+        for match_id, start, end in matcher(doc)
+        if doc[start:end].text.lower() not in stops
+    }
+
+
+def _use_parser(use_parser: Optional[bool]) -> bool:
+    return SKILL_EXTRACTION == "parser" if use_parser is None else use_parser
+
+
+def _cache_key(text: str, parser: bool, version: str) -> str:
+    return f"{'parser' if parser else 'fast'}:{version}:{content_hash(text)}"
+
+
+def extract_skills(text: str, use_parser: Optional[bool] = None) -> Set[str]:
+    """
+    Skills from the vocabulary mentioned in `text`, cached by content hash.
+
+    The default "fast" mode tokenizes only and runs a PhraseMatcher compiled from
+    the vocabulary. use_parser=True (or SKILL_EXTRACTION=parser) runs the spaCy
+    model and matches lemmas and noun chunks instead.
+    """
+    if not text:
+        return set()
+    return extract_skills_batch([text], use_parser=use_parser)[0]
+
+
+@timed("skill_extract")
+def extract_skills_batch(texts: Iterable[str], batch_size: int = 32, n_process: int = 1,
+                         use_parser: Optional[bool] = None) -> List[Set[str]]:
+    """extract_skills for many texts; cache misses are streamed through spaCy in batches."""
+    texts = [t or "" for t in texts]
+    parser = _use_parser(use_parser)
+    # One vocabulary for the whole batch, even if a new one is loaded meanwhile
+    vocab = get_vocabulary()
+    cache = get_cache("skills")
+    keys = [_cache_key(t, parser, vocab.version) for t in texts]
+    cached = cache.get_many(k for t, k in zip(texts, keys) if t)
+
+    todo = [i for i, (t, k) in enumerate(zip(texts, keys)) if t and k not in cached]
+    results = [set(cached.get(k, ())) for k in keys]
+    if todo:
+        stops = get_stopwords()
+        todo_texts = [texts[i] for i in todo]
+        if parser:
+            # Each extra spaCy process loads its own model; only worth it with several batches
+            n_process = max(1, min(n_process, -(-len(todo) // batch_size)))
+            docs = get_nlp().pipe(todo_texts, batch_size=batch_size, n_process=n_process)
+            found = [_skills_from_doc(doc, stops, vocab) for doc in docs]
+        else:
+            docs = get_tokenizer().tokenizer.pipe(todo_texts, batch_size=batch_size)
+            found = [_skills_from_matches(doc, stops, vocab) for doc in docs]
+        for i, skills in zip(todo, found):
+            results[i] = skills
+        cache.put_many({keys[i]: sorted(results[i]) for i in todo})
+    return results
@@ -0,0 +1,126 @@
+"""
+Inverted index from lowercased tokens to the ids of the documents containing them.
+
+Used to find the resumes a new skill pattern could match without re-reading every
+resume: the phrase matcher only matches a pattern where all of its tokens occur,
+so documents holding every token of the pattern are a superset of the matches.
+Tokens are stored as crc32 hashes; a collision only adds a document to the
+superset, it never drops one.
+"""
+from __future__ import annotations
+import os
+import zlib
+from typing import Iterable, Iterator, Sequence, Tuple
+import numpy as np
+
+
+def token_hash(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def tokenize(texts: Iterable[str], batch_size: int = 64) -> Iterator[set[str]]:
+    """Distinct lowercased tokens of each text, split as the skill phrase matcher splits them."""
+    from .pipeline import get_tokenizer
+    for doc in get_tokenizer().tokenizer.pipe((t or "" for t in texts), batch_size=batch_size):
+        yield {t.lower_ for t in doc if not t.is_space}
+
+
+def _pairs(docs: Iterable[Tuple[int, Iterable[str]]]) -> Tuple[np.ndarray, np.ndarray]:
+    hashes, ids = [], []
+    for doc_id, tokens in docs:
+        doc_hashes = np.unique(np.fromiter((token_hash(t) for t in tokens), dtype=np.uint32))
+        hashes.append(doc_hashes)
+        ids.append(np.full(len(doc_hashes), doc_id, dtype=np.int64))
+    if not hashes:
+        return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.int64)
+    return np.concatenate(hashes), np.concatenate(ids)
+
+
+class TokenIndex:
+    # (token hash, doc id) pairs added since the last merge before they are merged
+    MERGE_EVERY = 1 << 20
+
+    def __init__(self, hashes: np.ndarray | None = None, offsets: np.ndarray | None = None,
+                 ids: np.ndarray | None = None, synced_id: int = 0):
+        # Sorted distinct token hashes; the ids of hashes[i] are ids[offsets[i]:offsets[i + 1]], ascending
+        self.hashes = np.asarray(hashes if hashes is not None else [], dtype=np.uint32)
+        self.offsets = np.asarray(offsets if offsets is not None else [0], dtype=np.int64)
+        self.ids = np.asarray(ids if ids is not None else [], dtype=np.int64)
+        # Every document with an id <= synced_id has been added
+        self.synced_id = synced_id
+        self._pending: list[Tuple[np.ndarray, np.ndarray]] = []
+        self._pending_size = 0
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[int, Iterable[str]]], chunk_size: int = 10000) -> "TokenIndex":
+        index = cls()
+        index.add_many(docs, chunk_size=chunk_size)
+        index._merge()
+        return index
+
+    def add_many(self, docs: Iterable[Tuple[int, Iterable[str]]], chunk_size: int = 10000) -> None:
+        chunk = []
+        for doc_id, tokens in docs:
+            chunk.append((doc_id, tokens))
+            self.synced_id = max(self.synced_id, int(doc_id))
+            if len(chunk) >= chunk_size:
+                self._add_pairs(*_pairs(chunk))
+                chunk = []
+        if chunk:
+            self._add_pairs(*_pairs(chunk))
+
+    def _add_pairs(self, hashes: np.ndarray, ids: np.ndarray) -> None:
+        self._pending.append((hashes, ids))
+        self._pending_size += len(hashes)
+        if self._pending_size >= self.MERGE_EVERY:
+            self._merge()
+
+    def _merge(self) -> None:
+        if not self._pending:
+            return
+        hashes = np.concatenate([np.repeat(self.hashes, np.diff(self.offsets))] + [h for h, _ in self._pending])
+        ids = np.concatenate([self.ids] + [i for _, i in self._pending])
+        self._pending, self._pending_size = [], 0
+        order = np.lexsort((ids, hashes))
+        hashes, ids = hashes[order], ids[order]
+        keep = np.ones(len(ids), dtype=bool)
+        keep[1:] = (hashes[1:] != hashes[:-1]) | (ids[1:] != ids[:-1])
+        hashes, ids = hashes[keep], ids[keep]
+        self.hashes, starts = np.unique(hashes, return_index=True)
+        self.offsets = np.append(starts, len(ids)).astype(np.int64)
+        self.ids = ids
+
+    def postings(self, token: str) -> np.ndarray:
+        self._merge()
+        pos = np.searchsorted(self.hashes, token_hash(token))
+        if pos == len(self.hashes) or self.hashes[pos] != token_hash(token):
+            return np.zeros(0, dtype=np.int64)
+        return self.ids[self.offsets[pos]:self.offsets[pos + 1]]
+
+    def containing(self, tokens: Sequence[str]) -> np.ndarray:
+        """Sorted ids of the documents that contain every one of `tokens`."""
+        if not tokens:
+            return np.zeros(0, dtype=np.int64)
+        lists = sorted((self.postings(t) for t in set(tokens)), key=len)
+        result = lists[0]
+        for ids in lists[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, ids, assume_unique=True)
+        return result
+
+    def save(self, directory: str, name: str) -> None:
+        self._merge()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.tokens.npz")
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, hashes=self.hashes, offsets=self.offsets, ids=self.ids, synced_id=np.array(self.synced_id))
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, directory: str, name: str) -> "TokenIndex | None":
+        try:
+            with np.load(os.path.join(directory, f"{name}.tokens.npz")) as data:
+                return cls(data["hashes"], data["offsets"], data["ids"], synced_id=int(data["synced_id"]))
+        except (OSError, ValueError, KeyError):
+            return None
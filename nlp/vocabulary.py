@@ -0,0 +1,220 @@
+"""
+Compiled, versioned skill vocabulary.
+
+data/skills.csv lists one skill per row, optionally followed by aliases:
+
+    kubernetes,k8s
+    javascript,js
+
+Compiling it yields a SkillVocabulary: canonical skills with ids that stay stable
+across versions, the alias map and every phrase pattern the extractor matches
+(spellings, hyphen/space variants and plurals, each pointing at its canonical
+skill). Compiled vocabularies are written to SKILLS_DIR as <version>.json plus
+current.json; get_vocabulary() picks up a new current.json, or recompiles an
+edited skills.csv, without a restart.
+"""
+from __future__ import annotations
+import csv
+import json
+import os
+import threading
+import time
+from typing import Iterable
+from config import SKILLS_DIR, SKILLS_RELOAD_SECONDS
+from .cache import content_hash
+
+SKILLS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "skills.csv")
+_FORMAT = 1
+
+
+def _pattern_variants(skill: str) -> set[str]:
+    # Spellings the parser-based extractor also accepted: "scikit learn" for
+    # "scikit-learn" (noun chunk variant) and simple plurals (via lemmas). Short
+    # skills get no "+s" form ("rs", "qas" and "gos" are other words); list their
+    # plurals as aliases in skills.csv instead ("api,apis")
+    variants = {skill, skill.replace("-", " ")}
+    if " " not in skill and skill.isalpha() and len(skill) >= 4 and not skill.endswith("s"):
+        variants.add(skill + "s")
+    return variants
+
+
+def read_skills_csv(path: str = SKILLS_PATH) -> dict[str, list[str]]:
+    """Canonical skill -> aliases, as listed in a skills CSV (all lowercased)."""
+    skills: dict[str, list[str]] = {}
+    if not os.path.exists(path):
+        return skills
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            names = [cell.strip().lower() for cell in row if cell.strip()]
+            if names:
+                aliases = skills.setdefault(names[0], [])
+                aliases.extend(a for a in names[1:] if a != names[0] and a not in aliases)
+    return skills
+
+
+class SkillVocabulary:
+    """One immutable vocabulary version; swapped as a whole when a new one is loaded."""
+
+    def __init__(self, ids: dict[str, int], aliases: dict[str, list[str]], patterns: dict[str, str], version: str):
+        self.ids = ids
+        self.aliases = aliases
+        # Lowercased phrase -> canonical skill
+        self.patterns = patterns
+        self.version = version
+        self.skills = frozenset(ids)
+        self._matcher = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def compile(cls, skills: dict[str, list[str]], previous: "SkillVocabulary | None" = None) -> "SkillVocabulary":
+        """
+        Build a vocabulary from canonical skill -> aliases. Skills already in
+        `previous` keep their ids; new ones are numbered after the highest id used.
+        """
+        ids = {}
+        next_id = max(previous.ids.values(), default=-1) + 1 if previous is not None else 0
+        for skill in sorted(skills):
+            if previous is not None and skill in previous.ids:
+                ids[skill] = previous.ids[skill]
+            else:
+                ids[skill] = next_id
+                next_id += 1
+        patterns: dict[str, str] = {}
+        # Canonical spellings first, so an alias never takes over another skill's name
+        for skill in sorted(skills):
+            for variant in _pattern_variants(skill):
+                patterns.setdefault(variant, skill)
+        for skill in sorted(skills):
+            for alias in skills[skill]:
+                for variant in _pattern_variants(alias):
+                    patterns.setdefault(variant, skill)
+        aliases = {skill: sorted(skills[skill]) for skill in sorted(skills)}
+        body = json.dumps({"ids": ids, "aliases": aliases, "patterns": patterns}, sort_keys=True)
+        return cls(ids, aliases, patterns, content_hash(f"{_FORMAT}:{body}")[:12])
+
+    def canonical(self, spelling: str) -> str | None:
+        """The canonical skill for a skill name, alias or one of their variants."""
+        return self.patterns.get(spelling.strip().lower())
+
+    @property
+    def matcher(self):
+        """spaCy PhraseMatcher over every pattern, labelled with its canonical skill; built on first use."""
+        with self._lock:
+            if self._matcher is None:
+                from spacy.matcher import PhraseMatcher
+                from .pipeline import get_tokenizer
+                tokenizer = get_tokenizer()
+                matcher = PhraseMatcher(tokenizer.vocab, attr="LOWER")
+                by_skill: dict[str, list[str]] = {}
+                for pattern, skill in self.patterns.items():
+                    by_skill.setdefault(skill, []).append(pattern)
+                for skill in sorted(by_skill):
+                    matcher.add(skill, [tokenizer.make_doc(p) for p in sorted(by_skill[skill])])
+                self._matcher = matcher
+            return self._matcher
+
+    def to_dict(self) -> dict:
+        return {"format": _FORMAT, "version": self.version, "ids": self.ids, "aliases": self.aliases,
+                "patterns": self.patterns}
+
+    def save(self, directory: str = SKILLS_DIR) -> None:
+        """Write <version>.json, then atomically replace current.json with it."""
+        os.makedirs(directory, exist_ok=True)
+        body = json.dumps(self.to_dict(), sort_keys=True)
+        for name in (f"{self.version}.json", "current.json"):
+            path = os.path.join(directory, name)
+            with open(path + f".{os.getpid()}.tmp", "w", encoding="utf-8") as f:
+                f.write(body)
+            os.replace(path + f".{os.getpid()}.tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "SkillVocabulary | None":
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") != _FORMAT:
+                return None
+            return cls(data["ids"], data["aliases"], data["patterns"], data["version"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def load_version(version: str | None, directory: str = SKILLS_DIR) -> SkillVocabulary | None:
+    """A previously compiled vocabulary, if its file is still in `directory`."""
+    if not version:
+        return None
+    return SkillVocabulary.load(os.path.join(directory, f"{version}.json"))
+
+
+def compile_vocabulary(csv_path: str = SKILLS_PATH, directory: str = SKILLS_DIR) -> SkillVocabulary:
+    """Compile the skills CSV against the current version (keeping its ids) and publish it."""
+    previous = SkillVocabulary.load(os.path.join(directory, "current.json"))
+    vocab = SkillVocabulary.compile(read_skills_csv(csv_path), previous)
+    try:
+        if previous is None or previous.version != vocab.version:
+            vocab.save(directory)
+        else:
+            # Unchanged: mark current.json as up to date with the CSV so it is not recompiled again
+            os.utime(os.path.join(directory, "current.json"))
+    except OSError:
+        # Read-only deployment: use the compiled vocabulary in memory only
+        pass
+    return vocab
+
+
+_lock = threading.Lock()
+_current: SkillVocabulary | None = None
+_checked_at = 0.0
+_mtimes: tuple[float | None, float | None] = (None, None)
+
+
+def _mtime(path: str) -> float | None:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def get_vocabulary() -> SkillVocabulary:
+    """
+    The current vocabulary. At most every SKILLS_RELOAD_SECONDS this checks whether
+    current.json was replaced (loaded) or skills.csv is newer (recompiled).
+    """
+    global _current, _checked_at, _mtimes
+    now = time.monotonic()
+    vocab = _current
+    if vocab is not None and now - _checked_at < SKILLS_RELOAD_SECONDS:
+        return vocab
+    with _lock:
+        if _current is not None and now - _checked_at < SKILLS_RELOAD_SECONDS:
+            return _current
+        current_path = os.path.join(SKILLS_DIR, "current.json")
+        mtimes = (_mtime(current_path), _mtime(SKILLS_PATH))
+        if _current is None or mtimes != _mtimes:
+            compiled, source = mtimes
+            if compiled is None or (source is not None and source > compiled):
+                vocab = compile_vocabulary()
+            else:
+                vocab = SkillVocabulary.load(current_path) or compile_vocabulary()
+            if _current is None or vocab.version != _current.version:
+                _current = vocab
+            _mtimes = (_mtime(current_path), mtimes[1])
+        _checked_at = now
+        return _current
+
+
+def canonical_skills(skills: Iterable[str]) -> list[str]:
+    """
+    Skill names as the extractor reports them: aliases and variants mapped to their
+    canonical skill, other names lowercased, blanks and duplicates dropped (order kept).
+    """
+    vocab = get_vocabulary()
+    names = (s.strip().lower() for s in skills if s and s.strip())
+    return list(dict.fromkeys(vocab.canonical(name) or name for name in names))
+
+
+def vocabulary_tokens(patterns: Iterable[str]) -> list[list[str]]:
+    """Lowercased tokens of each pattern, as the phrase matcher tokenizes them."""
+    from .pipeline import get_tokenizer
+    tokenizer = get_tokenizer()
+    return [[t.lower_ for t in tokenizer.make_doc(p) if not t.is_space] for p in patterns]
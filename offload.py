@@ -0,0 +1,130 @@
+"""
+Bounded process pool for CPU-bound request work (skill extraction, TF-IDF fits).
+
+With OFFLOAD_WORKERS > 0, run() executes a function in one of that many worker
+processes, so the request thread waiting on it leaves the GIL to the server's
+other threads (and, under the ASGI worker, to the event loop reading uploads).
+With OFFLOAD_WORKERS=0 it is called inline, as before.
+
+Request handlers wrap such work in admit(): with offloading on, at most
+OFFLOAD_MAX_WAITING requests per server process may be waiting on it at once; the
+next one is refused with Overloaded (HTTP 429) instead of queueing behind them. Background jobs (queued
+bulk batches, scripts) do not go through admit() and simply wait their turn.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Any, Callable, Sequence
+from config import OFFLOAD_MAX_WAITING, OFFLOAD_WORKERS
+from metrics import counter, register_collector
+
+logger = logging.getLogger(__name__)
+
+REJECTED = counter("offload_rejected_total", "Requests refused with 429 because too many were waiting for CPU work")
+
+_lock = threading.Lock()
+_pool: ProcessPoolExecutor | None = None
+_waiting = 0
+
+
+class Overloaded(RuntimeError):
+    """Too many requests are already waiting for CPU-bound work; retry later."""
+
+
+def enabled() -> bool:
+    return OFFLOAD_WORKERS > 0
+
+
+def _init_worker() -> None:
+    # Load the skill matcher when the process starts rather than in its first task
+    try:
+        from nlp.vocabulary import get_vocabulary
+        get_vocabulary().matcher
+    except Exception:
+        logger.warning("Offload worker could not preload the skill matcher", exc_info=True)
+
+
+def _noop(_: int) -> None:
+    return None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            # forkserver: workers start from a clean process, not a copy of one
+            # whose other threads may hold locks (DB, sqlite cache, logging)
+            _pool = ProcessPoolExecutor(OFFLOAD_WORKERS, mp_context=multiprocessing.get_context("forkserver"),
+                                        initializer=_init_worker)
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    # A worker died; the next call starts a fresh pool
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def start() -> None:
+    """Start every worker process now (e.g. as a server worker boots) instead of on first use."""
+    if enabled():
+        list(_get_pool().map(_noop, range(OFFLOAD_WORKERS)))
+
+
+def run(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """fn(*args, **kwargs) in a worker process (inline when offloading is off); fn must be picklable."""
+    if not enabled():
+        return fn(*args, **kwargs)
+    pool = _get_pool()
+    try:
+        return pool.submit(fn, *args, **kwargs).result()
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+
+
+def map_chunks(fn: Callable[[list], list], items: Sequence, chunk_size: int) -> list:
+    """fn over consecutive chunks of `items`, in parallel across the workers; results concatenated in order."""
+    items = list(items)
+    if not enabled() or len(items) <= chunk_size:
+        return run(fn, items) if items else []
+    pool = _get_pool()
+    try:
+        futures = [pool.submit(fn, items[start:start + chunk_size]) for start in range(0, len(items), chunk_size)]
+        return [result for future in futures for result in future.result()]
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+
+
+@contextmanager
+def admit():
+    """Count the request as waiting for CPU work, or raise Overloaded if too many already are."""
+    global _waiting
+    if not enabled():
+        # Inline work runs on the server's own threads, which bound it already
+        yield
+        return
+    with _lock:
+        if _waiting >= OFFLOAD_MAX_WAITING:
+            REJECTED.inc()
+            raise Overloaded("Server is busy, please retry shortly")
+        _waiting += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _waiting -= 1
+
+
+def _offload_samples():
+    yield ("offload_waiting_requests", "gauge", "Requests waiting for CPU-bound work", {}, _waiting)
+
+
+register_collector(_offload_samples)
@@ -0,0 +1 @@
+# screening package: command-line tools that run without the web app (python -m screening)
@@ -0,0 +1,66 @@
+"""
+python -m screening batch --jobs jobs.jsonl --resumes resumes/ [more/ ...] --out results.parquet
+python -m screening batch --job-ids 3,7 --resumes resumes/ --out results.csv --workers 64
+"""
+import argparse
+import logging
+import sys
+import time
+from screening import batch
+
+
+def _progress(interval: float = 5.0):
+    started = time.perf_counter()
+    last = [0.0]
+
+    def report(totals: dict) -> None:
+        now = time.perf_counter()
+        if now - last[0] < interval:
+            return
+        last[0] = now
+        done = totals["files"] - totals["resumed_files"]
+        print(f"{totals['files']} files, {totals['errors']} errors, "
+              f"{done / (now - started):.1f} files/s", file=sys.stderr, flush=True)
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m screening", description="Screening tools that run without the web app.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    cmd = commands.add_parser("batch", help="score directories of resumes against a set of jobs",
+                              description=batch.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    jobs = cmd.add_mutually_exclusive_group(required=True)
+    jobs.add_argument("--jobs", help='JSON-lines file of {"title", "description", "required_skills"} jobs')
+    jobs.add_argument("--job-ids", help="comma-separated ids of jobs stored in the database")
+    cmd.add_argument("--resumes", nargs="+", required=True, help="directories (searched recursively) or files")
+    cmd.add_argument("--out", required=True, help="results file: .parquet (needs pyarrow) or .csv")
+    cmd.add_argument("--workers", type=int, default=0, help="worker processes (default: one per CPU)")
+    cmd.add_argument("--chunk-size", type=int, default=128, help="resumes per work unit and part file")
+    cmd.add_argument("--min-score", type=float, default=0.0, help="leave out (resume, job) pairs scoring below this")
+    cmd.add_argument("--restart", action="store_true", help="discard the progress of an earlier run into --out")
+    cmd.add_argument("--keep-parts", action="store_true", help="keep the part files after merging them")
+    cmd.add_argument("--no-cache", action="store_true", help="don't read or write the parse cache file (CACHE_PATH)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+
+    started = time.perf_counter()
+    try:
+        if args.jobs:
+            job_list = batch.load_jobs(args.jobs)
+        else:
+            job_list = batch.stored_jobs([int(i) for i in args.job_ids.split(",") if i.strip()])
+        totals = batch.run_batch(job_list, args.resumes, args.out, workers=args.workers,
+                                 chunk_size=args.chunk_size, min_score=args.min_score,
+                                 restart=args.restart, keep_parts=args.keep_parts,
+                                 parse_cache=not args.no_cache, progress=_progress())
+    except (OSError, ValueError, RuntimeError) as e:
+        parser.exit(2, f"error: {e}\n")
+    resumed = f" ({totals['resumed_files']} from an earlier run)" if totals["resumed_files"] else ""
+    print(f"Screened {totals['files']} files{resumed} against {len(job_list)} jobs in "
+          f"{time.perf_counter() - started:.1f}s: {totals['resumes']} resumes, {totals['errors']} errors, "
+          f"{totals['rows']} rows -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
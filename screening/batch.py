@@ -0,0 +1,397 @@
+"""
+Offline batch screening: score directories of resume files against a set of jobs,
+without the web app and without writing to the database.
+
+    python -m screening batch --jobs jobs.jsonl --resumes resumes/ --out results.parquet
+
+Files are found by walking the directories lazily and handed out in chunks of
+--chunk-size to a process pool (one worker per CPU by default). Each worker
+parses its files as the bulk endpoints do (services.bulk_service.parse_uploads),
+extracts skills, scores the chunk against every job with
+services.match_service.score_matrix and writes the rows to a part file under
+<out>.parts/. Text similarity uses the saved vocabulary under INDEX_DIR; without
+one, a vectorizer is fitted per chunk, as /api/bulk-match does per request, and a
+warning is logged since scores then depend on --chunk-size.
+
+A part counts as done once it is recorded in <out>.parts/progress.jsonl; a rerun
+with the same jobs, options and vocabulary skips the files of recorded parts, so
+a crashed run resumes where it stopped. When every file is done the parts are
+merged into --out (.parquet needs pyarrow; .csv does not) and the parts directory
+is removed.
+--no-cache keeps the workers off the shared parse cache file, which a one-off
+scan of many files would only fill and contend on.
+"""
+from __future__ import annotations
+import glob
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
+from config import UPLOAD_MAX_BYTES
+from nlp.documents import is_supported
+from nlp.vocabulary import canonical_skills
+
+FORMATS = (".parquet", ".csv")
+PARQUET_MISSING = "Parquet output needs pyarrow. Run: pip install pyarrow (or write a .csv)"
+
+# One row per (resume, job) pair; a file that could not be parsed gets a single row
+# with only path, filename, extract_seconds and error set
+FIELDS = (
+    ("path", "text"), ("filename", "text"), ("name", "text"), ("contact", "text"), ("skills", "list"),
+    ("job_id", "int"), ("job_title", "text"), ("score", "float"), ("skills_match_score", "float"),
+    ("text_similarity_score", "float"), ("overlap_skills", "list"), ("missing_skills", "list"),
+    ("extract_seconds", "float"), ("error", "text"),
+)
+COLUMNS = tuple(name for name, _ in FIELDS)
+
+# Transient Job rows of the run, set up once per worker process
+_jobs: list = []
+
+logger = logging.getLogger(__name__)
+
+
+def load_jobs(path: str) -> list[dict[str, Any]]:
+    """
+    Jobs from a JSON-lines file of {"title", "description", "required_skills"} objects,
+    required_skills a list or a comma-separated string. A job's "id" defaults to its
+    position in the file. Raises ValueError for malformed lines.
+    """
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_no}: {e}")
+            if not isinstance(item, dict) or not item.get("description"):
+                raise ValueError(f"{path}:{line_no}: a job needs a description")
+            skills = item.get("required_skills") or []
+            if isinstance(skills, str):
+                skills = skills.split(",")
+            jobs.append({
+                "id": int(item.get("id", len(jobs) + 1)),
+                "title": str(item.get("title") or f"Job {len(jobs) + 1}"),
+                "description": item["description"],
+                "required_skills": canonical_skills(skills),
+            })
+    if not jobs:
+        raise ValueError(f"{path}: no jobs")
+    return jobs
+
+
+def stored_jobs(job_ids: list[int]) -> list[dict[str, Any]]:
+    """The listed jobs from the database, in the same form as load_jobs."""
+    from db import SessionLocal, init_db
+    from models import Job
+    init_db()
+    with SessionLocal() as session:
+        found = {job.id: job for job in session.query(Job).filter(Job.id.in_(job_ids))}
+        missing = [job_id for job_id in job_ids if job_id not in found]
+        if missing:
+            raise ValueError(f"unknown job ids: {', '.join(map(str, missing))}")
+        return [{"id": job.id, "title": job.title, "description": job.description,
+                 "required_skills": job.required_skills} for job in (found[job_id] for job_id in job_ids)]
+
+
+def iter_resume_paths(roots: Iterable[str], skip: frozenset[str] | set[str] = frozenset()) -> Iterator[str]:
+    """
+    Supported files under `roots` (directories, searched recursively, or files), each
+    directory in sorted order. Directories are listed as iteration reaches them.
+    """
+    for root in roots:
+        if os.path.isfile(root):
+            path = os.path.abspath(root)
+            if is_supported(path) and path not in skip:
+                yield path
+            continue
+        for dirpath, dirnames, filenames in os.walk(os.path.abspath(root)):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                if is_supported(filename) and path not in skip:
+                    yield path
+
+
+def vectorizer_version() -> str | None:
+    """
+    Version of the frozen vectorizer texts are scored by (the saved vocabulary's, or
+    the unfitted TEXT_VECTORIZER=hashing one's); None if score_matrix fits one per chunk.
+    """
+    from nlp.matching import frozen_vectorizer
+    from services.feature_service import get_feature_space
+    space = get_feature_space()
+    fitted = space.vectorizer if space is not None else None
+    vectorizer = frozen_vectorizer(fitted)
+    if vectorizer is None:
+        return None
+    return space.version if fitted is not None else f"hashing:{vectorizer.n_features}"
+
+
+def scores_are_stable() -> bool:
+    """Whether scores are independent of how files are chunked (see vectorizer_version)."""
+    return vectorizer_version() is not None
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError(PARQUET_MISSING)
+    return pyarrow, pyarrow.parquet
+
+
+def _parquet_schema():
+    pa, _ = _pyarrow()
+    types = {"text": pa.string(), "list": pa.list_(pa.string()), "int": pa.int64(), "float": pa.float64()}
+    return pa.schema([(name, types[kind]) for name, kind in FIELDS])
+
+
+def _write_part(rows: dict[str, list], path: str) -> None:
+    # Written under a temporary name, so a part file is always complete
+    tmp = path + ".tmp"
+    if path.endswith(".parquet"):
+        pa, pq = _pyarrow()
+        pq.write_table(pa.Table.from_pydict(rows, schema=_parquet_schema()), tmp)
+    else:
+        import pandas as pd
+        frame = pd.DataFrame(rows, columns=list(COLUMNS))
+        for name, kind in FIELDS:
+            if kind == "list":
+                frame[name] = [",".join(v) if v is not None else None for v in frame[name]]
+        frame["job_id"] = frame["job_id"].astype("Int64")
+        frame.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _merge(parts: list[str], out: str) -> None:
+    tmp = out + ".tmp"
+    if out.endswith(".parquet"):
+        _, pq = _pyarrow()
+        with pq.ParquetWriter(tmp, _parquet_schema()) as writer:
+            for part in parts:
+                writer.write_table(pq.read_table(part))
+    else:
+        with open(tmp, "wb") as dst:
+            dst.write((",".join(COLUMNS) + "\n").encode())
+            for part in parts:
+                with open(part, "rb") as src:
+                    src.readline()  # header
+                    shutil.copyfileobj(src, dst)
+    os.replace(tmp, out)
+
+
+def _init_worker(jobs: list[dict[str, Any]], parse_cache: bool) -> None:
+    from models import Job
+    from nlp.cache import set_disk_path
+    from nlp.vocabulary import get_vocabulary
+    from services.feature_service import get_feature_space
+    _jobs.clear()
+    for item in jobs:
+        job = Job(id=item["id"], title=item["title"], description=item["description"])
+        job.required_skills = item["required_skills"]
+        _jobs.append(job)
+    space = get_feature_space()
+    if space is not None and space.vectorizer is not None:
+        # Encoded once per process rather than by score_matrix for every chunk
+        for job in _jobs:
+            job.features, job.features_version = space.encode(job.description, job.required_skills), space.version
+    get_vocabulary().matcher
+    if not parse_cache:
+        set_disk_path("")
+
+
+def _read(path: str) -> bytes:
+    if os.path.getsize(path) > UPLOAD_MAX_BYTES:
+        raise ValueError(f"File is larger than {UPLOAD_MAX_BYTES // (1 << 20)} MB")
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _screen_chunk(part_path: str, paths: list[str], min_score: float) -> dict[str, int]:
+    # Runs in a worker process: parse, extract and score `paths`, then write their part file
+    from models import Candidate
+    from nlp.skills import extract_skills_batch
+    from services.bulk_service import parse_uploads
+    from services.match_service import score_matrix
+
+    rows: dict[str, list] = {name: [] for name in COLUMNS}
+
+    def add(**values) -> None:
+        for name in COLUMNS:
+            rows[name].append(values.get(name))
+
+    files, positions, n_errors = [], [], 0
+    for i, path in enumerate(paths):
+        try:
+            files.append((os.path.basename(path), _read(path)))
+            positions.append(i)
+        except (OSError, ValueError) as e:
+            add(path=path, filename=os.path.basename(path), extract_seconds=0.0, error=str(e))
+            n_errors += 1
+    parsed, errors = parse_uploads(files, max_workers=1)
+    for err in errors:
+        add(path=paths[positions[err["index"]]], filename=err["filename"],
+            extract_seconds=err["extract_seconds"], error=err["error"])
+    n_errors += len(errors)
+
+    cands = []
+    for p, skills in zip(parsed, extract_skills_batch([p["resume_text"] for p in parsed])):
+        cand = Candidate(name=p["name"], email=p["contact"], resume_text=p["resume_text"])
+        cand.skills = sorted(skills)
+        cands.append(cand)
+    if cands:
+        final, skills_scores, text_scores = score_matrix(_jobs, cands)
+        for row, (p, cand) in enumerate(zip(parsed, cands)):
+            cand_skills = set(cand.skills)
+            for col, job in enumerate(_jobs):
+                if final[row, col] < min_score:
+                    continue
+                job_skills = set(job.required_skills)
+                add(path=paths[positions[p["index"]]], filename=p["filename"], name=p["name"],
+                    contact=p["contact"], skills=cand.skills, job_id=job.id, job_title=job.title,
+                    score=round(float(final[row, col]), 4),
+                    skills_match_score=round(float(skills_scores[row, col]), 4),
+                    text_similarity_score=round(float(text_scores[row, col]), 4),
+                    overlap_skills=sorted(job_skills & cand_skills),
+                    missing_skills=sorted(job_skills - cand_skills),
+                    extract_seconds=p["extract_seconds"])
+    _write_part(rows, part_path)
+    return {"resumes": len(parsed), "errors": n_errors, "rows": len(rows["path"])}
+
+
+def _signature(jobs: list[dict[str, Any]], min_score: float, ext: str, vectorizer: str) -> str:
+    # What the recorded parts were computed for; resuming under anything else would mix results
+    payload = json.dumps({"jobs": jobs, "min_score": min_score, "format": ext, "vectorizer": vectorizer},
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _load_progress(parts_dir: str, signature: str, ext: str) -> list[dict[str, Any]]:
+    # Recorded parts of an earlier run into the same output; part files it never
+    # recorded (the run stopped before it could) are deleted and redone
+    os.makedirs(parts_dir, exist_ok=True)
+    state_path = os.path.join(parts_dir, "state.json")
+    if os.path.exists(state_path):
+        with open(state_path, encoding="utf-8") as f:
+            if json.load(f).get("signature") != signature:
+                raise ValueError(f"{parts_dir} holds the progress of a run with other jobs, options or "
+                                 "vocabulary; pass --restart to discard it")
+    else:
+        with open(state_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"signature": signature}, f)
+        os.replace(state_path + ".tmp", state_path)
+
+    entries = []
+    progress_path = os.path.join(parts_dir, "progress.jsonl")
+    if os.path.exists(progress_path):
+        with open(progress_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn by a crash mid-write: the part is redone
+                    break
+                if os.path.exists(os.path.join(parts_dir, entry["part"])):
+                    entries.append(entry)
+        with open(progress_path + ".tmp", "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+        os.replace(progress_path + ".tmp", progress_path)
+    recorded = {entry["part"] for entry in entries}
+    for path in glob.glob(os.path.join(parts_dir, f"part-*{ext}*")):
+        if os.path.basename(path) not in recorded:
+            os.remove(path)
+    return entries
+
+
+def _chunks(items: Iterator[str], size: int) -> Iterator[list[str]]:
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_batch(jobs: list[dict[str, Any]], roots: list[str], out: str, workers: int = 0, chunk_size: int = 128,
+              min_score: float = 0.0, restart: bool = False, keep_parts: bool = False, parse_cache: bool = True,
+              progress: Callable[[dict[str, Any]], None] | None = None) -> dict[str, Any]:
+    """
+    Screen every supported file under `roots` against `jobs` into `out`, resuming an
+    interrupted run into the same `out`. Returns totals over all runs: files,
+    resumes, errors and rows written. `progress` is called with the running totals
+    whenever a chunk completes. With parse_cache=False the workers neither read nor
+    write the parse cache file (CACHE_PATH).
+
+    Parts are only resumed under the vocabulary they were scored with. Without a
+    frozen vectorizer (scores_are_stable() is False) a warning is logged, and parts
+    are only resumed with the same chunk_size.
+    """
+    ext = os.path.splitext(out)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"--out must end in {' or '.join(FORMATS)}")
+    if ext == ".parquet":
+        _pyarrow()
+    workers = workers or os.cpu_count() or 1
+    parts_dir = out + ".parts"
+    if restart:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    vectorizer = vectorizer_version()
+    if vectorizer is None:
+        logger.warning("No saved vocabulary under INDEX_DIR, so text similarity is fitted per chunk and "
+                       "scores depend on --chunk-size; run scripts/revectorize.py --refit first")
+        vectorizer = f"per-chunk:{max(1, chunk_size)}"
+    entries = _load_progress(parts_dir, _signature(jobs, min_score, ext, vectorizer), ext)
+    done = {path for entry in entries for path in entry["files"]}
+    totals = {"files": len(done), "resumes": 0, "errors": 0, "rows": 0, "resumed_files": len(done)}
+    for entry in entries:
+        for key in ("resumes", "errors", "rows"):
+            totals[key] += entry[key]
+    next_part = max((int(entry["part"][5:11]) for entry in entries), default=-1) + 1
+
+    chunks = _chunks(iter_resume_paths(roots, skip=done), max(1, chunk_size))
+    # forkserver: workers start from a clean process, as in offload.py
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("forkserver"),
+                               initializer=_init_worker, initargs=(jobs, parse_cache))
+    pending = {}
+    try:
+        with open(os.path.join(parts_dir, "progress.jsonl"), "a", encoding="utf-8") as log:
+            while True:
+                # Two chunks per worker in flight keeps every core busy while the walk stays lazy
+                while len(pending) < 2 * workers:
+                    paths = next(chunks, None)
+                    if paths is None:
+                        break
+                    name = f"part-{next_part:06d}{ext}"
+                    next_part += 1
+                    future = pool.submit(_screen_chunk, os.path.join(parts_dir, name), paths, min_score)
+                    pending[future] = (name, paths)
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, paths = pending.pop(future)
+                    counts = future.result()
+                    log.write(json.dumps({"part": name, "files": paths, **counts}) + "\n")
+                    log.flush()
+                    os.fsync(log.fileno())
+                    entries.append({"part": name})
+                    totals["files"] += len(paths)
+                    for key, value in counts.items():
+                        totals[key] += value
+                    if progress is not None:
+                        progress(totals)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    # Part numbers follow the walk, so merging in their order keeps files in walk order
+    _merge([os.path.join(parts_dir, part) for part in sorted(entry["part"] for entry in entries)], out)
+    if not keep_parts:
+        shutil.rmtree(parts_dir)
+    return totals
@@ -0,0 +1,31 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import init_db, SessionLocal
+from nlp.vocabulary import SKILLS_PATH, compile_vocabulary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile the skills CSV into a new vocabulary version; "
+                                                 "running workers pick it up without a restart.")
+    parser.add_argument("--csv", default=SKILLS_PATH, help="skills CSV: skill[,alias...] per row")
+    parser.add_argument("--reextract", action="store_true",
+                        help="then re-extract the skills of stored candidates the change affects and re-encode features")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    vocab = compile_vocabulary(args.csv)
+    n_aliases = sum(len(a) for a in vocab.aliases.values())
+    print(f"Vocabulary {vocab.version}: {len(vocab.skills)} skills, {n_aliases} aliases, {len(vocab.patterns)} patterns.")
+    if args.reextract:
+        from services.feature_service import revectorize
+        from services.vocabulary_service import reextract_skills
+        init_db()
+        with SessionLocal() as session:
+            counts = reextract_skills(session, batch_size=args.batch_size)
+            print(f"Re-extracted {counts['checked']} candidates ({counts['changed']} changed); "
+                  f"{counts['marked_current']} unaffected.")
+            features = revectorize(session, batch_size=args.batch_size)
+        print(f"Features {features['version']}: encoded {features['jobs']} jobs and {features['candidates']} candidates.")
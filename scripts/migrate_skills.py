@@ -0,0 +1,22 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import init_db, SessionLocal
+from services.job_service import canonicalize_job_skills
+from services.resume_service import canonicalize_candidate_skills
+from services.skill_service import migrate_json_skills
+
+if __name__ == "__main__":
+    # Creates the skills / candidate_skills / job_skills tables if needed
+    init_db()
+    with SessionLocal() as session:
+        counts = migrate_json_skills(session)
+        # Jobs stored before requirements were canonicalized may list aliases ("k8s", "ml")
+        canonicalized = canonicalize_job_skills(session)
+        # ...and candidates extracted before those spellings became aliases hold them as skills
+        canonicalized_candidates = canonicalize_candidate_skills(session)
+    print(f"Linked skills for {counts['candidates']} candidates and {counts['jobs']} jobs.")
+    print(f"Canonicalized the required skills of {canonicalized} jobs "
+          f"and the skills of {canonicalized_candidates} candidates.")
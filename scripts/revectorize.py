@@ -0,0 +1,21 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import init_db, SessionLocal
+from services.feature_service import revectorize
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Encode stored jobs and resumes against the feature vocabulary.")
+    parser.add_argument("--refit", action="store_true", help="fit a new vocabulary version over the stored corpus first")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    init_db()
+    with SessionLocal() as session:
+        counts = revectorize(session, refit=args.refit, batch_size=args.batch_size)
+    print(f"Vocabulary {counts['version']}: encoded {counts['jobs']} jobs and {counts['candidates']} candidates.")
+    if counts["embedding_version"]:
+        print(f"Semantic embeddings: version {counts['embedding_version']}.")
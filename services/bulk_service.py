@@ -0,0 +1,325 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+import numpy as np
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from config import BULK_CHUNK_SIZE, BULK_QUEUE_WORKERS, BULK_STALE_SECONDS, BULK_WORKERS
+from db import SessionLocal, begin_write
+from metrics import counter, timed
+from models import BulkBatch, BulkItem, BulkResult, Job
+from nlp.cache import content_hash, get_cache
+from nlp.documents import SpooledFile, Upload, extract_texts, is_supported
+from nlp.extract_info import extract_name_and_contact, extract_name_from_filename
+from services.job_service import create_job
+from services.feature_service import get_feature_space
+from services.match_service import match_pairs, score_candidates, score_matrix
+from services.resume_service import create_candidates
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+logger = logging.getLogger(__name__)
+
+FILE_ERRORS = counter("bulk_file_errors_total", "Bulk uploads that could not be parsed")
+
+
+def parse_uploads(files: list[tuple[str, Upload]],
+                  max_workers: int = BULK_WORKERS) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Turn uploaded (filename, bytes or SpooledFile) pairs into candidate rows.
+
+    PDF text extraction runs in a process pool of max_workers (1: inline). Returns (parsed, errors) where each
+    parsed item has filename, name, contact and resume_text; both carry the
+    position of the file in `files` under "index" and the extraction wall time
+    under "extract_seconds".
+    """
+    errors = []
+    supported = []
+    for i, (name, data) in enumerate(files):
+        if is_supported(name):
+            supported.append((i, name, data))
+        else:
+            errors.append({"index": i, "filename": name, "error": "Unsupported file type", "extract_seconds": 0.0})
+
+    parsed = []
+    contacts = get_cache("contact")
+    extracted = extract_texts([(name, data) for _, name, data in supported], max_workers=max_workers)
+    for (i, filename, _), result in zip(supported, extracted):
+        seconds = round(result.seconds, 3)
+        if result.error:
+            errors.append({"index": i, "filename": filename, "error": result.error, "extract_seconds": seconds})
+            continue
+        text = result.text
+        if not text:
+            errors.append({"index": i, "filename": filename, "error": "No text could be extracted",
+                           "extract_seconds": seconds})
+            continue
+        with timed("contact_extract"):
+            name, contact = contacts.get_or_compute(content_hash(text), lambda: list(extract_name_and_contact(text)))
+        parsed.append({
+            "index": i,
+            "filename": filename,
+            "name": name or extract_name_from_filename(filename),
+            "contact": contact or "Not found",
+            "resume_text": text,
+            "extract_seconds": seconds,
+        })
+    for err in errors:
+        logger.warning("Could not parse %s: %s", err["filename"], err["error"])
+    FILE_ERRORS.inc(len(errors))
+    return parsed, errors
+
+
+def _ingest(session: Session, job: Job, parsed: list[dict[str, Any]],
+            top_k: int | None = None) -> Iterator[dict[str, Any]]:
+    # Insert parsed resumes and score them all against the job in one pass; result
+    # rows are built as they are consumed. With top_k only the best top_k get one,
+    # best first; otherwise they follow upload order
+    cands = create_candidates(session, [(p["name"], p["contact"], p["resume_text"]) for p in parsed])
+    by_id = {cand.id: (p, cand) for p, cand in zip(parsed, cands)}
+    for match in score_candidates(job, cands, top_k=top_k):
+        p, cand = by_id[match["candidate_id"]]
+        yield {
+            "candidate_id": cand.id,
+            "name": p["name"],
+            "contact": p["contact"],
+            "score": match["score"],
+            "overlap_skills": match["overlap_skills"],
+            "missing_skills": match["missing_skills"],
+            "all_skills": cand.skills,
+            "filename": p["filename"],
+            "extract_seconds": p["extract_seconds"],
+        }
+
+
+def _public_errors(errors: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    return [{"filename": e["filename"], "error": e["error"], "extract_seconds": e["extract_seconds"]} for e in errors]
+
+
+def _cache_matches(session: Session, pairs: list[tuple[int, int]]) -> None:
+    # Store the /api/match results of the listed pairs for when recruiters open them.
+    # Only worth it once rows carry stored features; without them each pair is a TF-IDF fit
+    if pairs and get_feature_space() is not None:
+        match_pairs(session, pairs, store_on_commit=True)
+
+
+def bulk_match(session: Session, title: str, description: str, required_skills: list[str],
+               files: list[tuple[str, Upload]], top_k: int | None = None) -> dict[str, Any]:
+    """
+    Create a job, ingest every resume and rank them against it.
+
+    Candidates are written with one flush and scored against the job in one
+    vectorized pass; the caller commits. With top_k only the best top_k results
+    get result rows (partitioned out of the score vector), though every resume
+    is still stored.
+    """
+    parsed, errors = parse_uploads(files)
+    job = create_job(session, title=title, description=description, required_skills=required_skills)
+    if top_k is None:
+        results = sorted(_ingest(session, job, parsed), key=lambda x: x["score"], reverse=True)
+    else:
+        results = list(_ingest(session, job, parsed, top_k=top_k))
+    _cache_matches(session, [(r["candidate_id"], job.id) for r in results])
+
+    return {
+        "job_id": job.id,
+        "job_title": title,
+        "total_candidates": len(parsed),
+        "candidates": results,
+        "errors": _public_errors(errors),
+    }
+
+
+def bulk_screen(session: Session, job_ids: list[int], files: list[tuple[str, Upload]],
+                top_k: int | None = None) -> dict[str, Any] | None:
+    """
+    Ingest every resume once and score it against each of several stored jobs.
+
+    Returns None if any job does not exist. The result has the parsed candidates
+    (in upload order), the candidates x jobs score matrix and one ranked
+    leaderboard per job (the best top_k, or all of them); the caller commits.
+    """
+    jobs = {job.id: job for job in session.query(Job).filter(Job.id.in_(job_ids))}
+    if len(jobs) < len(set(job_ids)):
+        return None
+    jobs = [jobs[job_id] for job_id in job_ids]
+
+    parsed, errors = parse_uploads(files)
+    cands = create_candidates(session, [(p["name"], p["contact"], p["resume_text"]) for p in parsed])
+    final, skills_scores, text_scores = score_matrix(jobs, cands)
+
+    k = len(cands) if top_k is None else min(top_k, len(cands))
+    leaderboards = []
+    for col, job in enumerate(jobs):
+        job_skills = set(job.required_skills)
+        order = np.argsort(-final[:, col], kind="stable")[:k]
+        leaderboards.append({
+            "job_id": job.id,
+            "job_title": job.title,
+            "candidates": [{
+                "rank": rank,
+                "candidate_id": cands[row].id,
+                "name": parsed[row]["name"],
+                "filename": parsed[row]["filename"],
+                "score": round(float(final[row, col]), 4),
+                "skills_match_score": round(float(skills_scores[row, col]), 4),
+                "text_similarity_score": round(float(text_scores[row, col]), 4),
+                "overlap_skills": sorted(job_skills & set(cands[row].skills)),
+                "missing_skills": sorted(job_skills - set(cands[row].skills)),
+            } for rank, row in enumerate(order, 1)],
+        })
+
+    _cache_matches(session, [(entry["candidate_id"], board["job_id"])
+                             for board in leaderboards for entry in board["candidates"]])
+
+    return {
+        "job_ids": [job.id for job in jobs],
+        "total_candidates": len(parsed),
+        "candidates": [{
+            "candidate_id": cand.id,
+            "name": p["name"],
+            "contact": p["contact"],
+            "all_skills": cand.skills,
+            "filename": p["filename"],
+            "extract_seconds": p["extract_seconds"],
+        } for p, cand in zip(parsed, cands)],
+        # scores[i][j]: candidates[i] against job_ids[j]
+        "scores": np.round(final, 4).tolist(),
+        "leaderboards": leaderboards,
+        "errors": _public_errors(errors),
+    }
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=BULK_QUEUE_WORKERS, thread_name_prefix="bulk")
+            # First use in this process: pick up batches left behind by a restart or crashed worker
+            for batch_id in _pending_batch_ids():
+                _executor.submit(process_bulk_batch, batch_id)
+        return _executor
+
+
+def _claimable():
+    stale = datetime.now(timezone.utc) - timedelta(seconds=BULK_STALE_SECONDS)
+    return or_(BulkBatch.status == "queued", and_(BulkBatch.status == "running", BulkBatch.updated_at < stale))
+
+
+def _pending_batch_ids() -> list[int]:
+    with SessionLocal() as session:
+        return [batch_id for (batch_id,) in session.query(BulkBatch.id).filter(_claimable()).order_by(BulkBatch.id)]
+
+
+def submit_bulk_batch(session: Session, title: str, description: str, required_skills: list[str],
+                      files: list[tuple[str, Upload]]) -> BulkBatch:
+    """Create the job and queue the uploads; processing starts in the background once committed."""
+    job = create_job(session, title=title, description=description, required_skills=required_skills)
+    batch = BulkBatch(job_id=job.id, status="queued", total_files=len(files))
+    session.add(batch)
+    session.flush()
+    session.add_all([
+        BulkItem(batch_id=batch.id, position=i, filename=name,
+                 data=data.read_bytes() if isinstance(data, SpooledFile) else data)
+        for i, (name, data) in enumerate(files)
+    ])
+    session.flush()
+    return batch
+
+
+def start_bulk_batch(batch_id: int) -> None:
+    _get_executor().submit(process_bulk_batch, batch_id)
+
+
+def process_bulk_batch(batch_id: int) -> None:
+    """Work through a queued batch chunk by chunk, committing ranked results as they are scored."""
+    try:
+        with SessionLocal() as session:
+            claimed = (
+                session.query(BulkBatch)
+                .filter(BulkBatch.id == batch_id, _claimable())
+                .update({"status": "running", "updated_at": func.now()}, synchronize_session=False)
+            )
+            session.commit()
+            if not claimed:
+                return
+
+            batch = session.get(BulkBatch, batch_id)
+            job = session.get(Job, batch.job_id)
+            try:
+                while True:
+                    items = (
+                        session.query(BulkItem)
+                        .filter(BulkItem.batch_id == batch_id, BulkItem.status == "pending")
+                        .order_by(BulkItem.position)
+                        .limit(BULK_CHUNK_SIZE)
+                        .all()
+                    )
+                    # End the read transaction before parsing; the writes below take the lock
+                    session.commit()
+                    if not items:
+                        break
+                    parsed, errors = parse_uploads([(item.filename, item.data or b"") for item in items])
+                    begin_write(session)
+                    for result in _ingest(session, job, parsed):
+                        row = BulkResult(batch_id=batch_id, candidate_id=result["candidate_id"], score=result["score"])
+                        row.result = result
+                        session.add(row)
+                    failed = {e["index"]: e["error"] for e in errors}
+                    for i, item in enumerate(items):
+                        item.status = "failed" if i in failed else "done"
+                        item.error = failed.get(i)
+                        item.data = None
+                    batch.processed_files += len(items)
+                    batch.updated_at = func.now()
+                    session.commit()
+                batch.status = "done"
+                session.commit()
+            except Exception as e:
+                logger.exception("Bulk batch %s failed", batch_id)
+                session.rollback()
+                batch.status = "failed"
+                batch.error = str(e)
+                session.commit()
+    finally:
+        SessionLocal.remove()
+
+
+def get_bulk_batch(session: Session, batch_id: int, after: int = 0) -> dict[str, Any] | None:
+    """
+    Progress of a batch plus its ranked results.
+
+    Only results with a result_id greater than `after` are returned, so clients
+    can fetch new rows incrementally.
+    """
+    batch = session.get(BulkBatch, batch_id)
+    if not batch:
+        return None
+    job = session.get(Job, batch.job_id)
+    rows = (
+        session.query(BulkResult)
+        .filter(BulkResult.batch_id == batch_id, BulkResult.id > after)
+        .order_by(BulkResult.score.desc(), BulkResult.id)
+        .all()
+    )
+    errors = (
+        session.query(BulkItem.filename, BulkItem.error)
+        .filter(BulkItem.batch_id == batch_id, BulkItem.status == "failed")
+        .order_by(BulkItem.position)
+        .all()
+    )
+    return {
+        "batch_id": batch.id,
+        "job_id": batch.job_id,
+        "job_title": job.title if job else None,
+        "status": batch.status,
+        "total_files": batch.total_files,
+        "processed_files": batch.processed_files,
+        "error": batch.error,
+        "last_result_id": max([after] + [r.id for r in rows]),
+        "candidates": [dict(r.result, result_id=r.id) for r in rows],
+        "errors": [{"filename": name, "error": error} for name, error in errors],
+    }
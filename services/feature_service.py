@@ -0,0 +1,235 @@
+import logging
+import os
+import threading
+from functools import lru_cache
+from sqlalchemy import event, func, or_
+from sqlalchemy.orm import Session
+from config import FEATURES_BOOTSTRAP_DOCS, INDEX_DIR, SEMANTIC_DIM, SEMANTIC_MODEL
+from db import SessionLocal, begin_write
+from metrics import timed
+from models import Candidate, Job
+from nlp.embeddings import LsaEmbedder, SpacyVectorEmbedder, to_bytes
+from nlp.features import FeatureSpace
+from nlp.skills import skill_vocab
+from services.match_cache import prune as prune_match_scores
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_space: FeatureSpace | None = None
+_mtime: float | None = None
+_revectorizing = threading.Event()
+_lsa: LsaEmbedder | None = None
+_lsa_mtime: float | None = None
+
+
+def _disk_mtime(name: str = "features") -> float | None:
+    try:
+        return os.path.getmtime(os.path.join(INDEX_DIR, f"{name}.joblib"))
+    except OSError:
+        return None
+
+
+def get_feature_space() -> FeatureSpace | None:
+    """The current feature space, reloaded when another process saved a new version."""
+    global _space, _mtime
+    with _lock:
+        disk_mtime = _disk_mtime()
+        if disk_mtime is not None and disk_mtime != _mtime:
+            _space = FeatureSpace.load(INDEX_DIR) or _space
+            _mtime = disk_mtime
+        return _space
+
+
+def _set_feature_space(space: FeatureSpace) -> None:
+    global _space, _mtime
+    with _lock:
+        space.save(INDEX_DIR)
+        _space = space
+        _mtime = _disk_mtime()
+
+
+@lru_cache(maxsize=1)
+def _spacy_embedder(model: str) -> SpacyVectorEmbedder | None:
+    try:
+        return SpacyVectorEmbedder(model)
+    except RuntimeError as e:
+        logger.warning("Semantic similarity disabled: %s", e)
+        return None
+
+
+def get_embedder() -> LsaEmbedder | SpacyVectorEmbedder | None:
+    """
+    The embedder behind semantic similarity, or None if SEMANTIC_MODEL is empty, the
+    spaCy model is unavailable, or (for lsa) none has been fitted yet.
+    """
+    global _lsa, _lsa_mtime
+    if not SEMANTIC_MODEL:
+        return None
+    if SEMANTIC_MODEL != "lsa":
+        return _spacy_embedder(SEMANTIC_MODEL)
+    with _lock:
+        disk_mtime = _disk_mtime("semantic")
+        if disk_mtime is not None and disk_mtime != _lsa_mtime:
+            _lsa = LsaEmbedder.load(INDEX_DIR) or _lsa
+            _lsa_mtime = disk_mtime
+        return _lsa
+
+
+def _set_lsa_embedder(embedder: LsaEmbedder) -> None:
+    global _lsa, _lsa_mtime
+    with _lock:
+        embedder.save(INDEX_DIR)
+        _lsa = embedder
+        _lsa_mtime = _disk_mtime("semantic")
+
+
+def _embed(rows, texts, embedder) -> None:
+    for row, vector in zip(rows, embedder.encode(texts)):
+        row.embedding = to_bytes(vector)
+        row.embedding_version = embedder.version
+
+
+@timed("vectorize")
+def _encode(session: Session, rows, docs) -> None:
+    space = get_feature_space()
+    if space is None:
+        session.info["features_bootstrap"] = True
+        return
+    for row, blob in zip(rows, space.encode_many(docs)):
+        row.features = blob
+        row.features_version = space.version
+    embedder = get_embedder()
+    if embedder is not None:
+        _embed(rows, [text for text, _ in docs], embedder)
+
+
+def encode_candidates(session: Session, cands: list[Candidate]) -> None:
+    """Store match features on new candidates (no-op until a feature space exists)."""
+    _encode(session, cands, [(c.resume_text, c.skills) for c in cands])
+
+
+def encode_jobs(session: Session, jobs: list[Job]) -> None:
+    """Store match features on new jobs (no-op until a feature space exists)."""
+    _encode(session, jobs, [(j.description, j.required_skills) for j in jobs])
+
+
+def _corpus(session: Session, batch_size: int):
+    for model, column in ((Job, Job.description), (Candidate, Candidate.resume_text)):
+        for (text,) in session.query(column).order_by(model.id).yield_per(batch_size):
+            yield text
+
+
+def _stale(column, version: str | None):
+    return or_(column.is_(None), column != version)
+
+
+def _revectorize_table(session: Session, space: FeatureSpace, embedder, model, text_attr: str, skills_attr: str,
+                       batch_size: int) -> int:
+    updated = 0
+    last_id = 0
+    stale = _stale(model.features_version, space.version)
+    if embedder is not None:
+        stale = or_(stale, _stale(model.embedding_version, embedder.version))
+    while True:
+        begin_write(session)
+        rows = (
+            session.query(model)
+            .filter(model.id > last_id, stale)
+            .order_by(model.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            session.commit()
+            return updated
+        encode = [(getattr(r, text_attr), getattr(r, skills_attr)) for r in rows]
+        for row, blob in zip(rows, space.encode_many(encode)):
+            row.features = blob
+            row.features_version = space.version
+        if embedder is not None:
+            _embed(rows, [text for text, _ in encode], embedder)
+        session.commit()
+        updated += len(rows)
+        last_id = rows[-1].id
+        session.expunge_all()
+
+
+def revectorize(session: Session, refit: bool = False, batch_size: int = 500) -> dict[str, object]:
+    """
+    Re-encode every row whose features are missing or from another vocabulary version.
+
+    refit=True (or no saved feature space) first fits a new vocabulary over all stored
+    job descriptions and resumes. Rows are committed in batches, so the command can be
+    interrupted and re-run; matching falls back to on-the-fly scoring for rows not yet
+    re-encoded.
+
+    A changed skill vocabulary gets a new version with the same text vocabulary.
+    With SEMANTIC_MODEL=lsa the semantic embedder is fitted alongside the vocabulary
+    (and whenever none exists yet), and stale embeddings are re-encoded the same way.
+    Cached match scores from other versions are deleted at the end.
+    """
+    space = get_feature_space()
+    refitted = refit or space is None
+    if refitted:
+        space = FeatureSpace.fit(_corpus(session, batch_size))
+        _set_feature_space(space)
+        session.commit()
+    elif space.skills != sorted(skill_vocab()):
+        # The skill vocabulary changed: keep the text vocabulary, lay out the new skill bits
+        space = FeatureSpace(vectorizer=space.vectorizer)
+        _set_feature_space(space)
+        session.commit()
+    embedder = get_embedder()
+    if SEMANTIC_MODEL == "lsa" and space.vectorizer is not None and (refitted or embedder is None):
+        embedder = LsaEmbedder.fit(space.vectorizer, _corpus(session, batch_size), SEMANTIC_DIM)
+        if embedder is not None:
+            _set_lsa_embedder(embedder)
+        session.commit()
+    counts = {
+        "version": space.version,
+        "embedding_version": embedder.version if embedder is not None else None,
+        "jobs": _revectorize_table(session, space, embedder, Job, "description", "required_skills", batch_size),
+        "candidates": _revectorize_table(session, space, embedder, Candidate, "resume_text", "skills", batch_size),
+    }
+    begin_write(session)
+    counts["pruned_match_scores"] = prune_match_scores(session, space.version, embedder)
+    session.commit()
+    return counts
+
+
+def start_revectorize(refit: bool = False, min_docs: int = 0) -> bool:
+    """
+    Run revectorize in a background thread; False if one is already running in this process.
+    With min_docs, nothing happens unless at least that many jobs + resumes are stored.
+    """
+    with _lock:
+        if _revectorizing.is_set():
+            return False
+        _revectorizing.set()
+
+    def _run():
+        try:
+            with SessionLocal() as session:
+                stored = session.query(func.count(Candidate.id)).scalar() + session.query(func.count(Job.id)).scalar()
+                if stored >= min_docs:
+                    revectorize(session, refit=refit)
+        finally:
+            SessionLocal.remove()
+            _revectorizing.clear()
+
+    threading.Thread(target=_run, name="revectorize", daemon=True).start()
+    return True
+
+
+@event.listens_for(Session, "after_commit")
+def _bootstrap_feature_space(session: Session) -> None:
+    # Rows were written without features because no vocabulary exists yet: fit the
+    # first one in the background once there is a corpus worth fitting
+    if session.info.pop("features_bootstrap", False) and get_feature_space() is None:
+        start_revectorize(min_docs=FEATURES_BOOTSTRAP_DOCS)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_bootstrap(session: Session) -> None:
+    session.info.pop("features_bootstrap", None)
@@ -0,0 +1,264 @@
+import json
+import logging
+import os
+import threading
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from config import INDEX_DIR
+from metrics import timed
+from models import Candidate, Job
+from nlp.retrieval import RetrievalIndex
+
+# Persist in-memory additions after this many new rows
+_SAVE_EVERY = 64
+
+logger = logging.getLogger(__name__)
+
+
+class _ManagedIndex:
+    """
+    Process-wide RetrievalIndex over one table, persisted under INDEX_DIR.
+
+    The index is loaded from disk on first use and catches up with rows committed
+    since it was saved (e.g. by another worker process). Rows inserted through the
+    services are queued on the session and added once it commits.
+
+    The first build (none saved yet) blocks the requests that need it. Refitting
+    (the index has outgrown its vocabulary) runs in a background thread, and so do
+    saves of rows added since the last one; requests keep using the current index
+    until the refitted one is swapped in.
+    """
+
+    def __init__(self, name: str, model, text_column, skills_column):
+        self.name = name
+        self.model = model
+        self.text_column = text_column
+        self.skills_column = skills_column
+        self.lock = threading.Lock()
+        # Held for the first build, so concurrent first requests wait for one build
+        self.build_lock = threading.Lock()
+        self.index: RetrievalIndex | None = None
+        self.mtime: float | None = None
+        self.unsaved = 0
+        self.rebuilding = False
+        self.saving = False
+
+    def _disk_mtime(self) -> float | None:
+        try:
+            return os.path.getmtime(os.path.join(INDEX_DIR, f"{self.name}.joblib"))
+        except OSError:
+            return None
+
+    def _save(self, index: RetrievalIndex) -> None:
+        index.save(INDEX_DIR, self.name)
+        self.mtime = self._disk_mtime()
+        self.unsaved = 0
+
+    def _docs(self, session: Session, ids=None):
+        query = session.query(self.model.id, self.text_column, self.skills_column)
+        if ids is not None:
+            query = query.filter(self.model.id.in_(ids))
+        for doc_id, text, skills_json in query.order_by(self.model.id).yield_per(1000):
+            try:
+                skills = json.loads(skills_json or "[]")
+            except ValueError:
+                skills = []
+            yield doc_id, text, skills
+
+    def rebuild(self, session: Session) -> RetrievalIndex:
+        index = RetrievalIndex.build(self._docs(session))
+        with self.lock:
+            self.index = index
+            self._save(index)
+        return index
+
+    def _rebuild_in_background(self) -> None:
+        with self.lock:
+            if self.rebuilding:
+                return
+            self.rebuilding = True
+
+        def run():
+            from db import SessionLocal
+            try:
+                self.rebuild(SessionLocal())
+            except Exception:
+                logger.exception("Rebuilding the %s index failed", self.name)
+            finally:
+                SessionLocal.remove()
+                with self.lock:
+                    self.rebuilding = False
+
+        threading.Thread(target=run, name=f"index-rebuild-{self.name}", daemon=True).start()
+
+    def _save_in_background(self) -> None:
+        # Called with self.lock held; one save at a time, and none over a pending refit
+        if self.saving or self.unsaved < _SAVE_EVERY or self.index is None or self.index.needs_refit:
+            return
+        self.saving = True
+
+        def run():
+            try:
+                with self.lock:
+                    if self.index is not None and not self.index.needs_refit:
+                        self._save(self.index)
+            except Exception:
+                logger.exception("Saving the %s index failed", self.name)
+            finally:
+                with self.lock:
+                    self.saving = False
+
+        threading.Thread(target=run, name=f"index-save-{self.name}", daemon=True).start()
+
+    def _first_build(self, session: Session) -> RetrievalIndex:
+        with self.build_lock:
+            with self.lock:
+                if self.index is not None:
+                    return self.index
+            return self.rebuild(session)
+
+    def get(self, session: Session, wait: bool = False) -> RetrievalIndex:
+        """
+        The index, caught up with committed rows; built first if there is none. A refit
+        it needs runs in the background unless `wait`, in which case it is done first.
+        """
+        with self.lock:
+            disk_mtime = self._disk_mtime()
+            if self.index is None or (disk_mtime is not None and disk_mtime != self.mtime):
+                self.index = RetrievalIndex.load(INDEX_DIR, self.name)
+                self.mtime = disk_mtime
+            index = self.index
+
+        if index is None:
+            return self._first_build(session)
+
+        new_ids = [
+            doc_id for (doc_id,) in
+            session.query(self.model.id).filter(self.model.id > index.synced_id).order_by(self.model.id)
+        ]
+        missing = [doc_id for doc_id in new_ids if doc_id not in index]
+        docs = list(self._docs(session, missing)) if missing else []
+
+        with self.lock:
+            for doc_id, text, skills in docs:
+                index.add(doc_id, text, skills)
+            if new_ids:
+                index.synced_id = max(index.synced_id, new_ids[-1])
+            self.unsaved += len(docs)
+            refit = index.needs_refit
+            self._save_in_background()
+
+        if refit:
+            if wait:
+                return self.rebuild(session)
+            self._rebuild_in_background()
+        return index
+
+    def search(self, session: Session, text: str, skills, k: int, **kwargs) -> list[tuple[int, float, float, float]]:
+        index = self.get(session)
+        with self.lock, timed("index_search"):
+            return index.top_k_blended(text, skills, k, **kwargs)
+
+    def skill_scores(self, session: Session, skills, min_skills: int = 0,
+                     **kwargs) -> tuple[np.ndarray, np.ndarray]:
+        index = self.get(session)
+        with self.lock:
+            # Reading the matrix folds rows added since the last search into index.ids
+            index.matrix
+            ids, scores = index.ids.copy(), index.skill_scores(skills, **kwargs)
+            if min_skills > 0:
+                rows = index.rows_with(skills, min_skills)
+                ids, scores = ids[rows], scores[rows]
+            return ids, scores
+
+    def queue(self, session: Session, doc_id: int, text: str, skills) -> None:
+        if self.index is None:
+            # Not loaded in this process; get() catches up from the DB, so don't hold the text
+            return
+        session.info.setdefault(f"indexed_{self.name}", []).append((doc_id, text, list(skills)))
+
+    def on_commit(self, session: Session) -> None:
+        pending = session.info.pop(f"indexed_{self.name}", None)
+        if not pending:
+            return
+        with self.lock:
+            if self.index is None:
+                # Not loaded in this process; the next get() catches up from the DB
+                return
+            for doc_id, text, skills in pending:
+                self.index.add(doc_id, text, skills)
+            self.unsaved += len(pending)
+            self._save_in_background()
+
+    def on_rollback(self, session: Session) -> None:
+        session.info.pop(f"indexed_{self.name}", None)
+
+
+_jobs = _ManagedIndex("jobs", Job, Job.description, Job.required_skills_json)
+_candidates = _ManagedIndex("candidates", Candidate, Candidate.resume_text, Candidate.skills_json)
+
+
+def get_job_index(session: Session) -> RetrievalIndex:
+    """The job index, built or refitted first if it needs to be (e.g. at startup)."""
+    return _jobs.get(session, wait=True)
+
+
+def rebuild_job_index(session: Session) -> RetrievalIndex:
+    return _jobs.rebuild(session)
+
+
+def get_candidate_index(session: Session) -> RetrievalIndex:
+    """The candidate index, built or refitted first if it needs to be (e.g. at startup)."""
+    return _candidates.get(session, wait=True)
+
+
+def rebuild_candidate_index(session: Session) -> RetrievalIndex:
+    return _candidates.rebuild(session)
+
+
+def search_jobs(session: Session, text: str, skills, k: int) -> list[tuple[int, float, float, float]]:
+    """Top-k (job_id, score, skills_score, text_score) for a resume; skills share is per job requirement."""
+    return _jobs.search(session, text, skills, k)
+
+
+def search_candidates(session: Session, text: str, skills, k: int,
+                      min_match: int = 0) -> list[tuple[int, float, float, float]]:
+    """
+    Top-k (candidate_id, score, skills_score, text_score) for a job; skills share is of
+    the job's requirements. With min_match, only candidates having at least that many
+    of them are considered (and text-scored).
+    """
+    return _candidates.search(session, text, skills, k, query_skills_denominator=True, min_skills=min_match)
+
+
+def job_skill_scores(session: Session, skills) -> tuple[np.ndarray, np.ndarray]:
+    """(job ids, skills score of each job against a resume's skills), as in search_jobs."""
+    return _jobs.skill_scores(session, skills)
+
+
+def candidate_skill_scores(session: Session, skills, min_match: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """(candidate ids, share of the job's `skills` each candidate has), as in search_candidates."""
+    return _candidates.skill_scores(session, skills, min_skills=min_match, query_skills_denominator=True)
+
+
+def on_job_created(session: Session, job: Job) -> None:
+    """Queue a freshly flushed job for the index; it is added once the session commits."""
+    _jobs.queue(session, job.id, job.description, job.required_skills)
+
+
+def on_candidate_created(session: Session, cand: Candidate) -> None:
+    """Queue a freshly flushed candidate for the index; it is added once the session commits."""
+    _candidates.queue(session, cand.id, cand.resume_text, cand.skills)
+
+
+@event.listens_for(Session, "after_commit")
+def _index_committed_rows(session: Session) -> None:
+    _jobs.on_commit(session)
+    _candidates.on_commit(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_uncommitted_rows(session: Session) -> None:
+    _jobs.on_rollback(session)
+    _candidates.on_rollback(session)
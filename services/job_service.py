@@ -1,12 +1,61 @@
-from models import Job
+from db import begin_write
+from models import Job, job_skills
+from nlp.vocabulary import canonical_skills
+from services.feature_service import encode_jobs
+from services.index_service import on_job_created, rebuild_job_index
+from services.skill_service import set_job_skills
 
 
 def create_job(session, title: str, description: str, required_skills: list[str] | None = None) -> Job:
-    job = Job(title=title, description=description)
-    job.required_skills = [s.strip().lower() for s in (required_skills or []) if s and s.strip()]
-    session.add(job)
-    session.flush()
-    return job
+    return create_jobs(session, [(title, description, required_skills)])[0]
+
+
+def create_jobs(session, rows: list[tuple[str, str, list[str] | None]]) -> list[Job]:
+    """Insert many (title, description, required_skills) rows with a single flush."""
+    jobs = []
+    for title, description, required_skills in rows:
+        job = Job(title=title, description=description)
+        job.required_skills = canonical_skills(required_skills or [])
+        jobs.append(job)
+    if jobs:
+        encode_jobs(session, jobs)
+        session.add_all(jobs)
+        session.flush()
+        set_job_skills(session, jobs)
+        for job in jobs:
+            on_job_created(session, job)
+    return jobs
+
+
+def canonicalize_job_skills(session, batch_size: int = 1000) -> int:
+    """
+    Rewrite stored jobs' required skills with canonical_skills (e.g. "k8s" -> "kubernetes"),
+    re-encoding and relinking the jobs that change; returns how many did.
+    """
+    changed_total = 0
+    last_id = 0
+    while True:
+        begin_write(session)
+        jobs = session.query(Job).filter(Job.id > last_id).order_by(Job.id).limit(batch_size).all()
+        if not jobs:
+            session.commit()
+            break
+        last_id = jobs[-1].id
+        changed = []
+        for job in jobs:
+            skills = canonical_skills(job.required_skills)
+            if skills != job.required_skills:
+                job.required_skills = skills
+                changed.append(job)
+        if changed:
+            encode_jobs(session, changed)
+            session.execute(job_skills.delete().where(job_skills.c.job_id.in_([j.id for j in changed])))
+            set_job_skills(session, changed)
+        session.commit()
+        changed_total += len(changed)
+    if changed_total:
+        rebuild_job_index(session)
+    return changed_total
 
 
 def list_jobs(session) -> list[Job]:
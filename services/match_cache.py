@@ -0,0 +1,222 @@
+"""
+Store of computed candidate-job match results.
+
+Results are keyed by (candidate_id, job_id, scoring version) and held in a
+per-process LRU in front of the match_scores table, which every process shares.
+The scoring version covers the text mode and the feature space (or embedder)
+the score was computed with, so revectorizing retires old entries by itself.
+Each entry also carries the revisions of the two rows; models bumps a row's
+revision (and deletes its stored scores) when its text or skills change, so an
+entry is only served while both rows are unchanged.
+
+Computed results are buffered and written to the table in one transaction after
+MATCH_CACHE_WRITE_DELAY seconds, off the request thread.
+"""
+import atexit
+import json
+import logging
+import threading
+from typing import Any, Iterable, NamedTuple
+from sqlalchemy import delete, event, insert, select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from config import MATCH_CACHE, MATCH_CACHE_ITEMS, MATCH_CACHE_WRITE_DELAY, TEXT_VECTORIZER
+from db import SessionLocal, begin_write
+from metrics import counter
+from models import Candidate, Job, MatchScore
+from nlp.cache import ContentCache
+
+logger = logging.getLogger(__name__)
+
+# Bump when the scoring formula or result fields change
+SCORING_VERSION = 1
+_CHUNK = 500
+
+LOOKUPS = counter("match_cache_lookups_total", "Match score lookups by outcome", ("result",))
+
+_memory = ContentCache("match", max_items=MATCH_CACHE_ITEMS, path="")
+_lock = threading.Lock()
+_pending: dict[tuple[int, int, str], tuple[int, int, dict[str, Any]]] = {}
+_timer: threading.Timer | None = None
+
+
+class PairKey(NamedTuple):
+    candidate_id: int
+    job_id: int
+    version: str
+    candidate_revision: int
+    job_revision: int
+
+
+def _chunks(items: list, size: int = _CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def scoring_version(text_mode: str, features_version: str | None, embedder=None) -> str:
+    """
+    Version of a score: the text mode plus the version of the feature space it was
+    scored with (None: before any vocabulary, from a fit over the two texts or from
+    unweighted hashed terms), and the embedder's version for semantic similarity.
+    """
+    unfitted = "hash" if TEXT_VECTORIZER == "hashing" else "fit"
+    version = f"{SCORING_VERSION}:{text_mode}:{features_version or unfitted}"
+    if text_mode == "semantic":
+        version += f":{embedder.version if embedder is not None else ''}"
+    return version
+
+
+def _states(session: Session, model, ids: Iterable[int]) -> dict[int, tuple[int, str | None]]:
+    # id -> (revision, features_version) of the rows that exist
+    states = {}
+    for chunk in _chunks(sorted(set(ids))):
+        rows = session.execute(select(model.id, model.revision, model.features_version).where(model.id.in_(chunk)))
+        states.update((row_id, (revision or 0, features_version)) for row_id, revision, features_version in rows)
+    return states
+
+
+def pair_keys(session: Session, pairs: list[tuple[int, int]], text_mode: str, space,
+              embedder=None) -> list[PairKey | None]:
+    """Cache key of each (candidate_id, job_id) pair, None where either row does not exist."""
+    cands = _states(session, Candidate, (c for c, _ in pairs))
+    jobs = _states(session, Job, (j for _, j in pairs))
+    keys: list[PairKey | None] = []
+    for c, j in pairs:
+        if c not in cands or j not in jobs:
+            keys.append(None)
+            continue
+        (cand_revision, cand_features), (job_revision, job_features) = cands[c], jobs[j]
+        # Texts without current features are transformed by the space's vectorizer, which
+        # scores them the same; only a space without one leaves them to a fit of their own
+        current = space is not None and cand_features == space.version and job_features == space.version
+        scored_with = space is not None and (current or space.vectorizer is not None)
+        version = scoring_version(text_mode, space.version if scored_with else None, embedder)
+        keys.append(PairKey(c, j, version, cand_revision, job_revision))
+    return keys
+
+
+def _memory_key(key: PairKey) -> str:
+    return f"{key.candidate_id}:{key.job_id}:{key.version}"
+
+
+def get_many(session: Session, keys: Iterable[PairKey]) -> dict[PairKey, dict[str, Any]]:
+    """Stored results for `keys`, from memory first, then from the match_scores table."""
+    keys = list(dict.fromkeys(keys))
+    if not MATCH_CACHE or not keys:
+        return {}
+    found: dict[PairKey, dict[str, Any]] = {}
+    in_memory = _memory.get_many(_memory_key(k) for k in keys)
+    missing = []
+    for key in keys:
+        entry = in_memory.get(_memory_key(key))
+        if entry is not None and entry[0] == key.candidate_revision and entry[1] == key.job_revision:
+            found[key] = entry[2]
+        else:
+            missing.append(key)
+    memory_hits = len(found)
+
+    by_version: dict[str, dict[tuple[int, int], PairKey]] = {}
+    for key in missing:
+        by_version.setdefault(key.version, {})[(key.candidate_id, key.job_id)] = key
+    for version, wanted in by_version.items():
+        for chunk in _chunks(list(wanted)):
+            rows = session.execute(
+                select(MatchScore.candidate_id, MatchScore.job_id, MatchScore.candidate_revision,
+                       MatchScore.job_revision, MatchScore.result_json)
+                .where(MatchScore.version == version, tuple_(MatchScore.candidate_id, MatchScore.job_id).in_(chunk))
+            )
+            for c, j, cand_revision, job_revision, result_json in rows:
+                key = wanted[(c, j)]
+                if cand_revision == key.candidate_revision and job_revision == key.job_revision:
+                    found[key] = json.loads(result_json)
+                    _memory.put(_memory_key(key), [cand_revision, job_revision, found[key]])
+
+    LOOKUPS.inc(memory_hits, result="memory_hit")
+    LOOKUPS.inc(len(found) - memory_hits, result="table_hit")
+    LOOKUPS.inc(len(keys) - len(found), result="miss")
+    return found
+
+
+def get(session: Session, key: PairKey) -> dict[str, Any] | None:
+    return get_many(session, [key]).get(key)
+
+
+def put_many(items: Iterable[tuple[PairKey, dict[str, Any]]], session: Session | None = None) -> None:
+    """
+    Store computed results. Pass the session when its open transaction wrote either
+    row: the results are then kept only once it commits.
+    """
+    if not MATCH_CACHE:
+        return
+    items = list(items)
+    if session is not None:
+        session.info.setdefault("match_cache_pending", []).extend(items)
+        return
+    global _timer
+    with _lock:
+        for key, result in items:
+            _memory.put(_memory_key(key), [key.candidate_revision, key.job_revision, result])
+            _pending[(key.candidate_id, key.job_id, key.version)] = (key.candidate_revision, key.job_revision, result)
+        if _pending and _timer is None:
+            _timer = threading.Timer(MATCH_CACHE_WRITE_DELAY, flush)
+            _timer.daemon = True
+            _timer.start()
+
+
+def flush() -> int:
+    """Write buffered results to the match_scores table now; returns how many were written."""
+    global _pending, _timer
+    with _lock:
+        pending, _pending = _pending, {}
+        if _timer is not None and _timer is not threading.current_thread():
+            _timer.cancel()
+        _timer = None
+    if not pending:
+        return 0
+    by_version: dict[str, list[tuple[int, int]]] = {}
+    for c, j, version in pending:
+        by_version.setdefault(version, []).append((c, j))
+    try:
+        # A session of its own: flush() may run on a thread that has one open
+        with SessionLocal.session_factory() as session:
+            begin_write(session)
+            for version, pairs in by_version.items():
+                for chunk in _chunks(pairs):
+                    # Replace whatever an earlier revision left under the same key
+                    session.execute(delete(MatchScore).where(
+                        MatchScore.version == version, tuple_(MatchScore.candidate_id, MatchScore.job_id).in_(chunk)))
+                    session.execute(insert(MatchScore), [
+                        {"candidate_id": c, "job_id": j, "version": version,
+                         "candidate_revision": pending[(c, j, version)][0], "job_revision": pending[(c, j, version)][1],
+                         "result_json": json.dumps(pending[(c, j, version)][2])}
+                        for c, j in chunk
+                    ])
+            session.commit()
+    except SQLAlchemyError:
+        # Only a cache: the scores are recomputed on the next miss
+        logger.warning("Could not store %d match scores", len(pending), exc_info=True)
+        return 0
+    return len(pending)
+
+
+atexit.register(flush)
+
+
+def prune(session: Session, features_version: str, embedder=None) -> int:
+    """Delete stored scores of any scoring version other than the current ones; returns how many."""
+    # Every text mode of match_service.TEXT_MODES, with current features or scored from the texts
+    keep = [scoring_version(mode, version, embedder)
+            for mode in ("tfidf", "semantic") for version in (features_version, None)]
+    return session.execute(delete(MatchScore).where(MatchScore.version.not_in(keep))).rowcount
+
+
+@event.listens_for(Session, "after_commit")
+def _store_committed(session: Session) -> None:
+    items = session.info.pop("match_cache_pending", None)
+    if items:
+        put_many(items)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_uncommitted(session: Session) -> None:
+    session.info.pop("match_cache_pending", None)
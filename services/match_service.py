@@ -1,8 +1,21 @@
-from typing import Any
-from sqlalchemy.orm import Session
+from typing import Any, Iterator
+import numpy as np
+from sqlalchemy.orm import Session, defer, load_only
+import offload
+from metrics import timed
 from models import Candidate, Job
-from nlp.matching import cosine_match_score, batch_recommend
+from nlp.features import Features
+from nlp.matching import cosine_match_matrix, cosine_match_score, cosine_match_scores, frozen_vectorizer
+from nlp.skillbits import get_skill_bitset, overlap_counts, overlap_matrix, popcount
 from nlp.skills import extract_skills
+from nlp.vocabulary import canonical_skills
+from services import match_cache
+from services.feature_service import get_embedder, get_feature_space
+from services.index_service import search_candidates, search_jobs
+from services.semantic_service import (
+    embeddings_of, require_embedder, search_candidates_semantic, search_jobs_semantic,
+)
+from services.skill_service import candidate_overlap_counts
 
 """
 Match Scoring System:
@@ -16,6 +29,19 @@ The match score is calculated using a weighted combination of:
 2. Text Similarity Score (30% weight):
    - Calculated using TF-IDF and cosine similarity between resume and job description
    - Captures overall content alignment beyond just skill keywords
+   - /api/match uses the vectors stored with each row (nlp.features), weighted by
+     the global vocabulary's IDF; texts without current vectors (rows not yet
+     encoded, uploads) are transformed by the same vocabulary, so all scores share
+     one IDF. Only before the first vocabulary is fitted is a TF-IDF fitted over
+     the compared texts (with TEXT_VECTORIZER=hashing, hashed terms are compared
+     without IDF instead)
+
+   - With text_mode="semantic" it is instead the cosine similarity of dense
+     embeddings (services.semantic_service), floored at 0, so related wording
+     counts even without shared terms; ranking then uses an ANN index
+
+Computed /api/match results are kept in services.match_cache until the candidate
+or job changes (or the vocabulary is refitted), so repeat matches are lookups.
 
 Final Score = (skills_match × 0.7) + (text_similarity × 0.3)
 
@@ -24,25 +50,57 @@ resume wording differs from the job description.
 """
 
 
-def match_candidate_job(session: Session, candidate_id: int, job_id: int) -> dict[str, Any] | None:
-    cand = session.get(Candidate, candidate_id)
-    job = session.get(Job, job_id)
-    if not cand or not job:
-        return None
+# Columns a ranked candidate row needs; the resume text and features stay in the database
+_RESULT_COLUMNS = load_only(Candidate.id, Candidate.name, Candidate.email, Candidate.skills_json)
 
-    cand_skills = set(cand.skills)
-    job_skills = set(job.required_skills)
-    missing = sorted(list(job_skills - cand_skills))
-    overlap = sorted(list(job_skills & cand_skills))
+TEXT_MODES = ("tfidf", "semantic")
 
-    # Calculate skills-based match score as primary metric
-    if len(job_skills) > 0:
-        skills_score = len(overlap) / len(job_skills)
+
+def _check_text_mode(text_mode: str) -> None:
+    if text_mode not in TEXT_MODES:
+        raise ValueError(f"similarity must be one of: {', '.join(TEXT_MODES)}")
+
+
+def _semantic_scores(cands: list[Candidate], jobs: list[Job]) -> np.ndarray:
+    # Row-wise cosine of each (candidate, job) pair's embeddings, floored at 0
+    embedder = require_embedder()
+    cand_vecs = embeddings_of(cands, "resume_text", embedder)
+    job_vecs = embeddings_of(jobs, "description", embedder)
+    return np.clip(np.einsum("ij,ij->i", cand_vecs, job_vecs), 0.0, 1.0)
+
+
+def _is_current(row, space) -> bool:
+    return space is not None and bool(row.features) and row.features_version == space.version
+
+
+def _embedder_for(text_mode: str):
+    return get_embedder() if text_mode == "semantic" else None
+
+
+def _text_scores(fn, *texts, space):
+    # Transforming with a frozen vectorizer is cheap and runs here (shipping a fitted
+    # vocabulary to a worker process would cost more); a throwaway fit is offloaded
+    vectorizer = frozen_vectorizer(space.vectorizer if space is not None else None)
+    if vectorizer is not None:
+        return fn(*texts, vectorizer=vectorizer)
+    return offload.run(fn, *texts)
+
+
+def _match_precomputed(cand: Candidate, job: Job, space) -> tuple[float, float, list[str]] | None:
+    # (skills_score, text_similarity, overlap) from stored features, None if either side is stale
+    if not (_is_current(cand, space) and _is_current(job, space)):
+        return None
+    cand_f, job_f = Features(cand.features), Features(job.features)
+    if job_f.n_skills > 0:
+        skills_score = cand_f.overlap(job_f) / job_f.n_skills
     else:
-        skills_score = 1.0 if len(cand_skills) > 0 else 0.0
+        skills_score = 1.0 if cand_f.bits.any() else 0.0
+    return skills_score, cand_f.dot(job_f), space.skill_names(cand_f.bits & job_f.bits)
 
-    # Calculate text similarity as secondary metric
-    text_similarity = cosine_match_score(cand.resume_text, job.description)
+
+def _match_result(cand: Candidate, job: Job, skills_score: float, text_similarity: float,
+                  overlap: list[str]) -> dict[str, Any]:
+    missing = sorted(list(set(job.required_skills) - set(overlap)))
 
     # Weighted blend: 70% skills match, 30% text similarity
     final_score = (skills_score * 0.7) + (text_similarity * 0.3)
@@ -58,46 +116,326 @@ def match_candidate_job(session: Session, candidate_id: int, job_id: int) -> dic
     }
 
 
-def recommend_jobs(session: Session, candidate_id: int, top_k: int = 5) -> list[dict[str, Any]]:
-    cand = session.get(Candidate, candidate_id)
-    if not cand:
-        return []
-    jobs = session.query(Job).all()
-    if not jobs:
-        return []
-    
-    # Get text similarity scores for all jobs
-    recs = batch_recommend(cand.resume_text, [(j.id, j.description) for j in jobs], top_k=len(jobs))
-    text_scores = {job_id: score for job_id, score in recs}
-    
-    # Calculate composite scores with skills matching
-    results = []
-    cand_skills = set(cand.skills)
-    
-    for job in jobs:
+def _score_pair(session: Session, candidate_id: int, job_id: int, text_mode: str, space) -> dict[str, Any] | None:
+    # Texts are only loaded if the stored features cannot be used
+    cand = session.get(Candidate, candidate_id, options=[defer(Candidate.resume_text)])
+    job = session.get(Job, job_id, options=[defer(Job.description)])
+    if not cand or not job:
+        return None
+
+    precomputed = _match_precomputed(cand, job, space)
+    if precomputed is not None:
+        skills_score, text_similarity, overlap = precomputed
+    else:
+        cand_skills = set(cand.skills)
         job_skills = set(job.required_skills)
         overlap = sorted(list(job_skills & cand_skills))
-        missing = sorted(list(job_skills - cand_skills))
-        
-        # Calculate skills-based score
+
+        # Calculate skills-based match score as primary metric
         if len(job_skills) > 0:
             skills_score = len(overlap) / len(job_skills)
         else:
             skills_score = 1.0 if len(cand_skills) > 0 else 0.0
-        
-        # Get text similarity score
-        text_similarity = text_scores.get(job.id, 0.0)
-        
-        # Weighted blend: 70% skills match, 30% text similarity
-        final_score = (skills_score * 0.7) + (text_similarity * 0.3)
-        
+
+        # Calculate text similarity as secondary metric
+        if text_mode == "tfidf":
+            text_similarity = _text_scores(cosine_match_score, cand.resume_text, job.description, space=space)
+    if text_mode == "semantic":
+        text_similarity = _semantic_scores([cand], [job])[0]
+    return _match_result(cand, job, skills_score, text_similarity, overlap)
+
+
+@timed("score")
+def match_candidate_job(session: Session, candidate_id: int, job_id: int,
+                        text_mode: str = "tfidf") -> dict[str, Any] | None:
+    _check_text_mode(text_mode)
+    space = get_feature_space()
+    key = match_cache.pair_keys(session, [(candidate_id, job_id)], text_mode, space, _embedder_for(text_mode))[0]
+    if key is None:
+        return None
+    result = match_cache.get(session, key)
+    if result is None:
+        result = _score_pair(session, candidate_id, job_id, text_mode, space)
+        if result is not None:
+            match_cache.put_many([(key, result)])
+    return result
+
+
+def _load(session: Session, model, ids, deferred) -> dict[int, Any]:
+    ids = sorted(set(ids))
+    rows = {}
+    for start in range(0, len(ids), 500):
+        query = session.query(model).options(defer(deferred)).filter(model.id.in_(ids[start:start + 500]))
+        rows.update((row.id, row) for row in query)
+    return rows
+
+
+@timed("score")
+def match_pairs(session: Session, pairs: list[tuple[int, int]], text_mode: str = "tfidf",
+                store_on_commit: bool = False) -> list[dict[str, Any] | None]:
+    """
+    match_candidate_job for many (candidate_id, job_id) pairs, in input order; None
+    where the candidate or job does not exist.
+
+    Results already in the match cache are looked up together; the rest are loaded
+    with two IN queries. Pairs whose stored features are current are scored
+    together (one sparse row-wise product and one popcount); the others are scored
+    one by one from their texts. With text_mode="semantic" the text scores of the
+    fast pairs come from one batch of stored (or freshly encoded) embeddings.
+    store_on_commit: the rows were written in the session's open transaction, so
+    the new results are only cached once it commits.
+    """
+    _check_text_mode(text_mode)
+    space = get_feature_space()
+    keys = match_cache.pair_keys(session, pairs, text_mode, space, _embedder_for(text_mode))
+    cached = match_cache.get_many(session, [k for k in keys if k is not None])
+    results: list[dict[str, Any] | None] = [cached.get(k) if k is not None else None for k in keys]
+    todo = [i for i, k in enumerate(keys) if k is not None and k not in cached]
+    if not todo:
+        return results
+
+    cands = _load(session, Candidate, (pairs[i][0] for i in todo), Candidate.resume_text)
+    jobs = _load(session, Job, (pairs[i][1] for i in todo), Job.description)
+    fast = [
+        i for i in todo
+        if pairs[i][0] in cands and pairs[i][1] in jobs
+        and _is_current(cands[pairs[i][0]], space) and _is_current(jobs[pairs[i][1]], space)
+    ]
+    if fast:
+        cand_ids = sorted({pairs[i][0] for i in fast})
+        job_ids = sorted({pairs[i][1] for i in fast})
+        cand_matrix, cand_bits, _ = space.stack([cands[c].features for c in cand_ids])
+        job_matrix, job_bits, job_n_skills = space.stack([jobs[j].features for j in job_ids])
+        cand_pos = {c: k for k, c in enumerate(cand_ids)}
+        job_pos = {j: k for k, j in enumerate(job_ids)}
+        cand_rows = np.array([cand_pos[pairs[i][0]] for i in fast])
+        job_rows = np.array([job_pos[pairs[i][1]] for i in fast])
+
+        if text_mode == "semantic":
+            text_scores = _semantic_scores([cands[pairs[i][0]] for i in fast], [jobs[pairs[i][1]] for i in fast])
+        else:
+            text_scores = np.asarray(cand_matrix[cand_rows].multiply(job_matrix[job_rows]).sum(axis=1)).ravel()
+        shared = cand_bits[cand_rows] & job_bits[job_rows]
+        n_required = job_n_skills[job_rows]
+        skills_scores = np.where(
+            n_required > 0,
+            popcount(shared) / np.maximum(n_required, 1),
+            (popcount(cand_bits[cand_rows]) > 0).astype(np.float64),
+        )
+        for k, i in enumerate(fast):
+            c, j = pairs[i]
+            results[i] = _match_result(cands[c], jobs[j], skills_scores[k], text_scores[k], space.skill_names(shared[k]))
+
+    fast_set = set(fast)
+    for i in todo:
+        if i not in fast_set:
+            results[i] = _score_pair(session, pairs[i][0], pairs[i][1], text_mode, space)
+    match_cache.put_many([(keys[i], results[i]) for i in todo if results[i] is not None],
+                         session=session if store_on_commit else None)
+    return results
+
+
+@timed("score")
+def score_candidates(job: Job, candidates: list[Candidate], top_k: int | None = None) -> list[dict[str, Any]]:
+    """
+    match_candidate_job for one job and many candidates, with one TF-IDF pass for
+    all texts (through the global vocabulary) and one bitset popcount for all
+    skill overlaps.
+
+    Results follow the order of `candidates`; with top_k only the best top_k are
+    returned, best first, and only those get overlap/missing skill lists.
+    """
+    if not candidates:
+        return []
+    text_scores = _text_scores(cosine_match_scores, job.description, [c.resume_text for c in candidates],
+                               space=get_feature_space())
+    bitset = get_skill_bitset()
+    job_skills = set(job.required_skills)
+    job_bits = bitset.pack(job_skills)
+    cand_bits = bitset.pack_many(c.skills for c in candidates)
+    if len(job_skills) > 0:
+        skills_scores = overlap_counts(job_bits, cand_bits) / len(job_skills)
+    else:
+        skills_scores = (popcount(cand_bits) > 0).astype(np.float64)
+    final_scores = (skills_scores * 0.7) + (text_scores * 0.3)
+
+    if top_k is None:
+        order = np.arange(len(candidates))
+    else:
+        k = min(max(top_k, 0), len(candidates))
+        if k == 0:
+            return []
+        part = np.argpartition(-final_scores, k - 1)[:k]
+        order = part[np.argsort(-final_scores[part], kind="stable")]
+
+    results = []
+    for i in order:
+        overlap = bitset.names(cand_bits[i] & job_bits)
+        results.append({
+            "candidate_id": candidates[i].id,
+            "job_id": job.id,
+            "score": round(float(final_scores[i]), 4),
+            "skills_match_score": round(float(skills_scores[i]), 4),
+            "text_similarity_score": round(float(text_scores[i]), 4),
+            "overlap_skills": overlap,
+            "missing_skills": sorted(list(job_skills - set(overlap))),
+        })
+    return results
+
+
+@timed("score")
+def score_matrix(jobs: list[Job], candidates: list[Candidate]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Score every candidate against every job: (final, skills, text) arrays of shape
+    (len(candidates), len(jobs)).
+
+    Text similarity is one sparse product of the candidates' and jobs' feature
+    vectors (rows with stale features are encoded on the fly; before the first
+    vocabulary exists, one TF-IDF fit over the batch is used instead). Skill
+    overlaps are one bitset AND + popcount over all pairs.
+    """
+    space = get_feature_space()
+    if space is not None and space.vectorizer is not None:
+        def blobs(rows, text_attr, skills_attr):
+            return [row.features if _is_current(row, space)
+                    else space.encode(getattr(row, text_attr), getattr(row, skills_attr)) for row in rows]
+        cand_matrix, _, _ = space.stack(blobs(candidates, "resume_text", "skills"))
+        job_matrix, _, _ = space.stack(blobs(jobs, "description", "required_skills"))
+        text_scores = (cand_matrix @ job_matrix.T).toarray()
+    else:
+        text_scores = _text_scores(cosine_match_matrix, [j.description for j in jobs],
+                                   [c.resume_text for c in candidates], space=space)
+
+    bitset = get_skill_bitset()
+    cand_bits = bitset.pack_many(c.skills for c in candidates)
+    job_bits = bitset.pack_many(j.required_skills for j in jobs)
+    n_required = np.array([len(set(j.required_skills)) for j in jobs], dtype=np.float64)
+    has_skills = (popcount(cand_bits) > 0).astype(np.float64)[:, None]
+    skills_scores = np.where(
+        n_required > 0,
+        overlap_matrix(cand_bits, job_bits) / np.maximum(n_required, 1),
+        has_skills,
+    )
+    final_scores = (skills_scores * 0.7) + (text_scores * 0.3)
+    return final_scores, skills_scores, text_scores
+
+
+def recommend_jobs(session: Session, candidate_id: int, top_k: int = 5,
+                   text_mode: str = "tfidf") -> list[dict[str, Any]]:
+    _check_text_mode(text_mode)
+    cand = session.get(Candidate, candidate_id)
+    if not cand:
+        return []
+
+    # Shortlist from the job index; only the top_k jobs are loaded from the DB
+    cand_skills = set(cand.skills)
+    if text_mode == "semantic":
+        query = embeddings_of([cand], "resume_text", require_embedder())[0]
+        hits = search_jobs_semantic(session, query, cand_skills, top_k)
+    else:
+        hits = search_jobs(session, cand.resume_text, cand_skills, top_k)
+    if not hits:
+        return []
+    jobs = {
+        job.id: job for job in
+        session.query(Job).options(load_only(Job.id, Job.title, Job.required_skills_json))
+        .filter(Job.id.in_([h[0] for h in hits]))
+    }
+
+    results = []
+    for job_id, final_score, _, _ in hits:
+        job = jobs.get(job_id)
+        if job is None:
+            continue
+        job_skills = set(job.required_skills)
         results.append({
             "job_id": job.id,
             "title": job.title,
             "score": round(float(final_score), 4),
-            "missing_skills": missing,
-            "overlap_skills": overlap,
+            "missing_skills": sorted(list(job_skills - cand_skills)),
+            "overlap_skills": sorted(list(job_skills & cand_skills)),
+        })
+    # A recommended job is usually opened next: cache its /api/match result now. Only
+    # worth it once rows carry stored features; without them each pair is a TF-IDF fit
+    if results and get_feature_space() is not None:
+        match_pairs(session, [(cand.id, r["job_id"]) for r in results], text_mode=text_mode)
+    return results
+
+
+def rank_candidates(session: Session, job_id: int, top_k: int = 10, offset: int = 0,
+                    chunk_size: int = 500, text_mode: str = "tfidf",
+                    min_match: int = 0) -> Iterator[dict[str, Any]] | None:
+    """
+    Rank stored candidates for a job using the candidate index; with min_match, only
+    candidates having at least that many of the job's required skills.
+
+    Returns None if the job does not exist, otherwise an iterator over results
+    offset+1 .. offset+top_k; Candidate rows are loaded chunk by chunk as it is consumed.
+    """
+    _check_text_mode(text_mode)
+    job = session.get(Job, job_id)
+    if not job:
+        return None
+    job_skills = set(job.required_skills)
+    if text_mode == "semantic":
+        query = embeddings_of([job], "description", require_embedder())[0]
+        hits = search_candidates_semantic(session, query, job_skills, offset + top_k, min_match)[offset:]
+    else:
+        hits = search_candidates(session, job.description, job_skills, offset + top_k, min_match)[offset:]
+
+    def _rows():
+        for start in range(0, len(hits), chunk_size):
+            chunk = hits[start:start + chunk_size]
+            cands = {c.id: c for c in session.query(Candidate).options(_RESULT_COLUMNS)
+                     .filter(Candidate.id.in_([h[0] for h in chunk]))}
+            for pos, (cand_id, final_score, skills_score, text_similarity) in enumerate(chunk):
+                cand = cands.get(cand_id)
+                if cand is None:
+                    continue
+                cand_skills = set(cand.skills)
+                yield {
+                    "rank": offset + start + pos + 1,
+                    "candidate_id": cand.id,
+                    "name": cand.name,
+                    "email": cand.email,
+                    "score": round(float(final_score), 4),
+                    "skills_match_score": round(float(skills_score), 4),
+                    "text_similarity_score": round(float(text_similarity), 4),
+                    "overlap_skills": sorted(list(job_skills & cand_skills)),
+                    "missing_skills": sorted(list(job_skills - cand_skills)),
+                }
+
+    return _rows()
+
+
+def find_candidates_by_skills(session: Session, skills: list[str], min_match: int | None = None,
+                              limit: int = 50) -> list[dict[str, Any]]:
+    """
+    Candidates having at least min_match of `skills` (default: all of them), best
+    skills match first. Overlap is counted in SQL on candidate_skills, so only the
+    returned candidates are loaded.
+    """
+    wanted = sorted(canonical_skills(skills))
+    if not wanted:
+        return []
+    min_match = len(wanted) if min_match is None else min_match
+    counts = candidate_overlap_counts(session, wanted, min_overlap=min_match, limit=limit)
+    cands = {c.id: c for c in session.query(Candidate).options(_RESULT_COLUMNS)
+             .filter(Candidate.id.in_([cid for cid, _ in counts]))}
+
+    results = []
+    wanted_set = set(wanted)
+    for cand_id, overlap_count in counts:
+        cand = cands.get(cand_id)
+        if cand is None:
+            continue
+        cand_skills = set(cand.skills)
+        results.append({
+            "candidate_id": cand.id,
+            "name": cand.name,
+            "email": cand.email,
+            "skills_match_score": round(overlap_count / len(wanted), 4),
+            "overlap_skills": sorted(list(wanted_set & cand_skills)),
+            "missing_skills": sorted(list(wanted_set - cand_skills)),
         })
-    
-    # Sort by score desc and return top_k
-    return sorted(results, key=lambda x: x["score"], reverse=True)[:top_k]
+    return results
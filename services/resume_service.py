@@ -1,11 +1,105 @@
-from models import Candidate
-from nlp.skills import extract_skills
+import offload
+from db import begin_write
+from models import Candidate, candidate_skills
+from config import SPACY_BATCH_SIZE, SPACY_N_PROCESS
+from nlp.cache import content_hash
+from nlp.skills import extract_skills_batch, skill_vocab_version
+from nlp.vocabulary import canonical_skills
+from services.feature_service import encode_candidates
+from services.index_service import on_candidate_created, rebuild_candidate_index
+from services.skill_service import set_candidate_skills
+
+
+# Resumes per task when skill extraction runs in the offload workers
+_OFFLOAD_CHUNK = 64
+
+
+def _extract_skills(texts: list[str], n_process: int = 1) -> list[tuple[str, list[str]]]:
+    # (vocabulary version, sorted skills) per resume; runs in an offload worker when enabled
+    version = skill_vocab_version()
+    skill_sets = extract_skills_batch(texts, batch_size=SPACY_BATCH_SIZE, n_process=n_process)
+    return [(version, sorted(skills)) for skills in skill_sets]
 
 
 def create_candidate(session, name: str | None, email: str | None, resume_text: str) -> Candidate:
-    skills = extract_skills(resume_text)
-    cand = Candidate(name=name, email=email, resume_text=resume_text)
-    cand.skills = sorted(list(skills))
-    session.add(cand)
-    session.flush()
-    return cand
+    return create_candidates(session, [(name, email, resume_text)])[0]
+
+
+def _find_existing(session, hashes: set[str]) -> dict[tuple, Candidate]:
+    existing: dict[tuple, Candidate] = {}
+    hashes = list(hashes)
+    for start in range(0, len(hashes), 500):
+        query = session.query(Candidate).filter(Candidate.content_hash.in_(hashes[start:start + 500]))
+        for cand in query.order_by(Candidate.id):
+            existing.setdefault((cand.content_hash, cand.name, cand.email), cand)
+    return existing
+
+
+def create_candidates(session, rows: list[tuple[str | None, str | None, str]]) -> list[Candidate]:
+    """
+    Insert many (name, email, resume_text) rows with batched skill extraction and a single flush.
+
+    A row with the same resume text, name and email as a stored candidate (or an
+    earlier row) returns that candidate instead of inserting a duplicate.
+    """
+    hashes = [content_hash(text or "") for _, _, text in rows]
+    known = _find_existing(session, set(hashes))
+
+    new_rows = []
+    for (name, email, resume_text), text_hash in zip(rows, hashes):
+        key = (text_hash, name, email)
+        if key not in known:
+            cand = Candidate(name=name, email=email, resume_text=resume_text, content_hash=text_hash)
+            known[key] = cand
+            new_rows.append(cand)
+
+    texts = [cand.resume_text for cand in new_rows]
+    if offload.enabled():
+        extracted = offload.map_chunks(_extract_skills, texts, _OFFLOAD_CHUNK)
+    else:
+        extracted = _extract_skills(texts, n_process=SPACY_N_PROCESS) if texts else []
+    for cand, (version, skills) in zip(new_rows, extracted):
+        cand.skills = skills
+        cand.skills_version = version
+    if new_rows:
+        encode_candidates(session, new_rows)
+        session.add_all(new_rows)
+        session.flush()
+        set_candidate_skills(session, new_rows)
+        for cand in new_rows:
+            on_candidate_created(session, cand)
+    return [known[(text_hash, name, email)] for (name, email, _), text_hash in zip(rows, hashes)]
+
+
+def canonicalize_candidate_skills(session, batch_size: int = 1000) -> int:
+    """
+    Rewrite stored candidates' skills with canonical_skills (e.g. "ml" -> "machine learning"),
+    re-encoding and relinking the candidates that change; returns how many did.
+    """
+    changed_total = 0
+    last_id = 0
+    while True:
+        begin_write(session)
+        cands = (session.query(Candidate).filter(Candidate.id > last_id)
+                 .order_by(Candidate.id).limit(batch_size).all())
+        if not cands:
+            session.commit()
+            break
+        last_id = cands[-1].id
+        changed = []
+        for cand in cands:
+            skills = sorted(canonical_skills(cand.skills))
+            if skills != cand.skills:
+                cand.skills = skills
+                changed.append(cand)
+        if changed:
+            encode_candidates(session, changed)
+            session.execute(candidate_skills.delete().where(
+                candidate_skills.c.candidate_id.in_([c.id for c in changed])))
+            set_candidate_skills(session, changed)
+        session.commit()
+        session.expunge_all()
+        changed_total += len(changed)
+    if changed_total:
+        rebuild_candidate_index(session)
+    return changed_total
@@ -0,0 +1,273 @@
+import glob
+import logging
+import os
+import threading
+import time
+import uuid
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from config import ANN_NPROBE, ANN_RECOUNT_SECONDS, INDEX_DIR
+from metrics import timed
+from models import Candidate, Job
+from nlp.ann import IvfIndex
+from nlp.embeddings import from_bytes
+from services.feature_service import get_embedder
+from services.index_service import candidate_skill_scores, job_skill_scores
+
+# Nearest neighbours fetched from the ANN index per query, at least
+SHORTLIST_MIN = 200
+# Rows scored per step of the skills-ordered scan
+BLOCK_SIZE = 1024
+
+logger = logging.getLogger(__name__)
+
+
+def require_embedder():
+    embedder = get_embedder()
+    if embedder is None:
+        raise RuntimeError("Semantic similarity is unavailable: set SEMANTIC_MODEL and run scripts/revectorize.py")
+    return embedder
+
+
+def embeddings_of(rows, text_attr: str, embedder) -> np.ndarray:
+    """Stored embeddings of `rows` where current, the others encoded from their `text_attr`, one row each."""
+    out = np.zeros((len(rows), embedder.dim), dtype=np.float32)
+    stale = [i for i, row in enumerate(rows) if not (row.embedding and row.embedding_version == embedder.version)]
+    stale_set = set(stale)
+    for i, row in enumerate(rows):
+        if i not in stale_set:
+            out[i] = from_bytes(row.embedding)
+    if stale:
+        out[stale] = embedder.encode([getattr(rows[i], text_attr) for i in stale])
+    return out
+
+
+class _ManagedVectors:
+    """
+    Process-wide IvfIndex over the stored embeddings of one table, persisted under
+    INDEX_DIR as {name}.ivf.npz plus a memory-mapped {name}.<build>.vectors.npy.
+
+    Rows embedded since the last build are read from the DB on each use and scanned
+    exhaustively until the next rebuild. The first build, and one after the embedder
+    changed, block the requests that need it; rebuilds because too many rows are
+    pending, or because rows below the high-water mark were (re-)embedded (checked
+    by counting them every ANN_RECOUNT_SECONDS), run in a background thread while
+    requests keep using the current index.
+    """
+
+    def __init__(self, name: str, model):
+        self.name = name
+        self.model = model
+        self.lock = threading.Lock()
+        # Held for blocking builds, so concurrent requests wait for one build
+        self.build_lock = threading.Lock()
+        self.index: IvfIndex | None = None
+        self.mtime: float | None = None
+        self.rebuilding = False
+        self.counted_at: float | None = None
+
+    def _disk_mtime(self) -> float | None:
+        try:
+            return os.path.getmtime(os.path.join(INDEX_DIR, f"{self.name}.ivf.npz"))
+        except OSError:
+            return None
+
+    def rebuild(self, session: Session, embedder) -> IvfIndex:
+        current = self.model.embedding_version == embedder.version
+        ids = np.fromiter((doc_id for (doc_id,) in session.query(self.model.id).filter(current)
+                           .order_by(self.model.id).yield_per(10000)), dtype=np.int64)
+        if len(ids) == 0:
+            index = IvfIndex(np.zeros((0, embedder.dim), dtype=np.float32), ids,
+                             np.zeros((1, embedder.dim), dtype=np.float32), np.zeros(2, dtype=np.int64),
+                             version=embedder.version)
+            with self.lock:
+                self.index = index
+            return index
+
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        build = uuid.uuid4().hex[:12]
+        raw_path = os.path.join(INDEX_DIR, f"{self.name}.{build}.raw.npy")
+        out_path = os.path.join(INDEX_DIR, f"{self.name}.{build}.vectors.npy")
+        # Embeddings are streamed to disk so the build never holds the table in memory
+        raw = np.lib.format.open_memmap(raw_path, mode="w+", dtype=np.float32, shape=(len(ids), embedder.dim))
+        try:
+            pos = 0
+            rows = (session.query(self.model.id, self.model.embedding).filter(current, self.model.id <= int(ids[-1]))
+                    .order_by(self.model.id).yield_per(1000))
+            for doc_id, blob in rows:
+                # Rows embedded after the ids were read are left for the next rebuild
+                if pos < len(ids) and doc_id == ids[pos]:
+                    raw[pos] = from_bytes(blob)
+                    pos += 1
+            with timed("ann_build"):
+                index = IvfIndex.build(ids[:pos], raw[:pos], version=embedder.version, out_path=out_path)
+        finally:
+            del raw
+            os.remove(raw_path)
+
+        with self.lock:
+            index.save(INDEX_DIR, self.name)
+            self.index = index
+            self.mtime = self._disk_mtime()
+        # Processes still mapping an older vectors file keep reading it until they reload
+        for path in glob.glob(os.path.join(INDEX_DIR, f"{self.name}.*.vectors.npy")):
+            if path != out_path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return index
+
+    def _rebuild_in_background(self, embedder) -> None:
+        with self.lock:
+            if self.rebuilding:
+                return
+            self.rebuilding = True
+
+        def run():
+            from db import SessionLocal
+            try:
+                self.rebuild(SessionLocal(), embedder)
+            except Exception:
+                logger.exception("Rebuilding the %s index failed", self.name)
+            finally:
+                SessionLocal.remove()
+                with self.lock:
+                    self.rebuilding = False
+
+        threading.Thread(target=run, name=f"index-rebuild-{self.name}", daemon=True).start()
+
+    def _blocking_build(self, session: Session, embedder) -> IvfIndex:
+        with self.build_lock:
+            with self.lock:
+                index = self.index
+            if index is not None and index.version == embedder.version:
+                return index
+            return self.rebuild(session, embedder)
+
+    def _recount_due(self) -> bool:
+        # Called with self.lock held
+        now = time.monotonic()
+        if self.counted_at is not None and now - self.counted_at < ANN_RECOUNT_SECONDS:
+            return False
+        self.counted_at = now
+        return True
+
+    def get(self, session: Session, embedder, wait: bool = False) -> IvfIndex:
+        """
+        The index, caught up with newly embedded rows; built first if there is none
+        for this embedder. A rebuild it needs runs in the background unless `wait`,
+        in which case it is done first.
+        """
+        with self.lock:
+            disk_mtime = self._disk_mtime()
+            if self.index is None or (disk_mtime is not None and disk_mtime != self.mtime):
+                self.index = IvfIndex.load(INDEX_DIR, self.name) or self.index
+                self.mtime = disk_mtime
+            index = self.index
+
+        if index is None or index.version != embedder.version:
+            return self._blocking_build(session, embedder)
+
+        current = self.model.embedding_version == embedder.version
+        new_rows = (session.query(self.model.id, self.model.embedding)
+                    .filter(current, self.model.id > index.synced_id).order_by(self.model.id).all())
+        with self.lock:
+            recount = wait or self._recount_due()
+        embedded = session.query(func.count(self.model.id)).filter(current).scalar() if recount else 0
+        with self.lock:
+            for doc_id, blob in new_rows:
+                index.add(doc_id, from_bytes(blob))
+            if new_rows:
+                index.synced_id = new_rows[-1][0]
+            # More embedded rows than indexed ones: older rows were (re-)embedded since the build
+            stale = embedded > len(index) or index.needs_rebuild
+        if stale:
+            if wait:
+                return self.rebuild(session, embedder)
+            self._rebuild_in_background(embedder)
+        return index
+
+
+_jobs = _ManagedVectors("jobs_semantic", Job)
+_candidates = _ManagedVectors("candidates_semantic", Candidate)
+
+
+def load_semantic_indexes(session: Session) -> None:
+    """Load (or build) both ANN indexes; a no-op when semantic similarity is disabled."""
+    embedder = get_embedder()
+    if embedder is not None:
+        _jobs.get(session, embedder, wait=True)
+        _candidates.get(session, embedder, wait=True)
+
+
+def rebuild_semantic_indexes(session: Session) -> dict[str, int]:
+    embedder = require_embedder()
+    return {"jobs": len(_jobs.rebuild(session, embedder)), "candidates": len(_candidates.rebuild(session, embedder))}
+
+
+def _top_k(vectors: _ManagedVectors, ids: np.ndarray, skill_s: np.ndarray, session: Session, query: np.ndarray,
+           k: int, embedder, skill_weight: float = 0.7, text_weight: float = 0.3) -> list[tuple[int, float, float, float]]:
+    """
+    Top-k (doc_id, score, skills_score, text_score) under skill_weight * skills +
+    text_weight * max(cosine, 0), cosine taken between embeddings.
+
+    The ANN index supplies the nearest rows, whose similarity bounds that of every
+    row it did not return; rows are then scanned in order of their skills score
+    until that bound rules out the rest, as in RetrievalIndex.top_k_blended.
+    """
+    if k <= 0 or len(ids) == 0:
+        return []
+    index = vectors.get(session, embedder)
+    sorter = np.argsort(ids, kind="stable")
+
+    def skills_of(doc_ids: np.ndarray) -> np.ndarray:
+        pos = np.minimum(np.searchsorted(ids, doc_ids, sorter=sorter), len(ids) - 1)
+        rows = sorter[pos]
+        return np.where(ids[rows] == doc_ids, skill_s[rows], 0.0)
+
+    shortlist = max(SHORTLIST_MIN, 4 * k)
+    with timed("index_search"):
+        best_ids, best_text = index.search(query, shortlist, nprobe=ANN_NPROBE)
+        # Every row the ANN search left out is (approximately) no closer than its last hit
+        text_bound = max(float(best_text[-1]), 0.0) if len(best_ids) >= shortlist else 1.0
+        best_ids = best_ids[np.isin(best_ids, ids)]
+        best_text = np.clip(index.similarity(best_ids, query), 0.0, 1.0)
+        best_skill = skills_of(best_ids)
+
+        order = np.argsort(-skill_s, kind="stable")
+        seen = set(best_ids.tolist())
+        for start in range(0, len(order), BLOCK_SIZE):
+            rows = order[start:start + BLOCK_SIZE]
+            final = skill_weight * best_skill + text_weight * best_text
+            if len(final) >= k:
+                kth = np.partition(-final, k - 1)[k - 1]
+                if skill_weight * skill_s[rows[0]] + text_weight * text_bound <= -kth:
+                    break
+            fresh = np.array([i for i, doc_id in zip(rows, ids[rows].tolist()) if doc_id not in seen], dtype=np.int64)
+            if len(fresh) == 0:
+                continue
+            seen.update(ids[fresh].tolist())
+            best_ids = np.concatenate([best_ids, ids[fresh]])
+            best_skill = np.concatenate([best_skill, skill_s[fresh]])
+            best_text = np.concatenate([best_text, np.clip(index.similarity(ids[fresh], query), 0.0, 1.0)])
+
+    final = skill_weight * best_skill + text_weight * best_text
+    top = np.argsort(-final, kind="stable")[:k]
+    return [(int(best_ids[i]), float(final[i]), float(best_skill[i]), float(best_text[i])) for i in top]
+
+
+def search_jobs_semantic(session: Session, query: np.ndarray, skills, k: int) -> list[tuple[int, float, float, float]]:
+    """search_jobs with text similarity taken between embeddings; `query` is the resume's."""
+    embedder = require_embedder()
+    ids, skill_s = job_skill_scores(session, skills)
+    return _top_k(_jobs, ids, skill_s, session, query, k, embedder)
+
+
+def search_candidates_semantic(session: Session, query: np.ndarray, skills,
+                               k: int, min_match: int = 0) -> list[tuple[int, float, float, float]]:
+    """search_candidates with text similarity taken between embeddings; `query` is the job's."""
+    embedder = require_embedder()
+    ids, skill_s = candidate_skill_scores(session, skills, min_match)
+    return _top_k(_candidates, ids, skill_s, session, query, k, embedder)
@@ -0,0 +1,132 @@
+import json
+from typing import Iterable
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from db import begin_write
+from models import Candidate, Job, Skill, candidate_skills, job_skills
+
+# Rows per IN (...) list / insert batch
+_CHUNK = 500
+
+
+def _chunks(items: list, size: int = _CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def get_skill_ids(session: Session, names: Iterable[str], create: bool = True) -> dict[str, int]:
+    """Map skill names to ids, inserting unknown names unless create is False."""
+    names = sorted({n for n in names if n})
+    ids: dict[str, int] = {}
+    for chunk in _chunks(names):
+        ids.update(session.execute(select(Skill.name, Skill.id).where(Skill.name.in_(chunk))).all())
+    missing = [n for n in names if n not in ids]
+    if missing and create:
+        try:
+            with session.begin_nested():
+                session.add_all([Skill(name=n) for n in missing])
+                session.flush()
+        except IntegrityError:
+            # Another writer inserted some of them first; fall through and re-read
+            pass
+        for chunk in _chunks(missing):
+            ids.update(session.execute(select(Skill.name, Skill.id).where(Skill.name.in_(chunk))).all())
+    return ids
+
+
+def _write_links(session: Session, table, owner_column: str, owners: list[tuple[int, list[str]]]) -> None:
+    ids = get_skill_ids(session, (s for _, skills in owners for s in skills))
+    rows = [
+        {owner_column: owner_id, "skill_id": ids[s]}
+        for owner_id, skills in owners
+        for s in set(skills)
+    ]
+    for chunk in _chunks(rows, 1000):
+        session.execute(table.insert(), chunk)
+
+
+def set_candidate_skills(session: Session, cands: list[Candidate]) -> None:
+    """Write candidate_skills rows for freshly inserted candidates."""
+    _write_links(session, candidate_skills, "candidate_id", [(c.id, c.skills) for c in cands])
+
+
+def set_job_skills(session: Session, jobs: list[Job]) -> None:
+    """Write job_skills rows for freshly inserted jobs."""
+    _write_links(session, job_skills, "job_id", [(j.id, j.required_skills) for j in jobs])
+
+
+def _migrate(session: Session, model, json_column, table, owner_column: str, batch_size: int) -> int:
+    linked = select(table.c[owner_column]).distinct()
+    migrated = 0
+    last_id = 0
+    while True:
+        begin_write(session)
+        rows = session.execute(
+            select(model.id, json_column)
+            .where(model.id > last_id, model.id.not_in(linked))
+            .order_by(model.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            session.commit()
+            return migrated
+        owners = []
+        for owner_id, skills_json in rows:
+            try:
+                skills = json.loads(skills_json or "[]")
+            except ValueError:
+                skills = []
+            if skills:
+                owners.append((owner_id, skills))
+        _write_links(session, table, owner_column, owners)
+        session.commit()
+        migrated += len(owners)
+        last_id = rows[-1][0]
+
+
+def migrate_json_skills(session: Session, batch_size: int = 1000) -> dict[str, int]:
+    """Backfill candidate_skills/job_skills from the JSON columns for rows that have no links yet."""
+    return {
+        "candidates": _migrate(session, Candidate, Candidate.skills_json, candidate_skills, "candidate_id", batch_size),
+        "jobs": _migrate(session, Job, Job.required_skills_json, job_skills, "job_id", batch_size),
+    }
+
+
+def candidate_overlap_counts(session: Session, skills: Iterable[str], min_overlap: int = 1,
+                             limit: int | None = None) -> list[tuple[int, int]]:
+    """
+    (candidate_id, number of `skills` the candidate has) for candidates with at
+    least min_overlap of them, most overlap first; counted in SQL.
+    """
+    skill_ids = list(get_skill_ids(session, skills, create=False).values())
+    if not skill_ids or min_overlap > len(skill_ids):
+        return []
+    overlap = func.count(candidate_skills.c.skill_id).label("overlap")
+    query = (
+        select(candidate_skills.c.candidate_id, overlap)
+        .where(candidate_skills.c.skill_id.in_(skill_ids))
+        .group_by(candidate_skills.c.candidate_id)
+        .having(overlap >= max(1, min_overlap))
+        .order_by(overlap.desc(), candidate_skills.c.candidate_id)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return [(cand_id, count) for cand_id, count in session.execute(query)]
+
+
+def job_candidate_overlap_counts(session: Session, job_id: int, min_overlap: int = 1,
+                                 limit: int | None = None) -> list[tuple[int, int]]:
+    """candidate_overlap_counts for a stored job's required skills, joined entirely in SQL."""
+    overlap = func.count(candidate_skills.c.skill_id).label("overlap")
+    query = (
+        select(candidate_skills.c.candidate_id, overlap)
+        .join(job_skills, job_skills.c.skill_id == candidate_skills.c.skill_id)
+        .where(job_skills.c.job_id == job_id)
+        .group_by(candidate_skills.c.candidate_id)
+        .having(overlap >= max(1, min_overlap))
+        .order_by(overlap.desc(), candidate_skills.c.candidate_id)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return [(cand_id, count) for cand_id, count in session.execute(query)]
@@ -0,0 +1,136 @@
+import logging
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.orm import Session
+from config import INDEX_DIR
+from db import begin_write
+from models import Candidate, Skill, candidate_skills
+from nlp.skills import extract_skills_batch
+from nlp.token_index import TokenIndex, tokenize
+from nlp.vocabulary import SkillVocabulary, get_vocabulary, load_version, vocabulary_tokens
+from services.feature_service import encode_candidates
+from services.index_service import rebuild_candidate_index
+from services.skill_service import set_candidate_skills
+
+logger = logging.getLogger(__name__)
+
+
+def update_token_index(session: Session, batch_size: int = 1000) -> TokenIndex:
+    """Load the resume token index and add the candidates stored since it was last saved."""
+    index = TokenIndex.load(INDEX_DIR, "candidates") or TokenIndex()
+    rows = (session.query(Candidate.id, Candidate.resume_text)
+            .filter(Candidate.id > index.synced_id).order_by(Candidate.id).yield_per(batch_size))
+    added = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= batch_size:
+            index.add_many(zip([r.id for r in chunk], tokenize(r.resume_text for r in chunk)))
+            added += len(chunk)
+            chunk = []
+    if chunk:
+        index.add_many(zip([r.id for r in chunk], tokenize(r.resume_text for r in chunk)))
+        added += len(chunk)
+    if added:
+        index.save(INDEX_DIR, "candidates")
+    return index
+
+
+def _affected_ids(session: Session, vocab: SkillVocabulary, old: SkillVocabulary,
+                  token_index: TokenIndex) -> set[int]:
+    # Patterns that are new or now map to another skill can only match resumes holding all
+    # their tokens; skills that lost a pattern can only change for candidates that have them
+    added = [p for p, skill in vocab.patterns.items() if old.patterns.get(p) != skill]
+    dropped = sorted({skill for p, skill in old.patterns.items() if vocab.patterns.get(p) != skill})
+    ids: set[int] = set()
+    for tokens in vocabulary_tokens(added):
+        ids.update(token_index.containing(tokens).tolist())
+    if dropped:
+        ids.update(session.scalars(
+            select(candidate_skills.c.candidate_id).distinct()
+            .join(Skill, Skill.id == candidate_skills.c.skill_id).where(Skill.name.in_(dropped))
+        ))
+    return ids
+
+
+def _reextract_batch(session: Session, cands: list[Candidate], version: str) -> int:
+    skill_sets = extract_skills_batch([c.resume_text for c in cands])
+    changed = []
+    for cand, skills in zip(cands, skill_sets):
+        skills = sorted(skills)
+        if skills != cand.skills:
+            cand.skills = skills
+            changed.append(cand)
+        cand.skills_version = version
+    if changed:
+        ids = [c.id for c in changed]
+        session.execute(delete(candidate_skills).where(candidate_skills.c.candidate_id.in_(ids)))
+        set_candidate_skills(session, changed)
+        encode_candidates(session, changed)
+    return len(changed)
+
+
+def reextract_skills(session: Session, batch_size: int = 500) -> dict[str, object]:
+    """
+    Bring every candidate's skills up to the current vocabulary version.
+
+    For candidates extracted with an older version whose compiled file is still in
+    SKILLS_DIR, only those the vocabulary change can affect are re-extracted: resumes
+    containing every token of a new or remapped pattern (found through the token
+    index) and candidates having a skill that lost a pattern. The rest are marked
+    current without reading their text. Candidates from an unknown version (or
+    none) are all re-extracted. Work is committed in batches, so the job can be
+    interrupted and re-run.
+    """
+    vocab = get_vocabulary()
+    stale = or_(Candidate.skills_version.is_(None), Candidate.skills_version != vocab.version)
+    versions = [v for (v,) in session.query(Candidate.skills_version).filter(stale).distinct()]
+    session.commit()
+    counts = {"version": vocab.version, "checked": 0, "changed": 0, "marked_current": 0}
+    token_index = None
+    for version in versions:
+        of_version = Candidate.skills_version.is_(None) if version is None else Candidate.skills_version == version
+        old = load_version(version)
+        if old is None:
+            # No record of what that version matched: re-extract all of its candidates
+            last_id = 0
+            while True:
+                begin_write(session)
+                cands = (session.query(Candidate).filter(of_version, Candidate.id > last_id)
+                         .order_by(Candidate.id).limit(batch_size).all())
+                if not cands:
+                    session.commit()
+                    break
+                counts["changed"] += _reextract_batch(session, cands, vocab.version)
+                counts["checked"] += len(cands)
+                last_id = cands[-1].id
+                session.commit()
+                session.expunge_all()
+            continue
+
+        if token_index is None:
+            token_index = update_token_index(session)
+        horizon = session.scalar(select(func.max(Candidate.id))) or 0
+        ids = _affected_ids(session, vocab, old, token_index)
+        # Rows stored after the token index was brought up to date are not in it
+        ids.update(session.scalars(select(Candidate.id).where(
+            of_version, Candidate.id > token_index.synced_id, Candidate.id <= horizon)))
+        ids = sorted(ids)
+        session.commit()
+        for start in range(0, len(ids), batch_size):
+            begin_write(session)
+            cands = session.query(Candidate).filter(of_version, Candidate.id.in_(ids[start:start + batch_size])).all()
+            counts["changed"] += _reextract_batch(session, cands, vocab.version)
+            counts["checked"] += len(cands)
+            session.commit()
+            session.expunge_all()
+        begin_write(session)
+        # Rows stored since the horizon was read are left for the next run
+        counts["marked_current"] += (session.query(Candidate).filter(of_version, Candidate.id <= horizon)
+                                     .update({"skills_version": vocab.version}, synchronize_session=False))
+        session.commit()
+
+    if counts["changed"]:
+        # The candidate index holds skill postings built from the old skills
+        rebuild_candidate_index(session)
+    logger.info("Skill re-extraction for vocabulary %s: %s", vocab.version, counts)
+    return counts
@@ -0,0 +1,102 @@
+"""
+Load the libraries, models and indexes that requests otherwise load on first use.
+
+Nothing heavy is imported at module import time, so CLI tools and tests start
+quickly. The web server calls warm_up() once before serving: in the gunicorn
+master when preload_app is on (forked workers then share the loaded pages
+copy-on-write), otherwise in each worker. /ready reports whether it has run.
+"""
+import threading
+import time
+from typing import Callable
+from config import SKILL_EXTRACTION
+from db import SessionLocal
+
+_lock = threading.Lock()
+_timings: dict[str, float] | None = None
+
+
+def _load_sklearn() -> None:
+    from sklearn.metrics.pairwise import cosine_similarity  # noqa: F401
+    from nlp.matching import _build_vectorizer
+    _build_vectorizer()
+
+
+def _load_tokenizer() -> None:
+    from nlp.vocabulary import get_vocabulary
+    get_vocabulary().matcher
+
+
+def _load_stopwords() -> None:
+    from nlp.pipeline import get_stopwords
+    get_stopwords()
+
+
+def _load_parser() -> None:
+    from nlp.pipeline import get_nlp
+    get_nlp()
+
+
+def _load_pdf() -> None:
+    from nlp.documents import _pdf_reader
+    _pdf_reader()
+
+
+def _load_features() -> None:
+    from nlp.skillbits import get_skill_bitset
+    from services.feature_service import get_embedder, get_feature_space
+    get_skill_bitset()
+    get_feature_space()
+    get_embedder()
+
+
+def _load_indexes() -> None:
+    from services.index_service import get_candidate_index, get_job_index
+    from services.semantic_service import load_semantic_indexes
+    try:
+        with SessionLocal() as session:
+            get_job_index(session)
+            get_candidate_index(session)
+            load_semantic_indexes(session)
+    finally:
+        SessionLocal.remove()
+
+
+def warm_up(parser: bool | None = None, indexes: bool = True) -> dict[str, float]:
+    """
+    Load everything the hot paths need and return the seconds each step took.
+    The spaCy model is only loaded in parser mode (SKILL_EXTRACTION=parser or
+    parser=True); indexes=False skips the search indexes, which need the database.
+    Runs once per process; later calls return the first call's timings.
+    """
+    global _timings
+    with _lock:
+        if _timings is not None:
+            return _timings
+        steps: list[tuple[str, Callable[[], None]]] = [
+            ("sklearn", _load_sklearn),
+            ("skill_matcher", _load_tokenizer),
+            ("stopwords", _load_stopwords),
+            ("pypdf", _load_pdf),
+            ("features", _load_features),
+        ]
+        if parser or (parser is None and SKILL_EXTRACTION == "parser"):
+            steps.append(("spacy_model", _load_parser))
+        if indexes:
+            steps.append(("indexes", _load_indexes))
+
+        timings = {}
+        for name, load in steps:
+            started = time.perf_counter()
+            load()
+            timings[name] = round(time.perf_counter() - started, 3)
+        _timings = timings
+        return timings
+
+
+def is_ready() -> bool:
+    return _timings is not None
+
+
+def warmup_timings() -> dict[str, float] | None:
+    return _timings
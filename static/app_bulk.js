@@ -9,6 +9,7 @@ window.addEventListener('DOMContentLoaded', () => {
   const progressFill = document.getElementById('progress-fill');
   const progressText = document.getElementById('progress-text');
   const resultsDiv = document.getElementById('results');
+  const maxFiles = parseInt(filesInput.dataset.maxFiles, 10) || 100;
   
   // Store candidates data globally within this closure
   let currentCandidates = [];
@@ -18,8 +19,8 @@ window.addEventListener('DOMContentLoaded', () => {
     const files = e.target.files;
     const count = files.length;
     
-    if (count > 100) {
-      alert('Maximum 100 files allowed');
+    if (count > maxFiles) {
+      alert(`Maximum ${maxFiles} files allowed`);
       filesInput.value = '';
       fileCount.textContent = '0 files';
       fileList.innerHTML = '';
@@ -52,17 +53,20 @@ window.addEventListener('DOMContentLoaded', () => {
       return;
     }
 
-    if (files.length > 100) {
-      alert('Maximum 100 files allowed');
+    if (files.length > maxFiles) {
+      alert(`Maximum ${maxFiles} files allowed`);
       return;
     }
 
     const formData = new FormData(form);
+    formData.append('async', '1');
     
     // Show progress bar
     btn.disabled = true;
     btnText.textContent = '⏳ Processing...';
     progressBar.style.display = 'block';
+    progressFill.style.width = '0%';
+    progressText.textContent = 'Uploading...';
     resultsDiv.style.display = 'none';
     
     try {
@@ -79,22 +83,17 @@ window.addEventListener('DOMContentLoaded', () => {
         throw new Error(data.error || 'Failed to process resumes');
       }
       
-      if (!data.candidates || data.candidates.length === 0) {
+      const finalState = await followBatch(data);
+      
+      progressBar.style.display = 'none';
+      if (finalState.status === 'failed') {
+        throw new Error(finalState.error || 'Failed to process resumes');
+      }
+      if (currentCandidates.length === 0) {
         alert('No candidates were successfully processed. Please check the resume files.');
-        progressBar.style.display = 'none';
         return;
       }
       
-      // Hide progress, show results
-      progressBar.style.display = 'none';
-      renderRankingBoard(data);
-      resultsDiv.style.display = 'block';
-      
-      // Scroll to results
-      setTimeout(() => {
-        resultsDiv.scrollIntoView({ behavior: 'smooth', block: 'start' });
-      }, 100);
-      
     } catch (error) {
       alert(`Error: ${error.message}`);
       progressBar.style.display = 'none';
@@ -104,6 +103,75 @@ window.addEventListener('DOMContentLoaded', () => {
     }
   });
 
+  // Follow an asynchronous batch, re-rendering the leaderboard as candidates are scored.
+  // Resolves with the final progress state once the batch is done or failed.
+  function followBatch(batch) {
+    const board = { job_title: null, candidates: [] };
+    let firstRender = true;
+    
+    const addCandidates = (rows) => {
+      if (!rows || rows.length === 0) return;
+      board.candidates = board.candidates.concat(rows).sort((a, b) => b.score - a.score);
+      renderRankingBoard(board);
+      resultsDiv.style.display = 'block';
+      if (firstRender) {
+        firstRender = false;
+        setTimeout(() => {
+          resultsDiv.scrollIntoView({ behavior: 'smooth', block: 'start' });
+        }, 100);
+      }
+    };
+    
+    const showProgress = (state) => {
+      const total = state.total_files || 0;
+      const done = state.processed_files || 0;
+      progressFill.style.width = total ? `${Math.round(done / total * 100)}%` : '0%';
+      progressText.textContent = `Processed ${done} / ${total} resumes`;
+    };
+    
+    return fetch(batch.status_url + '?after=' + Number.MAX_SAFE_INTEGER)
+      .then(r => r.json())
+      .then(state => {
+        board.job_title = state.job_title;
+        
+        if (!window.EventSource) {
+          return pollBatch(batch.status_url, addCandidates, showProgress);
+        }
+        
+        return new Promise((resolve) => {
+          const source = new EventSource(batch.events_url);
+          source.addEventListener('candidates', (e) => addCandidates(JSON.parse(e.data)));
+          source.addEventListener('progress', (e) => showProgress(JSON.parse(e.data)));
+          source.addEventListener('done', (e) => {
+            source.close();
+            resolve(JSON.parse(e.data));
+          });
+          source.onerror = () => {
+            // The server ends each stream after a while; EventSource reconnects by itself
+            // (resuming from the last event id) unless the connection failed for good
+            if (source.readyState === EventSource.CONNECTING) return;
+            // Connection lost: fall back to polling from where the stream stopped
+            source.close();
+            const seen = board.candidates.reduce((m, c) => Math.max(m, c.result_id || 0), 0);
+            resolve(pollBatch(batch.status_url, addCandidates, showProgress, seen));
+          };
+        });
+      });
+  }
+
+  async function pollBatch(statusUrl, addCandidates, showProgress, after = 0) {
+    while (true) {
+      const response = await fetch(`${statusUrl}?after=${after}`);
+      const state = await response.json();
+      if (!response.ok) throw new Error(state.error || 'Failed to fetch batch status');
+      addCandidates(state.candidates);
+      after = state.last_result_id;
+      showProgress(state);
+      if (state.status === 'done' || state.status === 'failed') return state;
+      await new Promise(r => setTimeout(r, 1000));
+    }
+  }
+
   function renderRankingBoard(data) {
     const candidates = data.candidates || [];
     const jobTitle = data.job_title || '--';
@@ -4,8 +4,36 @@ Comprehensive test script for ResumeMatch AI
 Run this to verify everything is working correctly
 """
 
+import contextlib
 import sys
 import os
+import tempfile
+import threading
+
+# Tests that write use a throwaway database, index directory and parse cache
+_WORKDIR = tempfile.mkdtemp(prefix="resumematch-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_WORKDIR, 'test.db')}"
+os.environ["INDEX_DIR"] = os.path.join(_WORKDIR, "index")
+# Tests that need a feature space fit one explicitly instead of waiting for the bootstrap
+os.environ["FEATURES_BOOTSTRAP_DOCS"] = "1000000000"
+# Views run inline; asgi.py would otherwise default to one offload process per CPU
+os.environ["OFFLOAD_WORKERS"] = "0"
+
+
+def _header(title):
+    print("\n" + "=" * 60)
+    print(title)
+    print("=" * 60)
+
+
+def _create_candidates(texts):
+    """Store one candidate per resume text; returns their ids"""
+    from db import init_db, unit_of_work
+    from services.resume_service import create_candidates
+    init_db()
+    with unit_of_work() as session:
+        cands = create_candidates(session, [(f"Test {i}", f"test{i}@example.com", text) for i, text in enumerate(texts)])
+        return [c.id for c in cands]
 
 def test_imports():
     """Test all critical imports"""
@@ -113,6 +141,968 @@ def test_scoring():
     return passed == len(test_cases)
 
 
+_SKILL_CORPUS = [
+    ("Data scientist with machine learning, deep learning and NLP experience using scikit-learn and pandas.",
+     {"deep learning", "machine learning", "nlp", "pandas", "scikit-learn"}),
+    ("Built REST APIs in Go and Node.js, deployed with Docker on AWS and Kubernetes via GitHub Actions.",
+     {"api", "aws", "docker", "github actions", "kubernetes", "node.js", "rest"}),
+    ("C++ and C# developer; .NET, SQL Server, Power BI dashboards and Tableau reports.",
+     {".net", "c#", "c++", "power bi", "sql", "tableau"}),
+]
+
+
+def test_skill_extraction_parity():
+    """Fast phrase-matcher extraction finds exactly the skills the parser-based extractor finds"""
+    _header("TESTING SKILL EXTRACTION PARITY")
+    from nlp.skills import extract_skills
+
+    texts = [open("sample_resume.txt", encoding="utf-8").read()] + [text for text, _ in _SKILL_CORPUS]
+    try:
+        parser_results = [extract_skills(t, use_parser=True) for t in texts]
+    except RuntimeError as e:
+        print(f"⚠ Skipped: {e}")
+        return
+    for text, expected in zip(texts, parser_results):
+        fast = extract_skills(text, use_parser=False)
+        assert fast == expected, f"missed {sorted(expected - fast)}, extra {sorted(fast - expected)}"
+        print(f"✓ {len(expected)} skills matched")
+
+
+def test_fast_skill_extraction():
+    """The phrase matcher (blank tokenizer, no model) finds the expected skills without false plurals"""
+    _header("TESTING FAST SKILL EXTRACTION")
+    from nlp.skills import extract_skills
+
+    for text, expected in _SKILL_CORPUS:
+        found = extract_skills(text, use_parser=False)
+        assert found == expected, f"missed {sorted(expected - found)}, extra {sorted(found - expected)}"
+    # Short skills get no "+s" spelling: these are other words, not plurals of r, qa and go
+    assert extract_skills("Knows the ABCs, RS-232, QAs and GOs", use_parser=False) == set()
+    assert extract_skills("Wrote Dockerfiles and many APIs", use_parser=False) == {"api"}
+    print("✓ fixed corpus matched, no false plural matches")
+
+
+def test_index_refit_in_background():
+    """A refit the candidate index needs runs off the request thread; the old index keeps serving"""
+    _header("TESTING BACKGROUND INDEX REFIT")
+    from db import SessionLocal
+    from services import index_service
+
+    _create_candidates([f"Python developer {i} building REST APIs with Flask" for i in range(5)])
+    with SessionLocal() as session:
+        old = index_service.get_candidate_index(session)
+    _create_candidates([f"Go engineer {i} running Kubernetes clusters" for i in range(len(old) + 1)])
+    with SessionLocal() as session:
+        assert index_service._candidates.get(session) is old, "the old index should keep serving"
+        for thread in threading.enumerate():
+            if thread.name == "index-rebuild-candidates":
+                thread.join(60)
+        new = index_service._candidates.get(session)
+    assert new is not old and not new.needs_refit and new.fitted_docs == len(new)
+    print(f"✓ refit in the background: {old.fitted_docs} -> {new.fitted_docs} documents")
+
+
+def test_stop_word_texts_score_zero():
+    """Texts holding only stop words score 0 text similarity instead of failing the request"""
+    _header("TESTING STOP-WORD-ONLY TEXTS")
+    from models import Candidate, Job
+    from nlp.matching import cosine_match_score, cosine_match_scores
+    from services.match_service import score_candidates
+
+    assert cosine_match_score("the and of", "and the") == 0.0
+    assert list(cosine_match_scores("the and of", ["and the", "of"])) == [0.0, 0.0]
+    job = Job(id=1, title="Empty", description="the and of")
+    job.required_skills = ["python"]
+    cand = Candidate(id=1, resume_text="and the")
+    cand.skills = ["python"]
+    result = score_candidates(job, [cand])[0]
+    assert result["text_similarity_score"] == 0.0 and result["skills_match_score"] == 1.0, result
+    print("✓ stop-word-only texts score 0 text similarity")
+
+
+def test_parse_cache_pruning():
+    """The parse cache file drops entries past its age bound, then the least recently used"""
+    _header("TESTING PARSE CACHE PRUNING")
+    import sqlite3
+    from nlp.cache import ContentCache
+
+    path = os.path.join(_WORKDIR, "prune_cache.sqlite3")
+    cache = ContentCache("prune-test", max_items=0, path=path, max_entries=0, max_age_days=1)
+    cache.put_many({f"k{i}": i for i in range(5)})
+    cache.max_entries = 3
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE entries SET accessed = 0 WHERE key = 'k0'")
+        conn.execute("UPDATE entries SET accessed = accessed - 7200 WHERE key IN ('k1', 'k2', 'k3')")
+    # A read refreshes k1's access time, so k2 is now the least recently used
+    assert cache.get("k1") == 1
+    assert cache.prune() == 2
+    assert cache.get_many(["k0", "k1", "k2", "k3", "k4"]) == {"k1": 1, "k3": 3, "k4": 4}
+    print("✓ stale and least recently used entries are pruned")
+
+
+def test_hung_pdf_worker_is_killed():
+    """A task stuck past its budget gets its worker killed without failing other requests' tasks"""
+    _header("TESTING HUNG PDF WORKER")
+    import time
+    from nlp import documents
+
+    hung = []
+    stuck = threading.Thread(target=lambda: hung.extend(documents._run_tasks(time.sleep, [60], 2, limit=2)))
+    stuck.start()
+    time.sleep(0.2)
+    pool = documents._pool
+    processes = list(pool._processes.values())
+    # Submitted to the same pool before the stuck task times out, finishing after it does
+    assert documents._run_tasks(time.sleep, [3], 2, limit=30) == [(True, None)]
+    stuck.join()
+    assert hung == [None], hung
+    for thread in threading.enumerate():
+        if thread.name == "pdf-pool-reaper":
+            thread.join(10)
+    for process in processes:
+        process.join(5)
+    assert not any(process.is_alive() for process in processes)
+    assert documents._run_tasks(abs, [-1], 2, limit=30) == [(True, 1)] and documents._pool is not pool
+    print("✓ hung worker killed, other tasks unaffected")
+
+
+def test_batch_item_validation():
+    """:batch endpoints report wrongly typed fields per item and refuse oversized NDJSON bodies"""
+    _header("TESTING BATCH ITEM VALIDATION")
+    import json
+    import app as app_module
+    from db import init_db
+
+    init_db()
+    client = app_module.app.test_client()
+    resp = client.post("/api/resumes:batch", json=[
+        {"resume_text": 123},
+        {"resume_text": "Python developer", "name": ["Ada"]},
+        {"resume_text": "Python developer with Flask", "name": "Ada"},
+    ])
+    body = resp.get_json()
+    assert resp.status_code == 200 and body["failed"] == 2, body
+    assert [r.get("error") for r in body["results"]] == ["resume_text must be a string", "name must be a string", None]
+
+    resp = client.post("/api/jobs:batch", json={"items": [
+        {"title": "Dev", "description": "Python work", "required_skills": "python"},
+        {"title": "Dev", "description": "Python work", "required_skills": ["python", 3]},
+        {"title": "Dev", "description": "Python work", "required_skills": ["python"]},
+    ]})
+    body = resp.get_json()
+    assert [r.get("error") for r in body["results"]] == ["required_skills must be a list of strings"] * 2 + [None]
+
+    limit = app_module.BATCH_MAX_ITEMS
+    app_module.BATCH_MAX_ITEMS = 2
+    try:
+        lines = "".join(json.dumps({"resume_text": f"Resume {i}"}) + "\n" for i in range(5))
+        resp = client.post("/api/resumes:batch", data=lines, content_type="application/x-ndjson")
+        assert resp.status_code == 413, resp.status_code
+    finally:
+        app_module.BATCH_MAX_ITEMS = limit
+    print("✓ invalid items reported per item, oversized NDJSON refused")
+
+
+def test_alias_requirements_match():
+    """Job requirements given as aliases match the canonical skills extracted from resumes"""
+    _header("TESTING ALIAS REQUIREMENTS")
+    from db import SessionLocal, unit_of_work
+    from models import Candidate, Job, candidate_skills, job_skills
+    from services.job_service import canonicalize_job_skills, create_jobs
+    from services.match_service import find_candidates_by_skills, score_candidates
+    from services.resume_service import canonicalize_candidate_skills
+
+    [cand_id] = _create_candidates(["Backend engineer: Python, Kubernetes, Node.js and machine learning."])
+    with unit_of_work() as session:
+        [job] = create_jobs(session, [("Platform", "Run services", ["k8s", "ml", "node", "python", "K8s"])])
+        assert job.required_skills == ["kubernetes", "machine learning", "node.js", "python"], job.required_skills
+        result = score_candidates(job, [session.get(Candidate, cand_id)])[0]
+        assert result["skills_match_score"] == 1.0, result
+        found = find_candidates_by_skills(session, ["k8s", "ML"], limit=1000)
+        assert cand_id in [r["candidate_id"] for r in found]
+
+        # A job stored before requirements were canonicalized
+        legacy = Job(title="Legacy", description="Run services", required_skills_json='["k8s", "python"]')
+        session.add(legacy)
+        # ...and a candidate extracted when ml and sklearn were skills of their own
+        legacy_cand = Candidate(name="Legacy", resume_text="ML with sklearn", skills_json='["ml", "python", "sklearn"]')
+        session.add_all([legacy, legacy_cand])
+        session.flush()
+        legacy_id, legacy_cand_id = legacy.id, legacy_cand.id
+    with SessionLocal() as session:
+        assert canonicalize_job_skills(session) >= 1
+        assert session.get(Job, legacy_id).required_skills == ["kubernetes", "python"]
+        linked = session.execute(job_skills.select().where(job_skills.c.job_id == legacy_id)).all()
+        assert len(linked) == 2
+        assert canonicalize_candidate_skills(session) >= 1
+        cand = session.get(Candidate, legacy_cand_id)
+        assert cand.skills == ["machine learning", "python", "scikit-learn"], cand.skills
+        linked = session.execute(candidate_skills.select().where(candidate_skills.c.candidate_id == legacy_cand_id)).all()
+        assert len(linked) == 3
+        job = Job(title="ML", description="Models", required_skills=["machine learning", "scikit-learn"])
+        assert score_candidates(job, [cand])[0]["skills_match_score"] == 1.0
+        assert canonicalize_candidate_skills(session) == 0
+    SessionLocal.remove()
+    print("✓ k8s/ml/node requirements match kubernetes/machine learning/node.js")
+    print("✓ stored job and candidate aliases rewritten to canonical skills")
+
+
+def test_retrieval_index():
+    """RetrievalIndex ranks by blended skills/text score and flags a refit after adds"""
+    _header("TESTING RETRIEVAL INDEX")
+    from nlp.retrieval import RetrievalIndex
+
+    index = RetrievalIndex.build(iter([
+        (1, "python flask rest api developer", ["python", "flask"]),
+        (2, "java spring backend engineer", ["java", "spring"]),
+        (3, "python data science with pandas", ["python", "pandas"]),
+        (4, "frontend react javascript", ["react", "javascript"]),
+    ]))
+    top = index.top_k_blended("python flask api", ["python", "flask"], k=2, query_skills_denominator=True)
+    assert [(doc_id, skills) for doc_id, _, skills, _ in top] == [(1, 1.0), (3, 0.5)], top
+    assert all(abs(score - (0.7 * skills + 0.3 * text)) < 1e-9 for _, score, skills, text in top)
+
+    assert not index.needs_refit
+    index.add(5, "go kubernetes operator", ["go", "kubernetes"])
+    index.add(6, "go microservices", ["go"])
+    assert index.needs_refit and len(index) == 6
+    top = index.top_k_blended("kubernetes", ["go", "kubernetes"], k=1, query_skills_denominator=True)
+    assert top[0][0] == 5, top
+    print("✓ blended ranking and refit flag")
+
+
+def test_search_before_index_exists():
+    """The first search in a process with no saved index builds it instead of returning nothing"""
+    _header("TESTING SEARCH BEFORE THE INDEX EXISTS")
+    from config import INDEX_DIR
+    from db import SessionLocal, unit_of_work
+    from models import Job
+    from services import index_service
+    from services.job_service import create_job
+
+    with unit_of_work() as session:
+        job_id = create_job(session, title="Rust dev", description="Rust systems programming",
+                            required_skills=["rust"]).id
+    # As in a fresh process with nothing saved under INDEX_DIR
+    for name in os.listdir(INDEX_DIR):
+        if name.startswith("jobs."):
+            os.remove(os.path.join(INDEX_DIR, name))
+    index_service._jobs.index = None
+    with SessionLocal() as session:
+        found = index_service.search_jobs(session, "Rust systems programming", ["rust"], 5)
+    assert job_id in [doc_id for doc_id, *_ in found], found
+
+    # Rows committed elsewhere are caught up by the next search, without a write on the read path
+    saved_at = os.path.getmtime(os.path.join(INDEX_DIR, "jobs.joblib"))
+    with unit_of_work() as session:
+        other = Job(title="Rust dev 2", description="Rust embedded firmware", required_skills_json='["rust"]')
+        session.add(other)
+        session.flush()
+        other_id = other.id
+    with SessionLocal() as session:
+        found = index_service.search_jobs(session, "Rust embedded firmware", ["rust"], 5)
+    SessionLocal.remove()
+    assert other_id in [doc_id for doc_id, *_ in found]
+    assert os.path.getmtime(os.path.join(INDEX_DIR, "jobs.joblib")) == saved_at
+    print("✓ first search built the index; catching up did not save it")
+
+
+def test_async_bulk_batches():
+    """A queued bulk batch is processed chunk by chunk; a running batch gone stale is reclaimed"""
+    _header("TESTING ASYNC BULK BATCHES")
+    from datetime import datetime, timedelta, timezone
+    from config import BULK_STALE_SECONDS
+    from db import SessionLocal, unit_of_work
+    from models import BulkBatch
+    from services import bulk_service
+
+    files = [("ada.txt", b"Ada Lovelace\nPython developer using Flask and SQL"),
+             ("bob.txt", b"Bob Smith\nJava developer using Spring"),
+             ("notes.doc", b"not a resume")]
+    with unit_of_work() as session:
+        batch_id = bulk_service.submit_bulk_batch(session, "Backend", "Python Flask APIs", ["python", "flask"], files).id
+        stale_id = bulk_service.submit_bulk_batch(session, "Backend", "Python Flask APIs", ["python"], files[:1]).id
+        live_id = bulk_service.submit_bulk_batch(session, "Backend", "Python Flask APIs", ["python"], files[:1]).id
+    bulk_service.process_bulk_batch(batch_id)
+    with SessionLocal() as session:
+        state = bulk_service.get_bulk_batch(session, batch_id)
+        assert state["status"] == "done" and state["processed_files"] == 3, state
+        assert [c["filename"] for c in state["candidates"]] == ["ada.txt", "bob.txt"]
+        assert [e["filename"] for e in state["errors"]] == ["notes.doc"]
+        assert bulk_service.get_bulk_batch(session, batch_id, after=state["last_result_id"])["candidates"] == []
+
+    with unit_of_work() as session:
+        long_ago = datetime.now(timezone.utc) - timedelta(seconds=BULK_STALE_SECONDS + 60)
+        session.get(BulkBatch, stale_id).status = "running"
+        session.get(BulkBatch, stale_id).updated_at = long_ago
+        session.get(BulkBatch, live_id).status = "running"
+    pending = bulk_service._pending_batch_ids()
+    assert stale_id in pending and live_id not in pending and batch_id not in pending
+    bulk_service.process_bulk_batch(live_id)
+    bulk_service.process_bulk_batch(stale_id)
+    with SessionLocal() as session:
+        assert bulk_service.get_bulk_batch(session, stale_id)["status"] == "done"
+        assert bulk_service.get_bulk_batch(session, live_id)["status"] == "running"
+    SessionLocal.remove()
+    print("✓ queued batch processed, stale batch reclaimed, live batch left alone")
+
+
+def test_bulk_events_stream():
+    """The SSE stream ends after SSE_MAX_SECONDS, resumes from Last-Event-ID and survives a deleted batch"""
+    _header("TESTING BULK EVENTS STREAM")
+    import app as app_module
+    from db import unit_of_work
+    from models import BulkBatch
+    from services import bulk_service
+
+    files = [("ada.txt", b"Ada Lovelace\nPython developer using Flask")]
+    with unit_of_work() as session:
+        done_id = bulk_service.submit_bulk_batch(session, "Backend", "Python Flask APIs", ["python"], files).id
+        queued_id = bulk_service.submit_bulk_batch(session, "Backend", "Python Flask APIs", ["python"], files).id
+    bulk_service.process_bulk_batch(done_id)
+    client = app_module.app.test_client()
+
+    body = client.get(f"/api/bulk-match/{done_id}/events").get_data(as_text=True)
+    assert "event: candidates" in body and body.rstrip().split("\n\n")[-1].splitlines()[1] == "event: done", body
+    last_id = int(body.split("id: ")[-1].split("\n")[0])
+    resumed = client.get(f"/api/bulk-match/{done_id}/events", headers={"Last-Event-ID": str(last_id)})
+    assert "event: candidates" not in resumed.get_data(as_text=True)
+
+    limit = app_module.SSE_MAX_SECONDS
+    app_module.SSE_MAX_SECONDS = 0.3
+    try:
+        body = client.get(f"/api/bulk-match/{queued_id}/events").get_data(as_text=True)
+        assert "event: progress" in body and "event: done" not in body, body
+
+        stream = client.get(f"/api/bulk-match/{queued_id}/events", buffered=False).response
+        next(stream)
+        with unit_of_work() as session:
+            session.query(BulkBatch).filter(BulkBatch.id == queued_id).delete()
+        body = b"".join(stream).decode()
+        assert '"error": "batch not found"' in body and "event: done" in body, body
+    finally:
+        app_module.SSE_MAX_SECONDS = limit
+    print("✓ capped stream, Last-Event-ID resume and deleted batch handled")
+
+
+@contextlib.contextmanager
+def _fitted_feature_space():
+    """Fit the feature space (and LSA embedder) over the stored corpus; drop them again afterwards"""
+    from config import INDEX_DIR
+    from db import SessionLocal
+    from services import feature_service
+
+    try:
+        with SessionLocal() as session:
+            feature_service.revectorize(session, refit=True)
+        SessionLocal.remove()
+        yield feature_service.get_feature_space()
+    finally:
+        for name in ("features.joblib", "semantic.joblib"):
+            if os.path.exists(os.path.join(INDEX_DIR, name)):
+                os.remove(os.path.join(INDEX_DIR, name))
+        feature_service._space = feature_service._lsa = None
+        feature_service._mtime = feature_service._lsa_mtime = None
+
+
+def test_feature_blobs():
+    """Encoded feature blobs decode to the vectorizer's row and the skill bitset"""
+    _header("TESTING FEATURE BLOBS")
+    import numpy as np
+    from nlp.features import Features, FeatureSpace
+
+    space = FeatureSpace.fit(["python flask rest apis", "java spring services", "python data pipelines"])
+    blob_a = space.encode("python flask apis", ["python", "flask"])
+    blob_b = space.encode("python data pipelines", ["python", "sql"])
+    a, b = Features(blob_a), Features(blob_b)
+    rows = space.vectorizer.transform(["python flask apis", "python data pipelines"])
+    assert abs(a.dot(b) - rows[0].multiply(rows[1]).sum()) < 1e-6
+    assert a.overlap(b) == 1 and (a.n_skills, b.n_skills) == (2, 2)
+
+    matrix, bits, n_skills = space.stack([blob_a, blob_b])
+    assert np.allclose(matrix.toarray(), rows.toarray(), atol=1e-6)
+    assert space.skill_names(bits[0]) == ["flask", "python"] and n_skills.tolist() == [2, 2]
+    assert FeatureSpace(space.vectorizer, space.skills).version == space.version
+    print("✓ blobs round-trip text vectors and skills")
+
+
+def test_revectorize():
+    """revectorize encodes stored rows once per vocabulary version"""
+    _header("TESTING REVECTORIZE")
+    from db import SessionLocal
+    from models import Candidate
+    from services.feature_service import revectorize
+
+    [cand_id] = _create_candidates(["Python developer building Flask APIs and data pipelines"])
+    with _fitted_feature_space() as space:
+        with SessionLocal() as session:
+            cand = session.get(Candidate, cand_id)
+            assert cand.features_version == space.version and cand.features is not None
+            counts = revectorize(session)
+            assert counts["version"] == space.version and counts["jobs"] == counts["candidates"] == 0, counts
+        SessionLocal.remove()
+        # Rows written once a vocabulary exists are encoded on insert
+        [new_id] = _create_candidates(["Go engineer running Kubernetes"])
+        with SessionLocal() as session:
+            assert session.get(Candidate, new_id).features_version == space.version
+        SessionLocal.remove()
+    print("✓ stale rows encoded, current ones skipped, new ones encoded on write")
+
+
+def test_skill_bitsets():
+    """Packed skill bitsets count the same overlaps as set intersection"""
+    _header("TESTING SKILL BITSETS")
+    import random
+    import numpy as np
+    from nlp import skillbits
+    from nlp.skillbits import SkillBitset, overlap_counts, overlap_matrix
+
+    rng = random.Random(0)
+    vocab = [f"skill{i:03d}" for i in range(150)]
+    bitset = SkillBitset(vocab)
+    rows = [set(rng.sample(vocab, rng.randint(0, 20))) for _ in range(40)]
+    cols = [set(rng.sample(vocab, rng.randint(0, 20))) | {"not-in-vocab"} for _ in range(7)]
+    packed_rows, packed_cols = bitset.pack_many(rows), bitset.pack_many(cols)
+    assert packed_rows.shape == (40, 3) and bitset.names(packed_rows[5]) == sorted(rows[5])
+
+    expected = np.array([[len(r & c) for c in cols] for r in rows])
+    assert (overlap_matrix(packed_rows, packed_cols, chunk_words=64) == expected).all()
+    assert (overlap_counts(packed_cols[0], packed_rows) == expected[:, 0]).all()
+    # The byte-table fallback for NumPy < 2.0 agrees with np.bitwise_count
+    assert (skillbits._BYTE_POPCOUNT[packed_rows.view(np.uint8)].sum(axis=1) == skillbits.popcount(packed_rows)).all()
+    print("✓ overlap counts match set intersections")
+
+
+def test_single_pdf_uses_pool():
+    """A one-page PDF is parsed in the worker pool too, so its time budget is enforced"""
+    _header("TESTING SINGLE PDF IN POOL")
+    import io
+    from pypdf import PdfWriter
+    from nlp import documents
+
+    writer = PdfWriter()
+    writer.add_blank_page(100, 100)
+    pdf = io.BytesIO()
+    writer.write(pdf)
+    submitted = []
+    submit = documents._submit
+    documents._submit = lambda fn, tasks, max_workers: submitted.append(len(tasks)) or submit(fn, tasks, max_workers)
+    try:
+        # Unique bytes, so the parse cache cannot answer
+        assert documents.extract_text("one.pdf", pdf.getvalue() + os.urandom(8)) == ""
+    finally:
+        documents._submit = submit
+    assert submitted == [1], submitted
+    print("✓ single page range sent to the pool")
+
+
+def test_batch_endpoints():
+    """:batch endpoints create rows and score pairs per item, in input order"""
+    _header("TESTING BATCH ENDPOINTS")
+    import json
+    from app import app
+
+    client = app.test_client()
+    body = client.post("/api/jobs:batch", json=[
+        {"title": "Backend", "description": "Python and Flask APIs", "required_skills": ["python", "flask"]},
+        {"title": "Missing description"},
+    ]).get_json()
+    assert body["succeeded"] == 1 and body["results"][1]["index"] == 1 and "error" in body["results"][1]
+    job_id = body["results"][0]["job_id"]
+
+    lines = "".join(json.dumps({"resume_text": text}) + "\n" for text in
+                    ["Python developer using Flask", "Java developer using Spring"])
+    resp = client.post("/api/resumes:batch", data=lines, content_type="application/x-ndjson")
+    created = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert resp.mimetype == "application/x-ndjson" and [r["index"] for r in created] == [0, 1]
+    assert "python" in created[0]["skills"]
+
+    body = client.post("/api/match:batch", json={"items": [
+        {"candidate_id": created[0]["candidate_id"], "job_id": job_id},
+        {"candidate_id": created[1]["candidate_id"], "job_id": job_id},
+        {"candidate_id": 10 ** 9, "job_id": job_id},
+        {"candidate_id": "1", "job_id": job_id},
+    ]}).get_json()
+    results = body["results"]
+    assert body["succeeded"] == 2 and results[0]["score"] > results[1]["score"]
+    assert results[2]["error"] == "candidate or job not found" and "error" in results[3]
+    print("✓ jobs, resumes (NDJSON) and match batches")
+
+
+def test_sqlite_unit_of_work():
+    """SQLite runs in WAL mode; unit_of_work commits once or rolls back, and writers queue for the lock"""
+    _header("TESTING SQLITE UNIT OF WORK")
+    import time
+    from sqlalchemy import text
+    from db import SessionLocal, engine, init_db, unit_of_work
+    from models import Job
+
+    init_db()
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar().lower() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+
+    try:
+        with unit_of_work() as session:
+            session.add(Job(title="Rolled back", description="never stored"))
+            session.flush()
+            raise RuntimeError("abort")
+    except RuntimeError:
+        pass
+    with SessionLocal() as session:
+        assert session.query(Job).filter_by(title="Rolled back").count() == 0
+
+    # A second writer waits for the first to commit instead of failing with "database is locked"
+    held = threading.Event()
+
+    def slow_writer():
+        with unit_of_work() as session:
+            session.add(Job(title="First writer", description="held the lock"))
+            session.flush()
+            held.set()
+            time.sleep(0.5)
+
+    first = threading.Thread(target=slow_writer)
+    first.start()
+    held.wait(5)
+    with unit_of_work() as session:
+        session.add(Job(title="Second writer", description="waited for it"))
+    first.join()
+    with SessionLocal() as session:
+        titles = [t for (t,) in session.execute(text("SELECT title FROM jobs WHERE title LIKE '% writer'"))]
+        assert titles == ["First writer", "Second writer"], titles
+    SessionLocal.remove()
+    print("✓ WAL pragmas, rollback on error, queued writers")
+
+
+def test_metrics():
+    """Stage timings reach the histogram, Server-Timing and /metrics"""
+    _header("TESTING METRICS")
+    import metrics
+    from app import app
+
+    hits = metrics.counter("test_hits_total", "Test counter", ("kind",))
+    hits.inc(kind="a")
+    hits.inc(2, kind="a")
+    text = metrics.render()
+    assert "# TYPE test_hits_total counter" in text and 'test_hits_total{kind="a"} 3' in text
+
+    token = metrics.start_request_timing()
+    with metrics.timed("test_stage"):
+        pass
+    metrics.record_stage("test_stage", 0.5)
+    stages = metrics.stop_request_timing(token)
+    assert list(stages) == ["test_stage"] and stages["test_stage"] >= 0.5
+    metrics.record_stage("test_stage", 0.1)  # outside a request: histogram only
+    assert 'resume_stage_seconds_count{stage="test_stage"} 3' in metrics.render()
+    print("✓ counters, timed() and record_stage")
+
+    client = app.test_client()
+    job_id = client.post("/api/jobs", json={"title": "Backend", "description": "Python and Flask APIs",
+                                            "required_skills": ["python"]}).get_json()["job_id"]
+    candidate_id = _create_candidates(["Python developer"])[0]
+    path = f"/api/match?candidate_id={candidate_id}&job_id={job_id}"
+    resp = client.get(path, headers={"X-Server-Timing": "1"})
+    timing = resp.headers["Server-Timing"]
+    assert "score;dur=" in timing and timing.split(", ")[-1].startswith("total;dur=")
+    assert "Server-Timing" not in client.get(path).headers
+    print("✓ Server-Timing on request")
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200 and resp.mimetype == "text/plain"
+    body = resp.get_data(as_text=True)
+    assert any(line.startswith("http_request_duration_seconds_count") and 'endpoint="/api/match"' in line
+               for line in body.splitlines())
+    assert 'resume_stage_seconds_bucket{stage="score",le="+Inf"}' in body
+    print("✓ /metrics exposition")
+
+
+def test_lazy_loading_and_warmup():
+    """Heavy libraries load on first use or warm-up; /ready flips once warm-up ran"""
+    _header("TESTING LAZY LOADING AND WARM-UP")
+    import subprocess
+    from app import app
+
+    probe = "import sys, app; print(sorted(m for m in ('spacy', 'sklearn', 'pypdf', 'nltk') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    assert out.strip() == "[]", out
+    print("✓ importing the app loads no models")
+
+    client = app.test_client()
+    resp = client.get("/ready")
+    assert resp.status_code == 503 and resp.get_json()["status"] == "warming"
+    resp = client.post("/api/warmup")
+    assert resp.status_code == 200, resp.get_json()
+    timings = resp.get_json()["warmup_seconds"]
+    assert {"sklearn", "skill_matcher", "indexes"} <= set(timings) and "spacy_model" not in timings
+    resp = client.get("/ready")
+    assert resp.status_code == 200 and resp.get_json()["warmup_seconds"] == timings
+    print("✓ /ready is 503 until /api/warmup ran")
+
+
+def test_bulk_match_top_k():
+    """bulk_match with top_k returns the head of the full ranking"""
+    _header("TESTING BULK MATCH TOP-K")
+    from db import init_db, unit_of_work
+    from services.bulk_service import bulk_match
+
+    init_db()
+    files = [(f"resume{i}.txt", text.encode()) for i, text in enumerate([
+        "Java developer using Spring", "Python developer using Flask and Docker",
+        "Python developer", "Designer using Figma"])]
+    job = ("Backend", "Python and Flask APIs in Docker", ["python", "flask", "docker"])
+    with unit_of_work() as session:
+        full = bulk_match(session, *job, files)["candidates"]
+        top = bulk_match(session, *job, files, top_k=2)
+    assert [r["filename"] for r in top["candidates"]] == [r["filename"] for r in full[:2]]
+    assert [r["score"] for r in top["candidates"]] == [r["score"] for r in full[:2]]
+    assert top["total_candidates"] == len(files) and full[0]["filename"] == "resume1.txt"
+    print("✓ top_k results match the head of the full ranking")
+
+
+def test_ann_recall():
+    """The IVF index finds most of the exact top-k and is exact when probing every list"""
+    _header("TESTING ANN RECALL")
+    import numpy as np
+    from config import ANN_NPROBE
+    from nlp.ann import IvfIndex
+    from nlp.embeddings import normalize_rows
+
+    rng = np.random.default_rng(0)
+    centers = normalize_rows(rng.standard_normal((100, 32)).astype(np.float32))
+    vectors = normalize_rows(centers[rng.integers(0, 100, 5000)] + 0.3 * rng.standard_normal((5000, 32)).astype(np.float32))
+    ids = np.arange(1, 5001)
+    index = IvfIndex.build(ids, vectors)
+    queries = normalize_rows(centers[rng.integers(0, 100, 50)] + 0.3 * rng.standard_normal((50, 32)).astype(np.float32))
+
+    recall, exact_recall = [], []
+    for query in queries:
+        exact = set(ids[np.argsort(-(vectors @ query))[:10]].tolist())
+        found, sims = index.search(query, 10, nprobe=ANN_NPROBE)
+        assert np.all(np.diff(sims) <= 0)
+        recall.append(len(exact & set(found.tolist())) / 10)
+        found, _ = index.search(query, 10, nprobe=len(index.centroids))
+        exact_recall.append(len(exact & set(found.tolist())) / 10)
+    assert np.mean(recall) >= 0.9 and np.mean(exact_recall) == 1.0, (np.mean(recall), np.mean(exact_recall))
+    print(f"✓ recall@10 {np.mean(recall):.2f} with nprobe={ANN_NPROBE} of {len(index.centroids)} lists")
+
+    index.add(10 ** 6, queries[0])
+    found, sims = index.search(queries[0], 1, nprobe=1)
+    assert found[0] == 10 ** 6 and abs(sims[0] - 1.0) < 1e-5
+    assert abs(index.similarity([10 ** 6], queries[0])[0] - 1.0) < 1e-5 and len(index) == 5001
+    print("✓ added vectors are searched before the rebuild")
+
+
+def test_semantic_similarity():
+    """LSA embeddings rank related texts closer, and ?similarity=semantic scores through them"""
+    _header("TESTING SEMANTIC SIMILARITY")
+    import numpy as np
+    from app import app
+    from services.feature_service import get_embedder
+
+    client = app.test_client()
+    job_id = client.post("/api/jobs", json={"title": "Data engineer", "description": "Python data pipelines with Spark",
+                                            "required_skills": ["python"]}).get_json()["job_id"]
+    related, unrelated = _create_candidates(["Python engineer building Spark data pipelines",
+                                             "Graphic designer working in Figma and Photoshop"])
+    assert client.get(f"/api/match?candidate_id={related}&job_id={job_id}&similarity=semantic").status_code == 503
+    with _fitted_feature_space():
+        embedder = get_embedder()
+        vectors = embedder.encode(["Python data pipelines with Spark", "Spark pipelines in Python",
+                                   "Figma and Photoshop designs"])
+        assert vectors.shape == (3, embedder.dim) and np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+        assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+        print(f"✓ {embedder.dim}-dimensional unit embeddings, related texts closer")
+
+        scores = {}
+        for cand_id in (related, unrelated):
+            resp = client.get(f"/api/match?candidate_id={cand_id}&job_id={job_id}&similarity=semantic")
+            assert resp.status_code == 200, resp.get_json()
+            scores[cand_id] = resp.get_json()["text_similarity_score"]
+        assert scores[related] > scores[unrelated]
+        body = client.get(f"/api/jobs/{job_id}/top-candidates?k=2&similarity=semantic").get_json()
+        assert body["candidates"][0]["candidate_id"] == related, body
+        assert client.get(f"/api/match?candidate_id={related}&job_id={job_id}&similarity=nope").status_code == 400
+        print("✓ /api/match and top-candidates rank by embedding similarity")
+
+
+def test_bulk_screen_multiple_jobs():
+    """bulk_screen ingests each resume once and ranks it against every listed job"""
+    _header("TESTING MULTI-JOB BULK SCREEN")
+    from db import unit_of_work
+    from services.bulk_service import bulk_screen
+    from services.job_service import create_jobs
+
+    with unit_of_work() as session:
+        jobs = create_jobs(session, [("Python dev", "Python Flask APIs", ["python", "flask"]),
+                                     ("Java dev", "Java Spring services", ["java", "spring"])])
+        job_ids = [job.id for job in jobs]
+        files = [("py.txt", b"Python developer building Flask APIs"),
+                 ("java.txt", b"Java developer building Spring services"),
+                 ("empty.txt", b"")]
+        result = bulk_screen(session, job_ids, files, top_k=1)
+        assert bulk_screen(session, job_ids + [10 ** 9], files) is None
+    assert result["job_ids"] == job_ids and result["total_candidates"] == 2
+    assert len(result["scores"]) == 2 and all(len(row) == 2 for row in result["scores"])
+    assert [board["candidates"][0]["filename"] for board in result["leaderboards"]] == ["py.txt", "java.txt"]
+    assert [e["filename"] for e in result["errors"]] == ["empty.txt"]
+    print("✓ one score matrix, one leaderboard per job")
+
+
+def test_match_cache_invalidation():
+    """Editing a candidate bumps its revision, so cached and stored match results stop being served"""
+    _header("TESTING MATCH CACHE INVALIDATION")
+    from db import SessionLocal, unit_of_work
+    from models import Candidate, MatchScore
+    from services import match_cache
+    from services.job_service import create_job
+    from services.match_service import match_pairs
+
+    [cand_id] = _create_candidates(["Python developer building Flask APIs"])
+    with unit_of_work() as session:
+        job_id = create_job(session, title="Dev", description="Flask APIs in Python", required_skills=["python"]).id
+    with SessionLocal() as session:
+        [before] = match_pairs(session, [(cand_id, job_id)])
+        [key] = match_cache.pair_keys(session, [(cand_id, job_id)], "tfidf", None)
+        assert match_cache.get(session, key) == before
+    match_cache.flush()
+    SessionLocal.remove()
+
+    with unit_of_work() as session:
+        session.get(Candidate, cand_id).resume_text = "Go developer running Kubernetes clusters"
+    with SessionLocal() as session:
+        [new_key] = match_cache.pair_keys(session, [(cand_id, job_id)], "tfidf", None)
+        assert new_key.candidate_revision == key.candidate_revision + 1
+        assert session.query(MatchScore).filter_by(candidate_id=cand_id).count() == 0
+        assert match_cache.get(session, new_key) is None
+        [after] = match_pairs(session, [(cand_id, job_id)])
+        assert after["score"] < before["score"], (before, after)
+    SessionLocal.remove()
+    print("✓ revision bump drops cached and stored results")
+
+
+def test_asgi_front_end():
+    """AsgiApp refuses with 429 once its threads and queue are taken, and streams chunks as produced"""
+    _header("TESTING ASGI FRONT END")
+    import asyncio
+    from asgi import AsgiApp
+
+    release = threading.Event()
+    first_sent = threading.Event()
+
+    def wsgi_app(environ, start_response):
+        if environ["PATH_INFO"] == "/slow":
+            release.wait(10)
+            start_response("200 OK", [("Content-Type", "text/plain"), ("Content-Length", "4")])
+            return [b"done"]
+
+        def stream():
+            yield b"first\n"
+            # Only produced once the client has the first chunk
+            assert first_sent.wait(10)
+            yield environ["wsgi.input"].read()
+
+        start_response("200 OK", [("Content-Type", "application/x-ndjson")])
+        return stream()
+
+    async def call(app, path, body=b""):
+        inbox: asyncio.Queue = asyncio.Queue()
+        await inbox.put({"type": "http.request", "body": body, "more_body": False})
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+            if message.get("body") == b"first\n":
+                first_sent.set()
+
+        scope = {"type": "http", "method": "POST", "path": path, "query_string": b"", "headers": []}
+        await app(scope, inbox.get, send)
+        return messages
+
+    async def run():
+        app = AsgiApp(wsgi_app, threads=1, max_queued=1)
+        try:
+            slow = [asyncio.ensure_future(call(app, "/slow")) for _ in range(2)]
+            while app.active < 2:
+                await asyncio.sleep(0.01)
+            [start, body] = await call(app, "/slow")
+            assert start["status"] == 429 and (b"retry-after", b"1") in start["headers"]
+            assert b"busy" in body["body"]
+            release.set()
+            for messages in await asyncio.gather(*slow):
+                assert messages[0]["status"] == 200
+                assert b"".join(m.get("body", b"") for m in messages[1:]) == b"done"
+            print("✓ 429 with Retry-After beyond threads + queue")
+
+            messages = await asyncio.wait_for(call(app, "/stream", b"second\n"), 10)
+            assert messages[0]["status"] == 200
+            assert [m["body"] for m in messages[1:]] == [b"first\n", b"second\n", b""]
+            assert [m["more_body"] for m in messages[1:]] == [True, True, False]
+            print("✓ response chunks sent as the view yields them")
+        finally:
+            if app.executor is not None:
+                app.executor.shutdown(wait=False)
+
+    asyncio.run(run())
+
+
+def test_hashing_vectorizer():
+    """HashingTfidf scores like a fitted TF-IDF vocabulary, unfitted with unit IDF"""
+    _header("TESTING HASHING VECTORIZER")
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from nlp import matching
+    from nlp.features import FeatureSpace
+    from nlp.matching import HashingTfidf, cosine_match_matrix, cosine_match_score, cosine_match_scores
+
+    corpus = ["Python developer building Flask APIs", "Java developer building Spring services",
+              "Data engineer running Spark pipelines in Python", "Designer working in Figma"]
+    query = "Python Flask services"
+    hashing = HashingTfidf().fit(corpus)
+    tfidf = TfidfVectorizer(lowercase=True, stop_words="english", ngram_range=(1, 2)).fit(corpus)
+    # Texts of the fitted corpus have no unseen terms, so both weigh every term alike
+    assert np.allclose(cosine_match_matrix(corpus, corpus, hashing), cosine_match_matrix(corpus, corpus, tfidf))
+    # Unseen terms are dropped by the vocabulary but kept (at the highest IDF) by hashing
+    hashed, vocab = cosine_match_scores(query, corpus, hashing), cosine_match_scores(query, corpus, tfidf)
+    assert np.all(hashed <= vocab + 1e-9) and list(np.argsort(-hashed)) == list(np.argsort(-vocab))
+    print("✓ fitted hashing scores equal fitted TF-IDF scores over the corpus terms")
+
+    unfitted = HashingTfidf()
+    assert abs(cosine_match_score(corpus[0], corpus[0], unfitted) - 1.0) < 1e-9
+    assert cosine_match_score(corpus[0], corpus[3], unfitted) == 0.0
+    counts = np.asarray(unfitted.hasher.transform([query]).sum(axis=1)).ravel()
+    X = unfitted.transform([query])
+    assert np.allclose(X.data, 1.0 / np.sqrt(counts[0]))
+    assert cosine_match_score("the and of", "the and of", HashingTfidf()) == 0.0
+    try:
+        HashingTfidf().fit(["the and of"])
+        raise AssertionError("fitting on stop words only should fail")
+    except ValueError:
+        pass
+    print("✓ unit IDF before fitting, 0.0 for stop-word-only texts")
+
+    saved = matching.TEXT_VECTORIZER
+    try:
+        matching.TEXT_VECTORIZER = "hashing"
+        assert isinstance(matching.frozen_vectorizer(), HashingTfidf) and matching.frozen_vectorizer(tfidf) is tfidf
+        space = FeatureSpace.fit(corpus)
+    finally:
+        matching.TEXT_VECTORIZER = saved
+    assert isinstance(space.vectorizer, HashingTfidf) and space.n_features == space.vectorizer.n_features
+    matrix, _, _ = space.stack(space.encode_many([(text, []) for text in [query] + corpus]))
+    stored = np.asarray((matrix[1:] @ matrix[0].T).toarray()).ravel()
+    assert np.allclose(stored, cosine_match_scores(query, corpus, space.vectorizer), atol=1e-6)
+    print("✓ a hashing feature space stores the same scores")
+
+
+def test_posting_lists():
+    """PostingList set operations agree with Python sets across array and bitmap chunks"""
+    _header("TESTING POSTING LISTS")
+    import numpy as np
+    from nlp.postings import PostingList, at_least, intersect, union
+    from nlp.retrieval import RetrievalIndex
+
+    rng = np.random.default_rng(0)
+    # Sparse, mixed and dense (bitmap) chunks over several 65536-value ranges
+    sets = [set(rng.choice(200000, size=n, replace=False).tolist()) for n in (50, 6000, 30000)]
+    lists = [PostingList.from_values(values) for values in sets]
+    for values, posting in zip(sets, lists):
+        assert posting.to_array().tolist() == sorted(values) and len(posting) == len(values)
+    assert any(chunk.dtype == np.uint64 for chunk in lists[2].chunks)
+
+    grown = PostingList()
+    for value in rng.permutation(sorted(sets[2])).tolist():
+        grown.add(value)
+    grown.add(next(iter(sets[2])))
+    assert grown.to_array().tolist() == sorted(sets[2])
+
+    assert intersect(lists).tolist() == sorted(sets[0] & sets[1] & sets[2])
+    assert union(lists).tolist() == sorted(sets[0] | sets[1] | sets[2])
+    twice = {v for v in sets[0] | sets[1] | sets[2] if sum(v in values for values in sets) >= 2}
+    assert at_least(lists, 2).tolist() == sorted(twice)
+    assert intersect([]).tolist() == [] and at_least(lists, 4).tolist() == []
+    print("✓ from_values, add, intersect, union and at_least")
+
+    # RetrievalIndex answers min_skills from its skill postings
+    index = RetrievalIndex.build(iter([
+        (1, "python flask rest api developer", ["python", "flask"]),
+        (2, "java spring backend engineer", ["java", "spring"]),
+        (3, "python data science with pandas", ["python", "pandas"]),
+    ]))
+    top = index.top_k_blended("python", ["python", "flask"], k=5, query_skills_denominator=True, min_skills=2)
+    assert [doc_id for doc_id, *_ in top] == [1]
+    assert index.rows_with(["python", "flask"], 1).tolist() == [0, 2]
+    print("✓ min_skills filters through the skill postings")
+
+
+def test_batch_cli_resume():
+    """python -m screening batch resumes from its recorded parts and starts over with --restart"""
+    _header("TESTING BATCH CLI RESUME")
+    import csv
+    import io
+    import json
+    from screening import batch
+    from screening.__main__ import main
+
+    root = tempfile.mkdtemp(dir=_WORKDIR)
+    resumes = os.path.join(root, "resumes")
+    os.makedirs(resumes)
+    for i, text in enumerate(["Python developer using Flask", "Java developer using Spring", "Go and Kubernetes"]):
+        with open(os.path.join(resumes, f"{i}.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+    jobs_path = os.path.join(root, "jobs.jsonl")
+    with open(jobs_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"title": "Dev", "description": "Python Flask", "required_skills": "python,k8s"}) + "\n")
+    out = os.path.join(root, "results.csv")
+    jobs = batch.load_jobs(jobs_path)
+    assert jobs[0]["required_skills"] == ["python", "kubernetes"]
+
+    args = dict(workers=1, chunk_size=2, keep_parts=True, parse_cache=False)
+    first = batch.run_batch(jobs, [resumes], out, **args)
+    assert first["files"] == 3 and first["resumed_files"] == 0 and first["rows"] == 3, first
+    again = batch.run_batch(jobs, [resumes], out, **args)
+    assert again["resumed_files"] == 3 and again["rows"] == 3, again
+
+    printed = io.StringIO()
+    with contextlib.redirect_stdout(printed):
+        assert main(["batch", "--jobs", jobs_path, "--resumes", resumes, "--out", out, "--workers", "1",
+                     "--restart", "--no-cache"]) == 0
+    assert "earlier run" not in printed.getvalue() and not os.path.exists(out + ".parts")
+    with open(out, newline="", encoding="utf-8") as f:
+        assert len(list(csv.DictReader(f))) == 3
+    print("✓ rerun resumed all parts, --restart screened again")
+
+    # Parts fitted per chunk are only resumed with the same chunks...
+    assert not batch.scores_are_stable()
+    batch.run_batch(jobs, [resumes], out, **args)
+    try:
+        batch.run_batch(jobs, [resumes], out, **{**args, "chunk_size": 3})
+        raise AssertionError("resumed parts scored with other chunks")
+    except ValueError as e:
+        assert "--restart" in str(e)
+    # ...and parts of any run only under the vocabulary they were scored with
+    with _fitted_feature_space():
+        assert batch.scores_are_stable()
+        try:
+            batch.run_batch(jobs, [resumes], out, **args)
+            raise AssertionError("resumed parts scored under another vocabulary")
+        except ValueError as e:
+            assert "vocabulary" in str(e)
+        fitted = batch.run_batch(jobs, [resumes], out, restart=True, **args)
+        assert fitted["resumed_files"] == 0 and fitted["rows"] == 3, fitted
+    print("✓ parts of another vocabulary or chunking are not resumed")
+
+
+def _passes(test):
+    try:
+        test()
+        return True
+    except AssertionError as e:
+        print(f"✗ {e}")
+        return False
+
+
 def check_files():
     """Check if all required files exist"""
     print("\n" + "=" * 60)
@@ -165,6 +1155,14 @@ def check_endpoints():
         ("/api/recommendations", "Get recommendations"),
         ("/api/extract-resume", "Extract resume text"),
         ("/api/bulk-match", "Bulk match resumes"),
+        ("/top-candidates", "Rank candidates for a job"),
+        ("/api/candidates", "Find candidates by skills"),
+        ("/api/resumes:batch", "Create resumes in bulk"),
+        ("/api/jobs:batch", "Create jobs in bulk"),
+        ("/api/match:batch", "Match pairs in bulk"),
+        ("/metrics", "Prometheus metrics"),
+        ("/ready", "Readiness check"),
+        ("/api/warmup", "Warm up models"),
     ]
     
     passed = 0
@@ -196,6 +1194,35 @@ def main():
     results.append(("Endpoints", check_endpoints()))
     results.append(("Name Extraction", test_name_extraction()))
     results.append(("Scoring", test_scoring()))
+    results.append(("Skill Extraction Parity", _passes(test_skill_extraction_parity)))
+    results.append(("Fast Skill Extraction", _passes(test_fast_skill_extraction)))
+    results.append(("Background Index Refit", _passes(test_index_refit_in_background)))
+    results.append(("Stop-Word-Only Texts", _passes(test_stop_word_texts_score_zero)))
+    results.append(("Parse Cache Pruning", _passes(test_parse_cache_pruning)))
+    results.append(("Hung PDF Worker", _passes(test_hung_pdf_worker_is_killed)))
+    results.append(("Batch Item Validation", _passes(test_batch_item_validation)))
+    results.append(("Alias Requirements", _passes(test_alias_requirements_match)))
+    results.append(("Retrieval Index", _passes(test_retrieval_index)))
+    results.append(("Search Before Index Exists", _passes(test_search_before_index_exists)))
+    results.append(("Async Bulk Batches", _passes(test_async_bulk_batches)))
+    results.append(("Bulk Events Stream", _passes(test_bulk_events_stream)))
+    results.append(("Feature Blobs", _passes(test_feature_blobs)))
+    results.append(("Revectorize", _passes(test_revectorize)))
+    results.append(("Skill Bitsets", _passes(test_skill_bitsets)))
+    results.append(("Single PDF In Pool", _passes(test_single_pdf_uses_pool)))
+    results.append(("Batch Endpoints", _passes(test_batch_endpoints)))
+    results.append(("SQLite Unit Of Work", _passes(test_sqlite_unit_of_work)))
+    results.append(("Metrics", _passes(test_metrics)))
+    results.append(("Lazy Loading And Warm-Up", _passes(test_lazy_loading_and_warmup)))
+    results.append(("Bulk Match Top-K", _passes(test_bulk_match_top_k)))
+    results.append(("ANN Recall", _passes(test_ann_recall)))
+    results.append(("Semantic Similarity", _passes(test_semantic_similarity)))
+    results.append(("Multi-Job Bulk Screen", _passes(test_bulk_screen_multiple_jobs)))
+    results.append(("Match Cache Invalidation", _passes(test_match_cache_invalidation)))
+    results.append(("ASGI Front End", _passes(test_asgi_front_end)))
+    results.append(("Hashing Vectorizer", _passes(test_hashing_vectorizer)))
+    results.append(("Posting Lists", _passes(test_posting_lists)))
+    results.append(("Batch CLI Resume", _passes(test_batch_cli_resume)))
     
     # Print summary
     print("\n" + "=" * 60)